@@ -0,0 +1,272 @@
+"""
+Vectorized portfolio analytics for every league.
+
+Rebuilds every user's daily net worth from 'transactions' and 'price_history'
+and derives time-weighted return, volatility, max drawdown, a Sharpe-like ratio
+and a comparison against a GSE index built from the 'stocks' universe. Users are
+processed as columns of one matrix (in chunks of `chunkSize` users to bound
+memory), so the nightly job never loops over users or days in Python.
+
+    python analytics.py                       # equal-weight index, since the first trade
+    python analytics.py --index cap --start 2026-01-01
+    python analytics.py --league <league id>  # one league only
+
+Each league is computed separately from its own trades and starting cash.
+Results go to the 'portfolio_analytics' table, which the portfolio view reads.
+"""
+import os
+import time
+import argparse
+from datetime import date
+import numpy as np
+import pandas as pd
+
+STARTING_CASH = float(os.getenv("STARTING_CASH", "1000000"))
+TRADING_DAYS_PER_YEAR = 252
+RISK_FREE_RATE = float(os.getenv("ANALYTICS_RISK_FREE_RATE", "0.0")) #Annual, e.g. 0.02 for 2%
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "2000"))
+INDEX_METHODS = ("equal", "cap")
+
+METRIC_COLUMNS = [
+    "user_id", "window_start", "as_of", "trading_days", "net_worth", "twr", "annualized_return",
+    "volatility", "max_drawdown", "sharpe", "benchmark_return", "excess_return", "beta", "index_method"
+]
+
+def tradeDays(createdAt):
+    #Timestamps to their (midnight) trade date in Guyana time
+    parsed = pd.to_datetime(createdAt, utc=True, format="ISO8601")
+    return parsed.dt.tz_convert("America/Guyana").dt.tz_localize(None).dt.normalize()
+
+def tradingCalendar(start, end):
+    #Business days from start to end inclusive; GSE holidays simply carry the previous price forward
+    return pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+
+def priceMatrix(history, calendar, tickers):
+    """
+    Pivots a getPriceHistory() frame into a (days x tickers) array aligned with
+    `calendar`. Prices are carried forward over days without a trade, and a
+    ticker's first known price is used for the days before it.
+    """
+    wide = history.pivot_table(index="trade_date", columns="ticker", values="price", aggfunc="last")
+    wide = wide.reindex(wide.index.union(calendar)).sort_index().ffill().reindex(calendar)
+    return wide.reindex(columns=tickers).bfill().to_numpy(dtype=np.float64)
+
+def gseIndex(prices, method="equal", sharesOutstanding=None):
+    """
+    Daily returns of a GSE index over a (days x tickers) price array; the first
+    day has no return. "equal" rebalances to equal weights every day. "cap"
+    weights each ticker by the previous day's market cap, which needs
+    `sharesOutstanding` aligned with the price columns.
+    """
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unknown index method {method!r}; use one of {', '.join(INDEX_METHODS)}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+    valid = np.isfinite(returns)
+
+    if method == "equal":
+        weights = valid.astype(np.float64)
+    else:
+        if sharesOutstanding is None:
+            raise ValueError("A cap-weighted index needs shares outstanding for every ticker")
+        caps = prices[:-1] * np.asarray(sharesOutstanding, dtype=np.float64)
+        weights = np.where(valid & np.isfinite(caps), caps, 0.0)
+
+    totals = weights.sum(axis=1)
+    weighted = np.where(valid, returns, 0.0) * weights
+    return np.divide(weighted.sum(axis=1), totals, out=np.zeros_like(totals), where=totals > 0)
+
+def netWorthMatrix(transactions, prices, calendar, tickers, startingCash=STARTING_CASH):
+    """
+    Reconstructs end-of-day net worth for every user in `transactions`.
+
+    `transactions` has user_id, created_at, type ('BUY'/'SELL'), ticker,
+    quantity and total_value. A trade counts from the first calendar day on or
+    after it. Every user starts with `startingCash`; days before their first
+    trade are NaN. Returns (user ids, days x users array).
+    """
+    day = calendar.searchsorted(tradeDays(transactions["created_at"]))
+    # Trades in tickers outside `tickers` have no prices to value; left in, their -1 code would land on another pair
+    tickerCodes = pd.Index(tickers).get_indexer(transactions["ticker"])
+    keep = (day < len(calendar)) & (tickerCodes >= 0)
+    tx = transactions[keep]
+    day = day[keep]
+    tickerCodes = tickerCodes[keep]
+
+    userCodes, users = pd.factorize(tx["user_id"], sort=True)
+    sign = np.where(tx["type"].str.upper().to_numpy() == "BUY", 1.0, -1.0)
+    quantity = tx["quantity"].to_numpy(dtype=np.float64) * sign
+    cashFlow = -tx["total_value"].to_numpy(dtype=np.float64) * sign
+
+    # Positions are tracked per (user, ticker) pair so memory scales with holdings, not users x universe
+    pairCodes, pairs = pd.factorize(userCodes * len(tickers) + tickerCodes, sort=True)
+    pairUsers = pairs // len(tickers)
+    pairTickers = pairs % len(tickers)
+
+    shares = np.zeros((len(calendar), len(pairs)))
+    np.add.at(shares, (day, pairCodes), quantity)
+    np.cumsum(shares, axis=0, out=shares)
+    holdingValues = np.multiply(shares, np.nan_to_num(prices)[:, pairTickers], out=shares)
+
+    # Pairs are sorted by user, so each user's holdings are one contiguous run of columns
+    stockValue = np.add.reduceat(holdingValues, np.searchsorted(pairUsers, np.arange(len(users))), axis=1)
+
+    cash = np.zeros((len(calendar), len(users)))
+    np.add.at(cash, (day, userCodes), cashFlow)
+    netWorth = startingCash + np.cumsum(cash, axis=0) + stockValue
+
+    firstDay = np.full(len(users), len(calendar))
+    np.minimum.at(firstDay, userCodes, day)
+    netWorth[np.arange(len(calendar))[:, None] < firstDay[None, :]] = np.nan
+    return np.asarray(users), netWorth
+
+def portfolioMetrics(netWorth, indexReturns, riskFree=RISK_FREE_RATE):
+    """
+    Computes per-user metrics from a (days x users) net-worth array, column by
+    column in one pass. Trades only move value between cash and shares, so
+    daily returns are already time-weighted. The benchmark return and beta
+    use only the days each user was active.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = netWorth[1:] / netWorth[:-1] - 1
+    active = np.isfinite(returns)
+    days = active.sum(axis=0)
+    r = np.where(active, returns, 0.0)
+
+    twr = np.prod(1 + r, axis=0) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annualized = np.where(days > 0, (1 + twr) ** (TRADING_DAYS_PER_YEAR / np.maximum(days, 1)) - 1, 0.0)
+        mean = r.sum(axis=0) / np.maximum(days, 1)
+        deviation = np.where(active, r - mean, 0.0)
+        std = np.sqrt((deviation ** 2).sum(axis=0) / np.maximum(days - 1, 1))
+        sharpe = np.where(std > 0, (mean - riskFree / TRADING_DAYS_PER_YEAR) / std, np.nan) \
+            * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+        peaks = np.fmax.accumulate(netWorth, axis=0)
+        maxDrawdown = np.nan_to_num(np.nanmin(np.where(np.isfinite(netWorth), netWorth / peaks - 1, np.nan), axis=0))
+
+        index = np.where(active, indexReturns[:, None], 0.0)
+        benchmark = np.prod(1 + index, axis=0) - 1
+        indexMean = index.sum(axis=0) / np.maximum(days, 1)
+        indexDeviation = np.where(active, index - indexMean, 0.0)
+        indexVariance = (indexDeviation ** 2).sum(axis=0)
+        beta = np.where(indexVariance > 0, (deviation * indexDeviation).sum(axis=0) / indexVariance, np.nan)
+
+    return {
+        "trading_days": days,
+        "twr": twr,
+        "annualized_return": annualized,
+        "volatility": std * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "max_drawdown": maxDrawdown,
+        "sharpe": sharpe,
+        "benchmark_return": benchmark,
+        "excess_return": twr - benchmark,
+        "beta": beta,
+    }
+
+def computeLeagueAnalytics(transactions, history, tickers, start=None, asOf=None, method="equal",
+                           sharesOutstanding=None, riskFree=RISK_FREE_RATE, chunkSize=ANALYTICS_CHUNK_SIZE,
+                           startingCash=STARTING_CASH):
+    """
+    Builds one METRIC_COLUMNS row per user who has traded. Positions are always
+    rebuilt from the full `transactions`; `start` only limits the window the
+    metrics are measured over (default: the first trade).
+    """
+    if transactions.empty:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    asOf = pd.Timestamp(asOf or date.today())
+    calendar = tradingCalendar(tradeDays(transactions["created_at"]).min(), asOf)
+    prices = priceMatrix(history, calendar, tickers)
+    indexReturns = gseIndex(prices, method, sharesOutstanding)
+    firstRow = calendar.searchsorted(pd.Timestamp(start)) if start is not None else 0
+
+    frames = []
+    users = np.sort(transactions["user_id"].unique())
+    for i in range(0, len(users), max(1, chunkSize)):
+        chunk = transactions[transactions["user_id"].isin(users[i:i + chunkSize])]
+        userIDs, netWorth = netWorthMatrix(chunk, prices, calendar, tickers, startingCash)
+        netWorth = netWorth[firstRow:]
+        metrics = portfolioMetrics(netWorth, indexReturns[firstRow:], riskFree)
+        windowStart = calendar[firstRow:][np.argmax(np.isfinite(netWorth), axis=0)]
+        frames.append(pd.DataFrame({
+            "user_id": userIDs,
+            "window_start": windowStart.date,
+            "as_of": asOf.date(),
+            "net_worth": netWorth[-1],
+            **metrics,
+            "index_method": method,
+        }))
+    result = pd.concat(frames, ignore_index=True)
+    return result[np.isfinite(result["net_worth"])][METRIC_COLUMNS].reset_index(drop=True)
+
+# --- Nightly job ---
+
+def runLeagueAnalytics(start=None, asOf=None, method="equal", riskFree=RISK_FREE_RATE, chunkSize=ANALYTICS_CHUNK_SIZE,
+                       leagueID=None):
+    """
+    Runs analytics for one league (`leagueID`) or, by default, every league.
+    Each league is computed on its own: only its transactions are read, and
+    net worth is rebuilt from its starting cash. Results are upserted into
+    'portfolio_analytics'. Returns the number of users written.
+    """
+    import database
+    leagues = database.getAllLeagues()
+    if leagueID is not None:
+        leagues = [league for league in leagues if league["id"] == leagueID]
+        if not leagues:
+            raise ValueError(f"Unknown league: {leagueID}")
+    stocks = database.getAllStocks.uncached()
+    return sum(analyzeLeague(league, stocks, start, asOf, method, riskFree, chunkSize) for league in leagues)
+
+def analyzeLeague(league, stocks, start=None, asOf=None, method="equal", riskFree=RISK_FREE_RATE,
+                  chunkSize=ANALYTICS_CHUNK_SIZE):
+    """
+    Reads one league's transactions and the price history since its first
+    trade, computes metrics for its players and upserts them. `league` is a
+    'leagues' row and `stocks` the 'stocks' universe. Returns the number of
+    users written.
+    """
+    import database
+    jobStart = time.perf_counter()
+    pages = database.streamLeagueTransactions(league["id"])
+    transactions = pd.DataFrame([row for page in pages for row in page], columns=database.LEAGUE_TRANSACTION_COLUMNS)
+    if transactions.empty:
+        print(f"{league['name']}: no transactions found; nothing to compute")
+        return 0
+
+    tickers = sorted({s["ticker"] for s in stocks} | set(transactions["ticker"]))
+    sharesOutstanding = None
+    if method == "cap":
+        outstanding = {s["ticker"]: s.get("shares_outstanding") for s in stocks}
+        missing = [t for t in tickers if not outstanding.get(t)]
+        if missing:
+            raise ValueError(f"Missing shares_outstanding for: {', '.join(missing)}")
+        sharesOutstanding = [float(outstanding[t]) for t in tickers]
+
+    firstTrade = tradeDays(transactions["created_at"]).min().date()
+    history = database.getPriceHistory(tickers, start=firstTrade, end=asOf)
+    loaded = time.perf_counter()
+
+    metrics = computeLeagueAnalytics(transactions, history, tickers, start, asOf, method,
+                                     sharesOutstanding, riskFree, chunkSize, float(league["starting_cash"]))
+    computed = time.perf_counter()
+
+    written = database.savePortfolioAnalytics(metrics, league["id"])
+    print(f"{league['name']}: computed analytics for {written} users from {len(transactions)} transactions: "
+          f"load {loaded - jobStart:.2f}s, compute {computed - loaded:.2f}s, "
+          f"write {time.perf_counter() - computed:.2f}s")
+    return written
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Precompute portfolio analytics for every user")
+    parser.add_argument("--index", choices=INDEX_METHODS, default="equal", help="GSE index weighting to compare against")
+    parser.add_argument("--start", type=date.fromisoformat, help="Measure metrics from this date (default: first trade)")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="Last day of the window (default: today)")
+    parser.add_argument("--risk-free", type=float, default=RISK_FREE_RATE, help="Annual risk-free rate for the Sharpe ratio")
+    parser.add_argument("--chunk-size", type=int, default=ANALYTICS_CHUNK_SIZE, help="Users per vectorized batch")
+    parser.add_argument("--league", help="Only this league's id (default: every league)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parseArgs()
+    runLeagueAnalytics(args.start, args.as_of, args.index, args.risk_free, args.chunk_size, args.league)
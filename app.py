@@ -1,36 +1,112 @@
+import time
+_runStart = time.perf_counter()
+import os
+from zoneinfo import ZoneInfo
 import streamlit as st
-import pandas as pd
-import pytz
-import altair as alt
-import streamlit as st
-from supabase import create_client
 from database import (
-    getAllStocks, placeBuyOrder, getUserProfile, 
-    getUserPortfolio, placeSellOrder, getTransactionHist, 
-    supabase, getLeaderboard
+    getAllStocks, placeBuyOrder,
+    getUserPortfolio, placeSellOrder, placeBatchOrder, getTransactionPage, exportTransactions,
+    TRANSACTION_PAGE_SIZE,
+    getLeaderboard, getRecentPriceHistory, getUserRank, getPortfolioAnalytics, getRankHistory, getTopMovers,
+    placeStandingOrder, cancelStandingOrder, getStandingOrders,
+    getLeagues, getUserLeagues, getMembership, createLeague, joinLeague, GLOBAL_LEAGUE,
+    createClient, bindSessionClient, newOrderKey
 )
+from livePrices import getLivePrices
+from frames import stocksFrame, transactionsFrame, concatFrames, TRANSACTION_SCHEMA
+import instrumentation
+# pandas, altair and valuation are imported inside the dashboard views that use them,
+# so the landing page renders without loading them.
+LEADERBOARD_PAGE_SIZE = 10
+LIVE_REFRESH_SECONDS = float(os.getenv("LIVE_REFRESH_SECONDS", "5"))
+
 #DEFINE LOCAL TIMEZONE
-guyanaTZ = pytz.timezone('America/Guyana')
+guyanaTZ = ZoneInfo('America/Guyana')
+
+# STARTUP TIMING
+# Set GSE_STARTUP_TIMING=1 to show the breakdown in the sidebar; each session's first run is always logged.
+_timings = [("imports", time.perf_counter())]
+
+# REQUEST INSTRUMENTATION
+# Every database call in this rerun is traced; set GSE_DEBUG=1 for the sidebar debug panel.
+instrumentation.startRun()
+instrumentation.startMetricsServer()
+
+def markTiming(label):
+    _timings.append((label, time.perf_counter()))
+
+def reportTimings():
+    markTiming("rendered")
+    steps, previous = [], _runStart
+    for label, stamp in _timings:
+        steps.append((label, (stamp - previous) * 1000))
+        previous = stamp
+    total = (previous - _runStart) * 1000
+    if not st.session_state.get('startup_reported'):
+        st.session_state.startup_reported = True
+        print("[startup] first render " + ", ".join(f"{l}={ms:.0f}ms" for l, ms in steps) + f", total={total:.0f}ms")
+    if os.getenv("GSE_STARTUP_TIMING"):
+        with st.sidebar.expander(f"⏱️ Render timing ({total:.0f} ms)"):
+            for label, ms in steps:
+                st.write(f"{label}: {ms:.1f} ms")
+
+def renderDebugPanel(profiler=None):
+    #Shows this rerun's database calls, view render times and (when requested) the sampling profile
+    summary = instrumentation.runSummary()
+    with st.sidebar.expander(f"🔍 Debug ({summary['roundTrips']} calls, {summary['dbMs']:.0f} ms in DB)"):
+        st.checkbox("Profile reruns", key="profile_next_run")
+        run = instrumentation.currentRun()
+        for view in run["views"]:
+            st.write(f"**{view['view']}** rendered in {view['ms']:.1f} ms")
+        st.write(f"{summary['roundTrips']} round trips, {summary['cacheHits']} cache hits, "
+                 f"{summary['rows']:,} rows, {summary['bytes'] / 1024:,.1f} KB, {summary['errors']} errors")
+        if run["calls"]:
+            st.dataframe(
+                [{k: c[k] for k in ("function", "call", "ms", "rows", "bytes", "error")} for c in run["calls"]],
+                column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")},
+                hide_index=True,
+                use_container_width=True
+            )
+        if profiler is not None:
+            st.write(f"**Profile** ({profiler.samples} samples every {profiler.interval * 1000:.0f} ms)")
+            st.dataframe(
+                profiler.top(),
+                column_config={
+                    "selfMs": st.column_config.NumberColumn("Self ms", format="%.0f"),
+                    "totalMs": st.column_config.NumberColumn("Total ms", format="%.0f"),
+                    "totalPct": st.column_config.NumberColumn("Total %", format="%.0f%%"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
 
 # PAGE CONFIGURATION
 st.set_page_config(page_title="GSE Fantasy League", layout="wide")
 
 # CUSTOM CSS STYLING
-def localCSS(fileName):
+@st.cache_resource
+def readCSS(fileName):
     with open(fileName) as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+        return f.read()
+
+def localCSS(fileName):
+    st.markdown(f'<style>{readCSS(fileName)}</style>', unsafe_allow_html=True)
 
 localCSS("styles.css")
 
 # SIDEBAR AUTHENTICATION LOGIC
 def getSupabase():
+    # Each session gets its own auth state, but all of them share database.py's HTTP connection pool
     if 'supabase_client' not in st.session_state:
         url = st.secrets["SUPABASE_URL"]
         key = st.secrets["SUPABASE_KEY"]
-        st.session_state.supabase_client = create_client(url, key)
+        st.session_state.supabase_client = createClient(url, key)
     return st.session_state.supabase_client
 
 supabase = getSupabase();
+# Database reads and trades in this rerun go through the session's authenticated client
+bindSessionClient(supabase)
+markTiming("client")
 
 def loginSidebar():
     st.sidebar.title("👤 Account")
@@ -68,6 +144,67 @@ def loginSidebar():
             st.rerun()
         return user.id
 
+def leagueSidebar(userID):
+    # Every view below shows the selected league only: its cash, holdings, trades and rankings
+    st.sidebar.title("🏟️ League")
+    memberships = getUserLeagues(userID) or []
+    leagues = {m['league_id']: m['leagues'] for m in memberships if m.get('leagues')}
+    if not leagues:
+        leagues = {GLOBAL_LEAGUE: {"name": "Global League"}}
+    leagueID = st.sidebar.selectbox("Playing In", list(leagues), format_func=lambda i: leagues[i]['name'],
+                                    key="league_id")
+    if leagues[leagueID].get('is_public') is False and leagues[leagueID].get('join_code'):
+        st.sidebar.caption(f"Private league - invite code: `{leagues[leagueID]['join_code']}`")
+
+    with st.sidebar.expander("Join or Create a League"):
+        from datetime import datetime
+        today = datetime.now(guyanaTZ).date().isoformat()
+        joinable = {l['id']: l for l in (getLeagues(today) or []) if l['id'] not in leagues}
+        if joinable:
+            joinID = st.selectbox("Open Leagues", list(joinable), key="join_league_id",
+                                  format_func=lambda i: f"{joinable[i]['name']} (${joinable[i]['starting_cash']:,.0f})")
+            if st.button("Join League", use_container_width=True):
+                success, message = joinLeague(userID, joinID)
+                (st.success if success else st.error)(message)
+                if success:
+                    st.rerun()
+        inviteCode = st.text_input("Invite Code", key="join_league_code", help="Ask a member of a private league for its code")
+        if st.button("Join With Code", use_container_width=True, disabled=not inviteCode.strip()):
+            success, message = joinLeague(userID, code=inviteCode.strip())
+            (st.success if success else st.error)(message)
+            if success:
+                st.rerun()
+        st.write("**New League**")
+        newName = st.text_input("Name", key="new_league_name")
+        newSlug = st.text_input("Short Code", key="new_league_slug", help="Unique, e.g. 'qc-2026'")
+        newCash = st.number_input("Starting Cash (GYD)", min_value=1000.0, value=1000000.0, step=100000.0,
+                                  key="new_league_cash")
+        newDates = st.date_input("Runs", value=(), key="new_league_dates")
+        newPrivate = st.checkbox("Private (invite code only)", key="new_league_private")
+        if st.button("Create League", use_container_width=True, disabled=not (newName and newSlug)):
+            success, message, _ = createLeague(userID, newName, newSlug, newCash,
+                                               newDates[0] if len(newDates) > 0 else None,
+                                               newDates[1] if len(newDates) > 1 else None,
+                                               isPublic=not newPrivate)
+            (st.success if success else st.error)(message)
+            if success:
+                st.rerun()
+    return leagueID, leagues[leagueID]
+
+# ORDER SUBMISSION KEYS
+# Each order form keeps one idempotency key until its order succeeds, so a double click or a rerun
+# resends the same key and the server fills the order once. The key belongs to the order the form
+# describes (`order`: league, tickers, sides, quantities); editing any of them starts a new key.
+def orderKey(form, order):
+    stored = st.session_state.get(f"{form}_order_key")
+    if stored is None or stored[1] != order:
+        stored = st.session_state[f"{form}_order_key"] = (newOrderKey(), order)
+    return stored[0]
+
+def orderPlaced(form):
+    # Called after the result is shown: a second click that interrupted the run still reused the old key
+    st.session_state.pop(f"{form}_order_key", None)
+
 # SHARED COMPONENT: ABOUT & CREDITS
 def renderAboutSection():
     st.markdown("""
@@ -99,6 +236,7 @@ def renderAboutSection():
 
 # INITIALIZE AUTH
 USER_ID = loginSidebar()
+markTiming("auth")
 
 # MAIN CONTENT ROUTER
 if not USER_ID:
@@ -126,6 +264,10 @@ if not USER_ID:
 
 else:
     # --- DASHBOARD (LOGGED IN STATE) ---
+    import pandas as pd
+    import altair as alt
+    markTiming("dashboard imports")
+    LEAGUE_ID, league = leagueSidebar(USER_ID)
     st.title("Guyana Stock Exchange: Fantasy League")
     
     choice = st.segmented_control(
@@ -134,18 +276,33 @@ else:
         default="📈 Market Prices"
     )
     st.divider()
+    viewStart = time.perf_counter()
+    # The debug panel's "Profile reruns" box samples this view's render
+    profiler = instrumentation.SamplingProfiler().start() if st.session_state.get("profile_next_run") else None
 
     # --- MARKET PRICES ---
     if choice == "📈 Market Prices":
         st.subheader("Current Market Prices")
-        stocks = getAllStocks()
-
-        if stocks:
-            df = pd.DataFrame(stocks)
-            df['last_updated'] = pd.to_datetime(df['last_updated']) \
-                .dt.tz_convert(guyanaTZ) \
-                .dt.strftime('%b %d, %I:%M %p')
-            df_display = df[['ticker', 'name', 'current_price', 'last_updated']]
+
+        def marketFrame(dailyChange):
+            #Prices come from the process-wide live snapshot, so a rerun does not read the database
+            stocks = getLivePrices()
+            if not stocks:
+                return None
+            # Typed decode; 'last_updated' arrives already converted to Guyana time
+            df = stocksFrame(stocks, guyanaTZ)
+            df['last_updated'] = df['last_updated'].dt.strftime('%b %d, %I:%M %p')
+            df['daily_change'] = dailyChange.reindex(df['ticker']).to_numpy() if dailyChange is not None else None
+            return df
+
+        # Only the price table re-renders on the timer, from the live snapshot alone; the buy form below keeps
+        # its inputs. History and daily change are computed once per full rerun, from the sync-stamp cache.
+        @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+        def livePriceTable(dailyChange):
+            df = marketFrame(dailyChange)
+            if df is None:
+                return
+            df_display = df[['ticker', 'name', 'current_price', 'daily_change', 'last_updated']]
             st.dataframe(
                 df_display,
                 column_config={
@@ -158,6 +315,16 @@ else:
                 use_container_width=True
             )
             #st.table(df_display)
+
+        tickers = tuple(sorted(s['ticker'] for s in getLivePrices() or []))
+        history = getRecentPriceHistory(tickers) if tickers else None
+        dailyChange = None
+        if history is not None and not history.empty:
+            # Daily change compares each ticker's last two recorded sessions; the cached frame is left untouched
+            dailyChange = (history.groupby('ticker')['price'].pct_change() * 100).groupby(history['ticker']).last()
+        df = marketFrame(dailyChange)
+        if df is not None:
+            livePriceTable(dailyChange)
             
             st.divider()
             st.subheader("Place a Buy Order")
@@ -177,11 +344,32 @@ else:
 
             #st.write(f"Total Transaction Cost: **${totalCost:,.2f} GYD**")
 
+            tickerHistory = history[history['ticker'] == selectedTicker]
+            if not tickerHistory.empty:
+                chartH = alt.Chart(tickerHistory).mark_line(color='#00ff88', point=True).encode(
+                    x=alt.X('trade_date:T', title='SESSION DATE'),
+                    y=alt.Y('price:Q', title='PRICE (GYD)', scale=alt.Scale(zero=False)),
+                    tooltip=['trade_date:T', 'price:Q']
+                ).properties(
+                    width='container',
+                    height=250
+                ).configure_axis(
+                    titleFont='Inter',
+                    titleFontWeight=800,
+                    titleColor='#8b949e',
+                    labelFont='JetBrains Mono',
+                    labelColor='#c9d1d9'
+                ).configure_view(strokeWidth=0)
+                st.altair_chart(chartH, use_container_width=True)
+
             if st.button("Confirm Purchase", type="primary"):
-                success, message = placeBuyOrder(USER_ID, selectedTicker, qty, currentPrice)
+                success, message = placeBuyOrder(USER_ID, selectedTicker, qty, currentPrice, LEAGUE_ID,
+                                                 orderKey("buy", (LEAGUE_ID, selectedTicker, qty)))
                 if success:
+                    st.session_state.pop('hist_pages', None)
                     st.success(message)
                     st.balloons()
+                    orderPlaced("buy")
                 else:
                     st.error(f"Trade Failed: {message}")
         else:
@@ -190,82 +378,76 @@ else:
     # --- PORTFOLIO ---
     elif choice == "📁 My Portfolio":
         st.subheader("My Investment Portfolio")
-        profile = getUserProfile(USER_ID)
+        profile = getMembership(USER_ID, LEAGUE_ID)
         
         if profile:
-            holdings = getUserPortfolio(USER_ID)
+            from valuation import valuePortfolio, portfolioTotals, rebalanceLegs
+            holdings = getUserPortfolio(USER_ID, LEAGUE_ID)
             colP1, colP2 = st.columns(2)
             with colP1:
                 st.metric("Available Cash", f"${profile['cash_balance']:,.2f} GYD")
 
             if holdings:
-                portfolioList = []
-                totalStockVal = 0
-                for item in holdings:
-                    currentVal = item['shares_count'] * item['stocks']['current_price']
-                    totalStockVal += currentVal
-                    costBasis = item['shares_count'] * item['avg_price']
-                    plAmount = currentVal - costBasis
-                    plPercent = (plAmount / costBasis) * 100 if costBasis != 0 else 0
-
-                    # These keys MUST match what the Altair Chart looks for
-                    portfolioList.append({
-                        "Ticker": item['ticker'],
-                        "Name": item['stocks']['name'],
-                        "Shares": item['shares_count'],
-                        "Average Price": f"${item['avg_price']:,.2f}",
-                        "Current Price": f"${item['stocks']['current_price']:,.2f}",
-                        "Total Value": f"${currentVal:,.2f}", # Altair will clean this string
-                        "P/L ($)": f"${plAmount:,.2f}",
-                        "P/L (%)": f"{plPercent:.2f}%" 
-                    })
+                # Value every holding in one vectorized pass; numbers stay numeric until display
+                dfHoldings = valuePortfolio(holdings)
+                totals = portfolioTotals(dfHoldings)
 
                 with colP2:
-                    st.metric("Total Stock Value", f"${totalStockVal:,.2f} GYD")
+                    st.metric("Total Stock Value", f"${totals['market_value']:,.2f} GYD")
 
                 st.write("### Your Holdings")
-                df_holdings = pd.DataFrame(portfolioList)
 
                 # Use st.dataframe with column_config for a professional, responsive look
                 st.dataframe(
-                    df_holdings,
+                    dfHoldings[['ticker', 'name', 'shares', 'avg_price', 'current_price', 'market_value', 'pl', 'pl_pct']],
                     column_config={
-                        "Ticker": st.column_config.TextColumn("Ticker", width="small"),
-                        "Name": st.column_config.TextColumn("Name", width="medium"),
-                        "Shares": st.column_config.NumberColumn("Shares"),
-                        "Average Price": st.column_config.TextColumn("Avg Price"),
-                        "Current Price": st.column_config.TextColumn("Current"),
-                        "Total Value": st.column_config.TextColumn("Value"),
-                        "P/L ($)": st.column_config.TextColumn("P/L ($)"),
-                        "P/L (%)": st.column_config.TextColumn("P/L (%)"),
+                        "ticker": st.column_config.TextColumn("Ticker", width="small"),
+                        "name": st.column_config.TextColumn("Name", width="medium"),
+                        "shares": st.column_config.NumberColumn("Shares", format="%d"),
+                        "avg_price": st.column_config.NumberColumn("Avg Price", format="dollar"),
+                        "current_price": st.column_config.NumberColumn("Current", format="dollar"),
+                        "market_value": st.column_config.NumberColumn("Value", format="dollar"),
+                        "pl": st.column_config.NumberColumn("P/L ($)", format="dollar"),
+                        "pl_pct": st.column_config.NumberColumn("P/L (%)", format="%.2f%%"),
                     },
                     hide_index=True,
                     use_container_width=True
                 )
-                #st.table(portfolioList)
+
+                # --- PERFORMANCE ---
+                # Precomputed nightly by analytics.py; nothing is recomputed on render
+                perf = getPortfolioAnalytics(USER_ID, LEAGUE_ID)
+                if perf:
+                    st.write("### Performance")
+                    colR1, colR2, colR3, colR4 = st.columns(4)
+                    with colR1:
+                        st.metric("Return (TWR)", f"{perf['twr'] * 100:+.2f}%",
+                                  delta=f"{perf['excess_return'] * 100:+.2f}% vs GSE index")
+                    with colR2:
+                        st.metric("Volatility (ann.)", f"{perf['volatility'] * 100:.2f}%")
+                    with colR3:
+                        st.metric("Max Drawdown", f"{perf['max_drawdown'] * 100:.2f}%")
+                    with colR4:
+                        sharpe = perf.get('sharpe')
+                        st.metric("Sharpe Ratio", f"{sharpe:.2f}" if sharpe is not None else "—")
+                    st.caption(f"{perf['window_start']} to {perf['as_of']} · "
+                               f"{perf['index_method']}-weight GSE index returned {perf['benchmark_return'] * 100:+.2f}%")
 
                 # --- DISTRIBUTION CHART ---
                 st.write("### Portfolio Breakdown")
-                dfPie = pd.DataFrame(portfolioList)
-
-                if not dfPie.empty:
-                    # Clean the currency string for calculation
-                    dfPie['Value_Num'] = (
-                        dfPie['Total Value']
-                        .astype(str)
-                        .str.replace(r'[\$,]| GYD', '', regex=True)
-                        .astype(float)
-                    )
-
-                    chartP = alt.Chart(dfPie).mark_bar(
+
+                if not dfHoldings.empty:
+                    chartP = alt.Chart(dfHoldings).mark_bar(
                         color='#00ff88', 
                         cornerRadiusTopLeft=4, 
                         cornerRadiusTopRight=4
                     ).encode(
-                        # These now match your dictionary keys exactly
-                        x=alt.X('Ticker:N', title='STOCK TICKER'),
-                        y=alt.Y('Value_Num:Q', title='MARKET VALUE (GYD)'),
-                        tooltip=['Ticker:N', 'Total Value:N']
+                        x=alt.X('ticker:N', title='STOCK TICKER'),
+                        y=alt.Y('market_value:Q', title='MARKET VALUE (GYD)'),
+                        tooltip=[
+                            alt.Tooltip('ticker:N', title='Ticker'),
+                            alt.Tooltip('market_value:Q', title='Total Value', format='$,.2f')
+                        ]
                     ).properties(
                         width='container',
                         height=400
@@ -302,49 +484,258 @@ else:
                     st.metric("Expected Revenue", f"${(sellQty * currentMarketPrice):,.2f} GYD")
 
                 if st.button("Confirm Sale", type="secondary"):
-                    success, message = placeSellOrder(USER_ID, sellTicker, sellQty, currentMarketPrice)
+                    success, message = placeSellOrder(USER_ID, sellTicker, sellQty, currentMarketPrice, LEAGUE_ID,
+                                                      orderKey("sell", (LEAGUE_ID, sellTicker, sellQty)))
                     if success:
+                        st.session_state.pop('hist_pages', None)
                         st.success(message)
+                        orderPlaced("sell")
                         st.rerun()
                     else:
                         st.error(f"Sale Failed: {message}")
             else:
                 st.info("You do not own any stocks yet.")
 
+            # BASKET / REBALANCE
+            # Every leg is sent to the server in one call and filled atomically
+            st.divider()
+            st.subheader("Basket Order & Rebalance")
+            marketPrices = {s['ticker']: s['current_price'] for s in getLivePrices() or []}
+            heldShares = {item['ticker']: item['shares_count'] for item in holdings or []}
+            basketMode = st.radio("Mode", ["Basket", "Rebalance to Target Weights"], horizontal=True)
+
+            if basketMode == "Basket":
+                basketDf = st.data_editor(
+                    pd.DataFrame({
+                        "side": pd.Series(dtype="object"),
+                        "ticker": pd.Series(dtype="object"),
+                        "quantity": pd.Series(dtype="Int64"),
+                    }),
+                    column_config={
+                        "side": st.column_config.SelectboxColumn("Side", options=["buy", "sell"], required=True),
+                        "ticker": st.column_config.SelectboxColumn("Ticker", options=list(marketPrices), required=True),
+                        "quantity": st.column_config.NumberColumn("Quantity", min_value=1, step=1, required=True),
+                    },
+                    num_rows="dynamic",
+                    hide_index=True,
+                    use_container_width=True,
+                    key="basket_editor"
+                )
+                basketLegs = [
+                    {"side": r.side, "ticker": r.ticker, "quantity": int(r.quantity), "price": marketPrices[r.ticker]}
+                    for r in basketDf.dropna().itertuples()
+                ]
+            else:
+                netWorth = profile['cash_balance'] + sum(q * marketPrices.get(t, 0) for t, q in heldShares.items())
+                targetDf = st.data_editor(
+                    pd.DataFrame({
+                        "ticker": list(marketPrices),
+                        "target_pct": [heldShares.get(t, 0) * p / netWorth * 100 if netWorth else 0.0
+                                       for t, p in marketPrices.items()],
+                    }),
+                    column_config={
+                        "ticker": st.column_config.TextColumn("Ticker"),
+                        "target_pct": st.column_config.NumberColumn("Target (%)", min_value=0.0, max_value=100.0, format="%.1f%%"),
+                    },
+                    disabled=["ticker"],
+                    hide_index=True,
+                    use_container_width=True,
+                    key="rebalance_editor"
+                )
+                try:
+                    basketLegs = rebalanceLegs(heldShares, marketPrices,
+                                               dict(zip(targetDf['ticker'], targetDf['target_pct'].fillna(0) / 100)),
+                                               profile['cash_balance'])
+                except ValueError as e:
+                    st.error(str(e))
+                    basketLegs = []
+
+            if basketLegs:
+                netCash = sum(leg['quantity'] * leg['price'] * (1 if leg['side'] == 'sell' else -1) for leg in basketLegs)
+                st.dataframe(
+                    pd.DataFrame(basketLegs),
+                    column_config={
+                        "side": st.column_config.TextColumn("Side"),
+                        "ticker": st.column_config.TextColumn("Ticker"),
+                        "quantity": st.column_config.NumberColumn("Quantity"),
+                        "price": st.column_config.NumberColumn("Price", format="dollar"),
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                st.metric("Net Cash Flow", f"${netCash:,.2f} GYD")
+                if st.button("Submit Basket", type="primary"):
+                    success, message, results = placeBatchOrder(USER_ID, basketLegs, LEAGUE_ID, orderKey(
+                        "basket", (LEAGUE_ID, tuple((l['side'], l['ticker'], l['quantity']) for l in basketLegs))))
+                    if success:
+                        st.session_state.pop('hist_pages', None)
+                        st.success(message)
+                        orderPlaced("basket")
+                        st.rerun()
+                    else:
+                        st.error(f"Basket Failed: {message}")
+
+            # LIMIT / STOP ORDERS & ALERTS
+            # Stored server-side; the market sync fills them when a new price crosses the trigger
+            st.divider()
+            st.subheader("Limit Orders & Price Alerts")
+            if marketPrices:
+                colO1, colO2, colO3 = st.columns(3)
+                with colO1:
+                    orderKind = st.selectbox("Order Type", ["limit", "stop", "alert"], format_func=str.title, key="order_kind")
+                    orderTicker = st.selectbox("Ticker", list(marketPrices), key="order_ticker")
+                with colO2:
+                    if orderKind == "alert":
+                        orderDirection = st.radio("Alert When Price Is", ["above", "below"], horizontal=True, key="order_direction")
+                        orderSide, orderQty = None, None
+                    else:
+                        orderSide = st.radio("Side", ["buy", "sell"], horizontal=True, key="order_side")
+                        orderQty = st.number_input("Quantity", min_value=1, step=1, value=1, key="order_qty")
+                        orderDirection = None
+                with colO3:
+                    triggerPrice = st.number_input("Trigger Price (GYD)", min_value=0.01,
+                                                   value=float(marketPrices[orderTicker] or 1.0), key="order_trigger")
+                    st.caption(f"Last price: ${marketPrices[orderTicker]:,.2f} GYD")
+
+                if st.button("Place Order", key="place_standing_order"):
+                    success, message = placeStandingOrder(USER_ID, orderTicker, orderKind, triggerPrice,
+                                                          orderSide, orderQty, orderDirection, LEAGUE_ID)
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(f"Order Failed: {message}")
+
+            standingOrders = getStandingOrders(USER_ID, leagueID=LEAGUE_ID)
+            if standingOrders:
+                st.dataframe(
+                    pd.DataFrame(standingOrders)[['created_at', 'kind', 'ticker', 'side', 'quantity', 'trigger_price',
+                                                  'direction', 'status', 'filled_price', 'message']],
+                    column_config={
+                        "created_at": None,
+                        "kind": st.column_config.TextColumn("Type"),
+                        "ticker": st.column_config.TextColumn("Ticker"),
+                        "side": st.column_config.TextColumn("Side"),
+                        "quantity": st.column_config.NumberColumn("Shares"),
+                        "trigger_price": st.column_config.NumberColumn("Trigger", format="dollar"),
+                        "direction": st.column_config.TextColumn("Fires When"),
+                        "status": st.column_config.TextColumn("Status"),
+                        "filled_price": st.column_config.NumberColumn("Price", format="dollar"),
+                        "message": st.column_config.TextColumn("Note"),
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                openOrders = {o['id']: o for o in standingOrders if o['status'] == 'open'}
+                if openOrders:
+                    colC1, colC2 = st.columns([3, 1])
+                    with colC1:
+                        cancelID = st.selectbox(
+                            "Open Order", list(openOrders), key="cancel_order",
+                            format_func=lambda i: f"{openOrders[i]['kind'].title()} {openOrders[i]['side'] or ''} "
+                                                  f"{openOrders[i]['ticker']} {openOrders[i]['direction']} "
+                                                  f"${openOrders[i]['trigger_price']:,.2f}"
+                        )
+                    with colC2:
+                        if st.button("Cancel Order"):
+                            success, message = cancelStandingOrder(USER_ID, cancelID)
+                            if success:
+                                st.rerun()
+                            else:
+                                st.error(message)
+            else:
+                st.caption("No standing orders or alerts.")
+
             # TRANSACTION HISTORY
+            # Loaded one keyset page at a time with filters applied by the database
             st.divider()
             st.subheader("Transaction History")
-            history = getTransactionHist(USER_ID)
-            if history:
-                dfHistory = pd.DataFrame(history)
-                dfHistory['created_at'] = pd.to_datetime(dfHistory['created_at']) \
-                    .dt.tz_convert(guyanaTZ) \
-                    .dt.strftime('%b %d, %I:%M %p')
-                dfHistory = dfHistory[['created_at', 'type', 'ticker', 'quantity', 'price', 'total_value']]
+            from datetime import datetime, timedelta
+            colF1, colF2, colF3 = st.columns(3)
+            with colF1:
+                histTicker = st.selectbox("Ticker", ["All"] + [s['ticker'] for s in getAllStocks() or []], key="hist_ticker")
+            with colF2:
+                histType = st.selectbox("Action", ["All", "BUY", "SELL"], key="hist_type")
+            with colF3:
+                histRange = st.date_input("Date Range", value=(), key="hist_range")
+
+            # Dates are picked in Guyana time; the end date is inclusive
+            localMidnight = lambda d: datetime.combine(d, datetime.min.time(), tzinfo=guyanaTZ)
+            histFilters = {
+                "ticker": None if histTicker == "All" else histTicker,
+                "kind": None if histType == "All" else histType,
+                "start": localMidnight(histRange[0]) if len(histRange) > 0 else None,
+                "end": localMidnight(histRange[-1] + timedelta(days=1)) if len(histRange) > 0 else None,
+                "leagueID": LEAGUE_ID,
+            }
+            filterKey = tuple(str(v) for v in histFilters.values())
+            pages = st.session_state.setdefault('hist_pages', {})
+            if filterKey not in pages:
+                rows, cursor = getTransactionPage(USER_ID, TRANSACTION_PAGE_SIZE, None, **histFilters)
+                # Each page is decoded once when it loads; reruns reuse the typed frame
+                pages[filterKey] = {"frame": transactionsFrame(rows, guyanaTZ), "cursor": cursor}
+            loaded = pages[filterKey]
+
+            if not loaded["frame"].empty:
+                dfHistory = loaded["frame"][['created_at', 'type', 'ticker', 'quantity', 'price', 'total_value']]
                 st.dataframe(
                     dfHistory,
                     column_config={
-                        "timestamp": st.column_config.DatetimeColumn("Date & Time", format="D MMM, h:mm a"),
+                        "created_at": st.column_config.DatetimeColumn("Date & Time", format="D MMM YYYY, h:mm a"),
                         "ticker": st.column_config.TextColumn("Ticker"),
                         "type": st.column_config.TextColumn("Action"), # Buy/Sell
-                        "shares": st.column_config.NumberColumn("Shares"),
-                        "price_at_time": st.column_config.NumberColumn("Price", format="$%.2f"),
-                        "total_cost": st.column_config.NumberColumn("Total", format="$%.2f"),
+                        "quantity": st.column_config.NumberColumn("Shares"),
+                        "price": st.column_config.NumberColumn("Price", format="dollar"),
+                        "total_value": st.column_config.NumberColumn("Total", format="dollar"),
                     },
                     hide_index=True,
                     use_container_width=True
                 )
                 #st.table(dfHistory)
+
+                if loaded["cursor"] is not None and st.button("Load More"):
+                    rows, cursor = getTransactionPage(USER_ID, TRANSACTION_PAGE_SIZE, loaded["cursor"], **histFilters)
+                    loaded["frame"] = concatFrames([loaded["frame"], transactionsFrame(rows, guyanaTZ)], TRANSACTION_SCHEMA)
+                    loaded["cursor"] = cursor
+                    st.rerun()
+
+                # EXPORT - written page by page to a temp file, never held in memory as one frame
+                colE1, colE2 = st.columns(2)
+                with colE1:
+                    exportFormat = st.radio("Export Format", ["csv", "parquet"], horizontal=True)
+                with colE2:
+                    if st.button("Prepare Export"):
+                        import tempfile
+                        exportPath = os.path.join(tempfile.gettempdir(), f"gse-transactions-{USER_ID}.{exportFormat}")
+                        exportCount = exportTransactions(USER_ID, exportPath, exportFormat, **histFilters)
+                        st.session_state.hist_export = (exportPath, exportCount, exportFormat)
+                if 'hist_export' in st.session_state:
+                    exportPath, exportCount, exportFormat = st.session_state.hist_export
+                    with open(exportPath, "rb") as f:
+                        st.download_button(
+                            f"Download {exportCount:,} Trades ({exportFormat.upper()})", f,
+                            file_name=f"transactions.{exportFormat}",
+                            mime="text/csv" if exportFormat == "csv" else "application/octet-stream"
+                        )
+            else:
+                st.info("No trades match these filters.")
         else:
-            st.warning("Profile could not be loaded.")
+            st.warning("You are not a member of this league.")
 
     # --- LEADERBOARD ---
     elif choice == "🏆 Leaderboard":
-        st.subheader("Global Rankings")
-        rankings = getLeaderboard()
+        st.subheader(f"{league['name']} Rankings")
+        myRank = getUserRank(USER_ID, LEAGUE_ID)
+        colR1, colR2 = st.columns(2)
+        with colR1:
+            if myRank:
+                st.metric("Your Rank", f"#{myRank['rank']:,}")
+        with colR2:
+            page = st.number_input("Page", min_value=1, step=1, value=1)
+
+        rankings = getLeaderboard(LEADERBOARD_PAGE_SIZE, (page - 1) * LEADERBOARD_PAGE_SIZE, LEAGUE_ID)
         if rankings:
-            dfLeaderboard = pd.DataFrame(rankings)
-            dfLeaderboard.index = dfLeaderboard.index + 1
+            dfLeaderboard = pd.DataFrame(rankings).set_index("rank")
             dfLeaderboard.index.name = "Rank"
             dfLeaderboard['total_net_worth'] = dfLeaderboard['total_net_worth'].apply(lambda x: f"${x:,.2f} GYD")
             display_cols = ["username", "total_net_worth"]
@@ -394,9 +785,64 @@ else:
 
             st.altair_chart(chartLB, use_container_width=True)
             #st.bar_chart(data=dfLeaderboard.head(5), x="username", y="stock_value", color="#00ff88")
+
+            # --- MOVERS & RANK HISTORY (from the daily league snapshots) ---
+            risers, fallers = getTopMovers(5, LEAGUE_ID)
+            if risers or fallers:
+                st.write("### Today's Movers")
+                colM1, colM2 = st.columns(2)
+                for col, title, movers in ((colM1, "Climbing", risers), (colM2, "Falling", fallers)):
+                    with col:
+                        st.write(f"**{title}**")
+                        if movers:
+                            st.dataframe(
+                                pd.DataFrame(movers)[["rank", "username", "rank_change"]],
+                                column_config={
+                                    "rank": st.column_config.NumberColumn("Rank", format="#%d"),
+                                    "username": st.column_config.TextColumn("Trader"),
+                                    "rank_change": st.column_config.NumberColumn("Change", format="%+d"),
+                                },
+                                hide_index=True,
+                                use_container_width=True
+                            )
+                        else:
+                            st.caption("No one.")
+
+            dfHistory = getRankHistory(USER_ID, leagueID=LEAGUE_ID)
+            if not dfHistory.empty:
+                st.write("### Your Rank History")
+                chartRank = alt.Chart(dfHistory).mark_line(color='#00ff88', point=True).encode(
+                    x=alt.X('snapshot_date:T', title='DATE'),
+                    # Rank 1 at the top
+                    y=alt.Y('rank:Q', title='RANK', scale=alt.Scale(reverse=True)),
+                    tooltip=[alt.Tooltip('snapshot_date:T', title='Date'), alt.Tooltip('rank:Q', title='Rank'),
+                             alt.Tooltip('net_worth:Q', title='Net Worth', format='$,.2f')]
+                ).properties(
+                    width='container',
+                    height=300
+                ).configure_axis(
+                    titleFont='Inter',
+                    titleFontSize=20,
+                    titleFontWeight=800,
+                    titleColor='#8b949e',
+                    labelFont='JetBrains Mono',
+                    labelFontSize=15,
+                    labelColor='#c9d1d9'
+                ).configure_view(strokeWidth=0)
+                st.altair_chart(chartRank, use_container_width=True)
         else:
             st.info("The leaderboard is currently empty.")
 
     # --- ABOUT ---
     elif choice == "ℹ️ About":
-        renderAboutSection()
\ No newline at end of file
+        renderAboutSection()
+
+    if choice:
+        instrumentation.recordView(choice.split(" ", 1)[-1], time.perf_counter() - viewStart)
+    if profiler is not None:
+        profiler.stop()
+    if os.getenv("GSE_DEBUG"):
+        renderDebugPanel(profiler)
+
+reportTimings()
+instrumentation.finishRun()
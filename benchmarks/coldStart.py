@@ -0,0 +1,55 @@
+"""
+Measures cold-start cost: each case runs in a fresh interpreter, so nothing is
+already in sys.modules. "landing page" is what app.py loads before the first
+render for a visitor. "eager" reproduces the old import-everything-up-front
+startup for comparison.
+
+    python benchmarks/coldStart.py --repeats 5
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "import database": "import database",
+    "database + shared client": "import database; database.getClient()",
+    "landing page": "import streamlit, database; database.createClient()",
+    "dashboard imports": "import pandas, altair, valuation",
+    "eager (previous startup)": (
+        "import streamlit, pandas, pytz, altair; from supabase import create_client; "
+        "import os; create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY']); "
+        "create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY'])"
+    ),
+}
+
+def timeCase(code, repeats):
+    #Median wall time of running `code` in a fresh interpreter, minus the bare interpreter start-up
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "https://offline-benchmark.supabase.co")
+    env.setdefault("SUPABASE_KEY", "offline-benchmark-key")
+    probe = "import time; t = time.perf_counter(); {code}; print((time.perf_counter() - t) * 1000)"
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", probe.format(code=code)], cwd=ROOT, env=env,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return None
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import and client construction timing")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'CASE':<30}{'MEDIAN MS':>12}")
+    for label, code in CASES.items():
+        ms = timeCase(code, args.repeats)
+        print(f"{label:<30}{'failed' if ms is None else f'{ms:.0f}':>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Stand-in for the financegy package with configurable latency and failure rate.
+Install it with `syncStocks.financegy = FakeFinanceGY(...)`.
+"""
+import time
+import random
+import threading
+from datetime import date, datetime, timedelta
+
+HISTORY_EPOCH = date(2015, 1, 1)
+
+class FakeFinanceGY:
+    """
+    Serves `symbols` synthetic securities. Each get_recent_trade() call sleeps
+    for roughly `latency` seconds (+/- `jitter`) and raises with probability
+    `errorRate`, which exercises the sync's timeout and retry handling. The
+    first `inactive` fraction of symbols last traded a month ago and never move.
+    get_historical_trades() serves a daily random walk per symbol, seeded by
+    `seed` and the symbol, so every call for the same range returns the same
+    sessions; inactive symbols only trade every tenth weekday.
+    """
+    def __init__(self, symbols=20, latency=0.3, jitter=0.1, errorRate=0.0, seed=0, inactive=0.0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.securities = [{"symbol": f"SYM{i:03d}", "name": f"Synthetic Company {i}"} for i in range(symbols)]
+        self.prices = {s["symbol"]: round(self.rng.uniform(1, 5000), 2) for s in self.securities}
+        self.inactive = {s["symbol"] for s in self.securities[:int(symbols * inactive)]}
+        self.requests = 0
+        self.seed = seed
+        self._walks = {}
+
+    def _draw(self):
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            failed = self.rng.random() < self.errorRate
+        return delay, failed
+
+    def movePrices(self, fraction=0.3):
+        #Moves a random `fraction` of prices by up to 5%, like a trading session would
+        with self.lock:
+            for symbol in self.prices:
+                if symbol not in self.inactive and self.rng.random() < fraction:
+                    self.prices[symbol] = round(self.prices[symbol] * self.rng.uniform(0.95, 1.05), 2)
+
+    def get_securities(self, use_cache=True):
+        return [dict(s) for s in self.securities]
+
+    def get_recent_trade(self, symbol, use_cache=True):
+        delay, failed = self._draw()
+        time.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Simulated FinanceGY failure for {symbol}")
+        tradeDate = date.today() - timedelta(days=30 if symbol in self.inactive else 0)
+        return {
+            "session": "1",
+            "date": tradeDate.strftime("%d/%m/%Y"),
+            "ltp": f"{self.prices[symbol]:,}",
+        }
+
+    def _walk(self, symbol, end):
+        #Closing prices for every weekday from HISTORY_EPOCH to `end`, extended (never redrawn) on demand
+        with self.lock:
+            if symbol not in self._walks:
+                rng = random.Random(f"{self.seed}:{symbol}")
+                self._walks[symbol] = ([HISTORY_EPOCH], [round(rng.uniform(1, 5000), 2)], rng)
+            days, prices, rng = self._walks[symbol]
+            while days[-1] < end:
+                day = days[-1] + timedelta(days=1)
+                days.append(day)
+                prices.append(round(max(0.01, prices[-1] * rng.uniform(0.97, 1.03)), 2) if day.weekday() < 5 else prices[-1])
+            return days, prices
+
+    def get_historical_trades(self, symbol, start_date, end_date, use_cache=True):
+        delay, failed = self._draw()
+        time.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Simulated FinanceGY failure for {symbol}")
+        start = datetime.strptime(start_date, "%d/%m/%Y").date()
+        end = datetime.strptime(end_date, "%d/%m/%Y").date()
+        days, prices = self._walk(symbol, end)
+        trades = []
+        for i in range(max(0, (start - HISTORY_EPOCH).days), (end - HISTORY_EPOCH).days + 1):
+            day = days[i]
+            if day.weekday() >= 5 or (symbol in self.inactive and i % 10):
+                continue
+            trades.append({"session": str(i), "date": day.strftime("%d/%m/%Y"), "ltp": f"{prices[i]:,}"})
+        return trades
@@ -0,0 +1,41 @@
+"""
+Local stand-in for Supabase Realtime. Attached to a FakeSupabase, it turns
+every write to a published table into a postgres_changes payload and delivers
+it synchronously to livePrices.handleChange.
+
+    publisher = FakeRealtimePublisher(db)
+    livePrices.startPriceFeed(subscribe=publisher.subscribe)
+"""
+from benchmarks.fakeSupabase import nowISO
+
+class FakeRealtimePublisher:
+    def __init__(self, db, tables=("stocks", "leaderboard_ranked")):
+        self.tables = set(tables)
+        self.handlers = []
+        self.published = 0
+        db.listeners.append(self._onWrite)
+
+    def subscribe(self, onChange, onSubscribed):
+        #Same contract as livePrices._subscribeRealtime
+        self.handlers.append(onChange)
+        onSubscribed()
+
+    def _onWrite(self, table, eventType, record, oldRecord):
+        if table not in self.tables:
+            return
+        payload = {
+            "data": {
+                "schema": "public",
+                "table": table,
+                "commit_timestamp": nowISO(),
+                "type": eventType,
+                "errors": None,
+                "columns": [],
+                "record": record,
+                "old_record": oldRecord,
+            },
+            "ids": [],
+        }
+        self.published += 1
+        for handler in self.handlers:
+            handler(payload)
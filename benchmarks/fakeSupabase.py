@@ -0,0 +1,628 @@
+"""
+In-process stand-in for the parts of the Supabase client used by database.py
+and syncStocks.py: PostgREST table queries and the RPC functions defined in the
+schema. Tables are plain lists of dicts kept in memory. Every execute() counts
+as one round trip and can sleep for a simulated network latency, so the
+benchmarks can tell a cache hit apart from a database call.
+"""
+import json
+import time
+import hashlib
+import uuid
+import random
+import threading
+from datetime import datetime, timezone
+from collections import Counter
+
+GLOBAL_LEAGUE = "00000000-0000-0000-0000-000000000000"
+TRADE_PRICE_TOLERANCE = 0.02 #trade_price_tolerance() in the schema
+
+#Primary keys used to resolve upserts
+PRIMARY_KEYS = {
+    "stocks": ("ticker",),
+    "profiles": ("id",),
+    "leagues": ("id",),
+    "league_members": ("league_id", "user_id"),
+    "portfolios": ("league_id", "user_id", "ticker"),
+    "transactions": ("id",),
+    "price_history": ("ticker", "trade_date"),
+    "leaderboard_ranked": ("league_id", "user_id"),
+    "portfolio_analytics": ("league_id", "user_id"),
+    "league_snapshots": ("league_id", "snapshot_date", "user_id"),
+    "standing_orders": ("id",),
+    "order_submissions": ("user_id", "idempotency_key"),
+}
+
+#Tables that carry a league_id (defaulting to the global league, as in the schema)
+LEAGUE_TABLES = ("portfolios", "transactions", "leaderboard_ranked", "portfolio_analytics", "league_snapshots",
+                 "standing_orders")
+
+#Embedded resources: (table, embedded table) -> (local column, foreign column)
+FOREIGN_KEYS = {
+    ("portfolios", "stocks"): ("ticker", "ticker"),
+    ("transactions", "stocks"): ("ticker", "ticker"),
+    ("price_history", "stocks"): ("ticker", "ticker"),
+    ("league_members", "leagues"): ("league_id", "id"),
+}
+
+def nowISO():
+    return datetime.now(timezone.utc).isoformat()
+
+def splitTopLevel(text):
+    #Splits on commas that are not inside parentheses
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+def coerce(value, like):
+    #Converts a filter value from its PostgREST string form to the type of the stored value
+    if isinstance(like, bool):
+        return str(value).lower() == "true"
+    if isinstance(like, (int, float)) and not isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+def compare(op, left, right):
+    if left is None:
+        return op == "is" and str(right).lower() == "null"
+    if op == "is":
+        return False
+    right = coerce(right, left)
+    if op == "eq":
+        return left == right
+    if op == "neq":
+        return left != right
+    if op == "gt":
+        return left > right
+    if op == "gte":
+        return left >= right
+    if op == "lt":
+        return left < right
+    if op == "lte":
+        return left <= right
+    if op == "in":
+        return left in right
+    if op == "ilike":
+        return compare("like", str(left).lower(), str(right).lower())
+    if op == "like":
+        pattern = str(right).replace("\\_", "\0")
+        prefix = pattern.split("%")[0].replace("\0", "_")
+        return str(left).startswith(prefix) if pattern.endswith("%") else str(left) == prefix
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+def parseLogic(text):
+    #Parses a PostgREST or=(...) expression into a predicate over a row
+    terms = []
+    for part in splitTopLevel(text):
+        if part.startswith("and(") or part.startswith("or("):
+            inner = parseLogic(part[part.index("(") + 1:-1])
+            terms.append(("and" if part.startswith("and(") else "or", inner))
+        else:
+            column, op, value = part.split(".", 2)
+            terms.append(("cmp", (column, op, value)))
+
+    def evaluate(row, mode="or"):
+        results = []
+        for kind, payload in terms:
+            if kind == "cmp":
+                column, op, value = payload
+                results.append(compare(op, row.get(column), value))
+            else:
+                results.append(payload(row, kind))
+        return all(results) if mode == "and" else any(results)
+    return evaluate
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+        self.headers = {}
+
+class FakeQuery:
+    #Chainable query builder mirroring the postgrest-py methods the app uses
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.mode = "select"
+        self.columns = "*"
+        self.filters = []
+        self.orders = []
+        self.offset = 0
+        self.maxRows = None
+        self.single = False
+        self.payload = None
+        self.options = {}
+
+    def select(self, columns="*", count=None):
+        self.columns = columns
+        return self
+
+    def insert(self, rows):
+        self.mode, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.mode, self.payload = "upsert", rows
+        self.options = {"on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, values):
+        self.mode, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.mode = "delete"
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append(lambda row: compare(op, row.get(column), value))
+        return self
+
+    def eq(self, column, value): return self._filter(column, "eq", value)
+    def neq(self, column, value): return self._filter(column, "neq", value)
+    def gt(self, column, value): return self._filter(column, "gt", value)
+    def gte(self, column, value): return self._filter(column, "gte", value)
+    def lt(self, column, value): return self._filter(column, "lt", value)
+    def lte(self, column, value): return self._filter(column, "lte", value)
+    def like(self, column, value): return self._filter(column, "like", value)
+    def ilike(self, column, value): return self._filter(column, "ilike", value)
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def or_(self, expression):
+        predicate = parseLogic(expression)
+        self.filters.append(lambda row: predicate(row, "or"))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.maxRows = count
+        return self
+
+    def range(self, start, end):
+        self.offset, self.maxRows = start, end - start + 1
+        return self
+
+    def maybe_single(self):
+        self.single = True
+        return self
+
+    def execute(self):
+        return self.db.respond(self.db.execute(self))
+
+class FakeRPC:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        return self.db.respond(self.db.executeRPC(self.name, self.params))
+
+class FakeSupabase:
+    """
+    Replaces a supabase.Client. `latency` seconds are slept on every execute()
+    to model the network round trip; `calls` counts round trips by target and
+    `rowsReturned` the rows each table's selects sent back. With
+    `lostResponseRate`, that share of successful RPCs commit but then raise a
+    read timeout, as if the response had been lost on the way back.
+    `responseHooks` are called with every response, like httpx's response
+    event hooks, with Content-Length set to the size of its JSON body.
+    """
+    def __init__(self, latency=0.0, lostResponseRate=0.0, seed=0):
+        self.latency = latency
+        self.lostResponseRate = lostResponseRate
+        self.rng = random.Random(seed)
+        self.tables = {name: [] for name in PRIMARY_KEYS}
+        self.tables["leagues"].append({"id": GLOBAL_LEAGUE, "name": "Global League", "slug": "global",
+                                       "starting_cash": 1_000_000.0, "starts_on": "2000-01-01", "ends_on": None,
+                                       "is_public": True, "join_code": "global", "created_by": None,
+                                       "created_at": nowISO()})
+        self.calls = Counter()
+        self.rowsReturned = Counter()
+        self.lock = threading.RLock()
+        self.listeners = [] #Called as listener(table, eventType, record, oldRecord) after every write
+        self.responseHooks = []
+
+    # --- client surface ---
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self, name, params)
+
+    @property
+    def roundTrips(self):
+        return sum(self.calls.values())
+
+    def resetCalls(self):
+        self.calls.clear()
+        self.rowsReturned.clear()
+
+    def respond(self, response):
+        if self.responseHooks:
+            response.headers["content-length"] = str(len(json.dumps(response.data, default=str, separators=(",", ":"))))
+            for hook in self.responseHooks:
+                hook(response)
+        return response
+
+    def _publish(self, table, eventType, record, oldRecord=None):
+        for listener in self.listeners:
+            listener(table, eventType, dict(record), dict(oldRecord or {}))
+
+    # --- query execution ---
+    def _roundTrip(self, key):
+        with self.lock:
+            self.calls[key] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _rows(self, table):
+        if table == "leaderboard":
+            return sorted(self.tables["leaderboard_ranked"], key=lambda r: (-r["total_net_worth"], r["user_id"]))
+        return self.tables.setdefault(table, [])
+
+    def _project(self, table, row, columns):
+        if columns.strip() == "*":
+            return dict(row)
+        result = {}
+        for column in splitTopLevel(columns):
+            if "(" in column:
+                embedded = column[:column.index("(")].strip()
+                local, foreign = FOREIGN_KEYS[(table, embedded)]
+                match = next((r for r in self._rows(embedded) if r.get(foreign) == row.get(local)), None)
+                result[embedded] = self._project(embedded, match, column[column.index("(") + 1:-1]) if match else None
+            else:
+                result[column] = row.get(column)
+        return result
+
+    def _key(self, table, row, onConflict=None):
+        columns = [c.strip() for c in onConflict.split(",")] if onConflict else PRIMARY_KEYS.get(table, ("id",))
+        return tuple(row.get(c) for c in columns)
+
+    def _prepare(self, table, row):
+        row = {k: (nowISO() if v == "now()" else v) for k, v in row.items()}
+        if table in ("transactions", "standing_orders", "leagues"):
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", nowISO())
+        if table == "standing_orders":
+            row.setdefault("status", "open")
+        if table == "leagues":
+            for column, default in (("starts_on", datetime.now(timezone.utc).date().isoformat()), ("ends_on", None),
+                                    ("is_public", True), ("join_code", uuid.uuid4().hex[:10])):
+                row.setdefault(column, default)
+        if table in LEAGUE_TABLES:
+            row.setdefault("league_id", GLOBAL_LEAGUE)
+        return row
+
+    def execute(self, query):
+        self._roundTrip(f"{query.mode}:{query.table}")
+        with self.lock:
+            rows = self._rows(query.table)
+
+            if query.mode in ("insert", "upsert"):
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                index = {self._key(query.table, r, query.options.get("on_conflict")): i for i, r in enumerate(rows)}
+                written = []
+                for row in payload:
+                    row = self._prepare(query.table, row)
+                    key = self._key(query.table, row, query.options.get("on_conflict"))
+                    if key in index and query.mode == "upsert":
+                        if query.options.get("ignore_duplicates"):
+                            continue
+                        old = dict(rows[index[key]])
+                        rows[index[key]].update(row)
+                        written.append(rows[index[key]])
+                        self._publish(query.table, "UPDATE", rows[index[key]], old)
+                    else:
+                        index[key] = len(rows)
+                        rows.append(row)
+                        written.append(row)
+                        self._publish(query.table, "INSERT", row)
+                return FakeResponse([dict(r) for r in written])
+
+            matched = [r for r in rows if all(f(r) for f in query.filters)]
+
+            if query.mode == "update":
+                for r in matched:
+                    old = dict(r)
+                    r.update(query.payload)
+                    self._publish(query.table, "UPDATE", r, old)
+                return FakeResponse([dict(r) for r in matched])
+
+            if query.mode == "delete":
+                matchedIds = {id(r) for r in matched}
+                rows[:] = [r for r in rows if id(r) not in matchedIds]
+                for r in matched:
+                    self._publish(query.table, "DELETE", {}, r)
+                return FakeResponse([dict(r) for r in matched])
+
+            for column, desc in reversed(query.orders):
+                matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+            end = None if query.maxRows is None else query.offset + query.maxRows
+            data = [self._project(query.table, r, query.columns) for r in matched[query.offset:end]]
+            self.rowsReturned[query.table] += len(data)
+
+        if query.single:
+            return FakeResponse(data[0] if data else None)
+        return FakeResponse(data)
+
+    # --- RPC functions, mirroring the SQL in supabase/migrations ---
+    def executeRPC(self, name, params):
+        self._roundTrip(f"rpc:{name}")
+        handler = getattr(self, f"_rpc_{name}", None)
+        if handler is None:
+            raise Exception(f"Could not find the function public.{name}")
+        with self.lock:
+            response = FakeResponse(handler(**params))
+            lost = self.lostResponseRate and self.rng.random() < self.lostResponseRate
+        if lost:
+            import httpx
+            raise httpx.ReadTimeout(f"Simulated lost response from {name}")
+        return response
+
+    def _member(self, userID, leagueID):
+        member = next((m for m in self.tables["league_members"]
+                       if m["league_id"] == leagueID and m["user_id"] == userID), None)
+        if member is None:
+            raise Exception("Not a member of this league")
+        return member
+
+    def _openLeague(self, leagueID):
+        today = datetime.now(timezone.utc).date().isoformat()
+        league = next((l for l in self.tables["leagues"] if l["id"] == leagueID), None)
+        if league is None or league["starts_on"] > today or (league["ends_on"] and league["ends_on"] < today):
+            raise Exception("This league is not open for trading")
+        return league
+
+    def _holding(self, userID, ticker, leagueID):
+        return next((h for h in self.tables["portfolios"]
+                     if h["league_id"] == leagueID and h["user_id"] == userID and h["ticker"] == ticker), None)
+
+    def _recordTransaction(self, userID, ticker, kind, quantity, price, leagueID):
+        self.tables["transactions"].append(self._prepare("transactions", {
+            "league_id": leagueID, "user_id": userID, "ticker": ticker, "type": kind,
+            "quantity": quantity, "price": price, "total_value": quantity * price
+        }))
+
+    def _checkedPrice(self, ticker, price):
+        #checked_trade_price(): the synced price, if the submitted one is within the tolerance of it
+        if price is None or price <= 0:
+            raise Exception("Quantity and price must be positive")
+        current = next((s["current_price"] for s in self.tables["stocks"] if s["ticker"] == ticker), None)
+        if not current or current <= 0:
+            raise Exception(f"Unknown ticker {ticker}")
+        if abs(price - current) > current * TRADE_PRICE_TOLERANCE:
+            raise Exception(f"Price of {ticker} has moved to {current} since you loaded it (you saw {price}). "
+                            "Review the order and resubmit")
+        return current
+
+    def _claim(self, userID, key, leagueID, kind, payload):
+        #claim_order_submission(): None for a new key, else the stored result of the call that used it
+        if key is None:
+            return None
+        payloadHash = hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        stored = next((r for r in self.tables["order_submissions"]
+                       if r["user_id"] == userID and r["idempotency_key"] == key), None)
+        if stored is None:
+            self.tables["order_submissions"].append({"user_id": userID, "idempotency_key": key, "league_id": leagueID,
+                                                     "kind": kind, "payload_hash": payloadHash, "result": None,
+                                                     "created_at": nowISO()})
+            return None
+        if stored["league_id"] != leagueID or stored["kind"] != kind or stored["payload_hash"] != payloadHash:
+            raise Exception("This order key was already used for a different order")
+        return dict(stored["result"], duplicate=True)
+
+    def _storeResult(self, userID, key, result):
+        for r in self.tables["order_submissions"]:
+            if r["user_id"] == userID and r["idempotency_key"] == key:
+                r["result"] = result
+
+    def _submit(self, userID, key, leagueID, kind, payload, trade):
+        #Runs trade() under a claimed key; a failure releases the claim, like the rolled-back SQL transaction
+        stored = self._claim(userID, key, leagueID, kind, payload)
+        if stored is not None:
+            return stored
+        try:
+            result = trade()
+        except Exception:
+            self.tables["order_submissions"][:] = [r for r in self.tables["order_submissions"]
+                                                   if (r["user_id"], r["idempotency_key"]) != (userID, key)]
+            raise
+        self._storeResult(userID, key, result)
+        return result
+
+    def _buy(self, userID, ticker, quantity, price, leagueID):
+        member = self._member(userID, leagueID)
+        cost = quantity * price
+        if member["cash_balance"] < cost:
+            raise Exception("Insufficient funds")
+        member["cash_balance"] -= cost
+        holding = self._holding(userID, ticker, leagueID)
+        if holding is None:
+            self.tables["portfolios"].append({"league_id": leagueID, "user_id": userID, "ticker": ticker,
+                                              "shares_count": quantity, "avg_price": price})
+        else:
+            total = holding["shares_count"] + quantity
+            holding["avg_price"] = (holding["shares_count"] * holding["avg_price"] + cost) / total
+            holding["shares_count"] = total
+        self._recordTransaction(userID, ticker, "BUY", quantity, price, leagueID)
+        self._rpc_refresh_leaderboard_user(userID, leagueID)
+
+    def _sell(self, userID, ticker, quantity, price, leagueID):
+        member = self._member(userID, leagueID)
+        holding = self._holding(userID, ticker, leagueID)
+        if holding is None or holding["shares_count"] < quantity:
+            raise Exception("Insufficient shares")
+        holding["shares_count"] -= quantity
+        if holding["shares_count"] == 0:
+            self.tables["portfolios"].remove(holding)
+        member["cash_balance"] += quantity * price
+        self._recordTransaction(userID, ticker, "SELL", quantity, price, leagueID)
+        self._rpc_refresh_leaderboard_user(userID, leagueID)
+
+    def _singleOrder(self, side, userID, ticker, quantity, price, leagueID, key):
+        def trade():
+            self._openLeague(leagueID)
+            if quantity is None or quantity <= 0:
+                raise Exception("Quantity and price must be positive")
+            fill = self._checkedPrice(ticker, price)
+            (self._buy if side == "buy" else self._sell)(userID, ticker, quantity, fill, leagueID)
+            return {"status": "filled", "ticker": ticker, "quantity": quantity, "price": fill,
+                    "total_value": quantity * fill, "duplicate": False}
+        return self._submit(userID, key, leagueID, side, {"ticker": ticker, "quantity": quantity}, trade)
+
+    def _rpc_execute_buy_order(self, p_user_id, p_ticker, p_quantity, p_price, p_league_id, p_idempotency_key=None):
+        return self._singleOrder("buy", p_user_id, p_ticker, p_quantity, p_price, p_league_id, p_idempotency_key)
+
+    def _rpc_execute_sell_order(self, p_user_id, p_ticker, p_quantity, p_price, p_league_id, p_idempotency_key=None):
+        return self._singleOrder("sell", p_user_id, p_ticker, p_quantity, p_price, p_league_id, p_idempotency_key)
+
+    def _rpc_execute_batch_order(self, p_user_id, p_legs, p_league_id, p_idempotency_key=None):
+        def trade():
+            self._openLeague(p_league_id)
+            member = self._member(p_user_id, p_league_id)
+            if not p_legs:
+                raise Exception("Basket is empty")
+            fills, net = {}, 0.0
+            for i, leg in enumerate(p_legs, 1):
+                if leg["side"] not in ("buy", "sell"):
+                    raise Exception(f"Leg {i}: side must be buy or sell")
+                if leg["quantity"] <= 0:
+                    raise Exception(f"Leg {i}: quantity and price must be positive")
+                try:
+                    fills[i] = self._checkedPrice(leg["ticker"], leg["price"])
+                except Exception as e:
+                    raise Exception(f"Leg {i}: {e}")
+                net += leg["quantity"] * fills[i] * (1 if leg["side"] == "sell" else -1)
+            if member["cash_balance"] + net < 0:
+                raise Exception(f"Insufficient funds: basket needs {-(member['cash_balance'] + net)} more GYD")
+
+            # Check every sell against the holdings before touching anything, so a failure leaves no partial basket
+            selling = Counter()
+            for i, leg in enumerate(p_legs, 1):
+                if leg["side"] == "sell":
+                    selling[leg["ticker"]] += leg["quantity"]
+                    holding = self._holding(p_user_id, leg["ticker"], p_league_id)
+                    if holding is None or holding["shares_count"] < selling[leg["ticker"]]:
+                        raise Exception(f"Leg {i}: insufficient shares of {leg['ticker']}")
+
+            ordered = sorted(enumerate(p_legs, 1), key=lambda pair: (pair[1]["side"] == "buy", pair[0]))
+            results = {}
+            for i, leg in ordered:
+                # Sells run first and the net check passed, so no buy below can run out of cash
+                (self._buy if leg["side"] == "buy" else self._sell)(p_user_id, leg["ticker"], leg["quantity"],
+                                                                   fills[i], p_league_id)
+                results[i] = dict(leg, leg=i, price=fills[i], total_value=leg["quantity"] * fills[i], status="filled")
+            return {"legs": [results[i] for i in sorted(results)]}
+        payload = [{"side": str(leg.get("side")).lower(), "ticker": leg.get("ticker"), "quantity": leg.get("quantity")}
+                   for leg in p_legs or []]
+        stored = self._submit(p_user_id, p_idempotency_key, p_league_id, "batch", payload, trade)
+        return [dict(leg, duplicate=True) for leg in stored["legs"]] if stored.get("duplicate") else stored["legs"]
+
+    def _rpc_execute_standing_orders(self, p_fills):
+        orders = {o["id"]: o for o in self.tables["standing_orders"] if o.get("status") == "open"}
+        results = []
+        for fill in p_fills or []:
+            order, price = orders.pop(fill["id"], None), fill["price"]
+            if order is None or not price or price <= 0 \
+                    or (order["direction"] == "above" and price < order["trigger_price"]) \
+                    or (order["direction"] == "below" and price > order["trigger_price"]):
+                continue
+            status, message = ("triggered" if order["kind"] == "alert" else "filled"), None
+            try:
+                # _buy and _sell check cash or shares before writing anything, like the SQL savepoint
+                if order["side"] in ("buy", "sell"):
+                    self._openLeague(order["league_id"])
+                    (self._buy if order["side"] == "buy" else self._sell)(order["user_id"], order["ticker"],
+                                                                         order["quantity"], price, order["league_id"])
+            except Exception as e:
+                status, message = "rejected", str(e)
+            order.update(status=status, filled_price=price if status == "filled" else None, message=message,
+                         closed_at=nowISO())
+            results.append({"id": order["id"], "status": status, "message": message})
+        return results
+
+    def _netWorthRow(self, member, stockValue):
+        return {"league_id": member["league_id"], "user_id": member["user_id"], "username": member.get("username"),
+                "cash_balance": member["cash_balance"], "stock_value": stockValue,
+                "total_net_worth": member["cash_balance"] + stockValue, "updated_at": nowISO()}
+
+    def _rpc_refresh_leaderboard_user(self, p_user_id, p_league_id):
+        prices = {s["ticker"]: s["current_price"] for s in self.tables["stocks"]}
+        stockValue = sum(h["shares_count"] * prices.get(h["ticker"], 0) for h in self.tables["portfolios"]
+                         if h["league_id"] == p_league_id and h["user_id"] == p_user_id)
+        row = self._netWorthRow(self._member(p_user_id, p_league_id), stockValue)
+        ranked = self.tables["leaderboard_ranked"]
+        ranked[:] = [r for r in ranked if (r["league_id"], r["user_id"]) != (p_league_id, p_user_id)] + [row]
+        self._publish("leaderboard_ranked", "UPDATE", row)
+        return None
+
+    def _rpc_refresh_leaderboard(self):
+        prices = {s["ticker"]: s["current_price"] for s in self.tables["stocks"]}
+        stockValues = Counter()
+        for h in self.tables["portfolios"]:
+            stockValues[(h["league_id"], h["user_id"])] += h["shares_count"] * prices.get(h["ticker"], 0)
+        self.tables["leaderboard_ranked"] = [self._netWorthRow(m, stockValues[(m["league_id"], m["user_id"])])
+                                             for m in self.tables["league_members"]]
+        return len(self.tables["leaderboard_ranked"])
+
+    def _rpc_get_leaderboard_rank(self, p_user_id, p_league_id):
+        ranked = [r for r in self.tables["leaderboard_ranked"] if r["league_id"] == p_league_id]
+        me = next((r for r in ranked if r["user_id"] == p_user_id), None)
+        if me is None:
+            return []
+        above = sum(1 for r in ranked if (-r["total_net_worth"], r["user_id"]) < (-me["total_net_worth"], me["user_id"]))
+        return [{"rank": above + 1, "total_net_worth": me["total_net_worth"], "total_players": len(ranked)}]
+
+    def _rpc_create_league(self, p_user_id, p_name, p_slug, p_starting_cash, p_starts_on=None, p_ends_on=None,
+                           p_is_public=True):
+        if any(l["slug"] == p_slug for l in self.tables["leagues"]):
+            raise Exception('duplicate key value violates unique constraint "leagues_slug_key"')
+        league = {"id": str(uuid.uuid4()), "name": p_name, "slug": p_slug, "starting_cash": p_starting_cash,
+                  "starts_on": p_starts_on or datetime.now(timezone.utc).date().isoformat(), "ends_on": p_ends_on,
+                  "is_public": p_is_public, "join_code": uuid.uuid4().hex[:10], "created_by": p_user_id,
+                  "created_at": nowISO()}
+        self.tables["leagues"].append(league)
+        self._rpc_join_league(p_user_id, league["id"])
+        return league["id"]
+
+    def _rpc_join_league(self, p_user_id, p_league_id=None, p_code=None):
+        today = datetime.now(timezone.utc).date().isoformat()
+        if p_league_id is None:
+            league = next((l for l in self.tables["leagues"] if l.get("join_code") == p_code), None)
+        else:
+            league = next((l for l in self.tables["leagues"] if l["id"] == p_league_id), None)
+        if league is None or (league["ends_on"] and league["ends_on"] < today):
+            raise Exception("League not found or already finished")
+        if not league["is_public"] and league["created_by"] != p_user_id and p_code != league.get("join_code"):
+            raise Exception("This league is private: join it with its invite code")
+        profile = next((p for p in self.tables["profiles"] if p["id"] == p_user_id), None)
+        members = self.tables["league_members"]
+        if profile is None or any(m["league_id"] == league["id"] and m["user_id"] == p_user_id for m in members):
+            return league["id"]
+        member = {"league_id": league["id"], "user_id": p_user_id, "username": profile.get("username"),
+                  "cash_balance": float(league["starting_cash"]), "joined_at": nowISO()}
+        members.append(member)
+        self._rpc_refresh_leaderboard_user(p_user_id, league["id"])
+        return league["id"]
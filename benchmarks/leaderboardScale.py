@@ -0,0 +1,89 @@
+"""
+Seeds synthetic players into the materialized leaderboard and times the read
+paths in database.py as the table grows, to show that top-N reads, deep keyset
+pages and "my rank" stay flat with N.
+
+Writes need a service-role key (SUPABASE_SERVICE_KEY) because leaderboard_ranked
+is read-only under RLS. Synthetic rows use the 'bench_' username prefix and are
+removed at the end unless --keep is passed. A full refresh_leaderboard() also
+removes them, since they have no matching league membership.
+
+    python benchmarks/leaderboardScale.py --sizes 1000 10000 100000
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase import create_client
+import database
+
+SEED_CHUNK_SIZE = 1000
+
+def seedPlayers(admin, count, rng):
+    #Bulk-inserts `count` synthetic players in chunks
+    for start in range(0, count, SEED_CHUNK_SIZE):
+        rows = []
+        for _ in range(min(SEED_CHUNK_SIZE, count - start)):
+            cash = round(rng.uniform(0, 1_000_000), 2)
+            stocks = round(rng.lognormvariate(13, 1), 2)
+            rows.append({
+                "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "username": f"bench_{rng.getrandbits(32):08x}",
+                "cash_balance": cash,
+                "stock_value": stocks,
+                "total_net_worth": round(cash + stocks, 2)
+            })
+        admin.table("leaderboard_ranked").insert(rows).execute()
+
+def timeCall(fn, repeats):
+    #Median wall time of fn() in milliseconds
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def measure(total, repeats):
+    top = database.getLeaderboard.uncached(10, 0)
+    # Use a player from the middle of the table for the deep-page and rank reads
+    middle = database.getLeaderboard.uncached(1, total // 2)
+    probe = middle[0] if middle else top[-1]
+    return {
+        "top10": timeCall(lambda: database.getLeaderboard.uncached(10, 0), repeats),
+        "offsetDeep": timeCall(lambda: database.getLeaderboard.uncached(10, total // 2), repeats),
+        "keysetDeep": timeCall(lambda: database.getLeaderboardAfter(probe["total_net_worth"], probe["user_id"], 10), repeats),
+        "myRank": timeCall(lambda: database.getUserRank.uncached(probe["user_id"]), repeats),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard read latency vs. number of players")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Leave the synthetic players in place")
+    args = parser.parse_args()
+
+    admin = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+    rng = random.Random(args.seed)
+    seeded = 0
+
+    print(f"{'PLAYERS':>10}{'TOP10':>10}{'OFFSET':>10}{'KEYSET':>10}{'MY RANK':>10}   (median ms)")
+    try:
+        for size in sorted(args.sizes):
+            seedPlayers(admin, size - seeded, rng)
+            seeded = size
+            r = measure(size, args.repeats)
+            print(f"{size:>10,}{r['top10']:>10.1f}{r['offsetDeep']:>10.1f}{r['keysetDeep']:>10.1f}{r['myRank']:>10.1f}")
+    finally:
+        if not args.keep:
+            admin.table("leaderboard_ranked").delete().like("username", "bench\\_%").execute()
+
+if __name__ == "__main__":
+    main()
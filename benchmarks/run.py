@@ -0,0 +1,922 @@
+"""
+Offline benchmark suite for the sync, page-load and trade hot paths.
+
+database.py and syncStocks.py run unchanged against an in-memory stand-in for
+Supabase (benchmarks/fakeSupabase.py) and a fake FinanceGY with configurable
+latency and error rate (benchmarks/fakeFinancegy.py). No network access or
+credentials are needed.
+
+    python benchmarks/run.py                         # all scenarios, results/<commit>.json
+    python benchmarks/run.py --scenarios sync --workers 1 8 16
+    python benchmarks/run.py --compare benchmarks/results/abc1234.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import date, datetime, timedelta, timezone, time as dayTime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Point the modules under test at a dummy project in case anything builds a real client
+os.environ.setdefault("SUPABASE_URL", "https://offline-benchmark.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "offline-benchmark-key")
+os.environ["PRICE_HISTORY_CACHE_DIR"] = tempfile.mkdtemp(prefix="gse-bench-")
+os.environ["SYNC_CACHE_FILE"] = os.path.join(tempfile.mkdtemp(prefix="gse-bench-"), "financegy.json")
+
+import database
+import syncStocks
+import livePrices
+import analytics
+import instrumentation
+import frames
+from valuation import valuePortfolio, valueLeague, rankLeague
+from orders import OrderBook, triggerDirection
+from benchmarks.fakeSupabase import FakeSupabase, nowISO, GLOBAL_LEAGUE
+from benchmarks.fakeFinancegy import FakeFinanceGY
+from benchmarks.fakeRealtime import FakeRealtimePublisher
+from benchmarks.tradeLedger import stressOrders, reconcileTrades
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def gitCommit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def useDatabase(db):
+    #Routes database.py and syncStocks.py through the fake client and starts from empty caches
+    database.supabase = db
+    syncStocks.supabase = db
+    database.clearCaches()
+    database.resetCacheStats()
+    shutil.rmtree(database.HISTORY_CACHE_DIR, ignore_errors=True)
+
+def seedLeague(db, stocks, users, holdings, trades, historyDays, rng):
+    """
+    Fills the fake database with `stocks` tickers (with `historyDays` of price
+    history), `users` profiles each holding `holdings` tickers, and `trades`
+    past transactions per user. Returns the user ids.
+    """
+    today = date.today()
+    tickers = [f"SYM{i:03d}" for i in range(stocks)]
+    for t in tickers:
+        price = round(rng.uniform(1, 5000), 2)
+        db.tables["stocks"].append({"ticker": t, "name": f"Synthetic Company {t}", "current_price": price,
+                                    "last_updated": nowISO()})
+        for d in range(historyDays, 0, -1):
+            db.tables["price_history"].append({"ticker": t, "trade_date": (today - timedelta(days=d)).isoformat(),
+                                               "session": str(d), "price": round(price * rng.uniform(0.9, 1.1), 2)})
+
+    userIDs = [f"00000000-0000-0000-0000-{i:012d}" for i in range(users)]
+    for u in userIDs:
+        db.tables["profiles"].append({"id": u, "username": f"player{u[-6:]}"})
+    seedMembers(db, GLOBAL_LEAGUE, userIDs, tickers, holdings, trades, rng)
+    db.executeRPC("refresh_leaderboard", {})
+    db.resetCalls()
+    return userIDs
+
+def seedMembers(db, leagueID, userIDs, tickers, holdings, trades, rng, startingCash=1_000_000.0):
+    #Enrolls `userIDs` in a league with `holdings` tickers each and `trades` past transactions per user
+    for u in userIDs:
+        db.tables["league_members"].append({"league_id": leagueID, "user_id": u, "username": f"player{u[-6:]}",
+                                            "cash_balance": startingCash, "joined_at": nowISO()})
+        for t in rng.sample(tickers, min(holdings, len(tickers))):
+            db.tables["portfolios"].append({"league_id": leagueID, "user_id": u, "ticker": t,
+                                            "shares_count": rng.randint(1, 500), "avg_price": round(rng.uniform(1, 5000), 2)})
+        for k in range(trades):
+            t = rng.choice(tickers)
+            qty = rng.randint(1, 100)
+            price = round(rng.uniform(1, 5000), 2)
+            stamp = (datetime.now(timezone.utc) - timedelta(minutes=k)).isoformat()
+            db.tables["transactions"].append({"id": f"{leagueID[-8:]}-{u}-{k}", "league_id": leagueID, "user_id": u,
+                                              "ticker": t, "type": rng.choice(["BUY", "SELL"]), "quantity": qty,
+                                              "price": price, "total_value": qty * price, "created_at": stamp})
+
+# --- scenarios ---
+
+def scenarioSync(args):
+    """
+    Sync wall time for each worker-pool size: an initial run, an incremental
+    run that refetches after prices move (unchanged payloads skip the upsert)
+    and a rerun inside the trade TTL that is served from the FinanceGY cache.
+    """
+    results = {}
+    for workers in args.workers:
+        db = FakeSupabase(latency=args.db_latency)
+        useDatabase(db)
+        fake = FakeFinanceGY(args.symbols, args.fetch_latency, args.fetch_jitter, args.error_rate, seed=args.seed)
+        syncStocks.financegy = fake
+        cache = syncStocks.FetchCache(os.path.join(tempfile.mkdtemp(prefix="gse-cache-"), "financegy.json"))
+        runs = {}
+        for label, refresh in (("initial", False), ("incremental", True), ("cached", False)):
+            db.resetCalls()
+            cache.resetStats()
+            requestsBefore = fake.requests
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                written = syncStocks.syncMarketData(maxWorkers=workers, timeout=args.fetch_timeout, retries=args.retries,
+                                                    refresh=refresh, cache=cache)
+            elapsed = time.perf_counter() - start
+            lookups = cache.stats["hits"] + cache.stats["misses"]
+            runs[label] = {
+                "seconds": elapsed,
+                "symbolsPerSecond": args.symbols / elapsed if elapsed else None,
+                "rowsWritten": len(written),
+                "dbRoundTrips": db.roundTrips,
+                "financegyRequests": fake.requests - requestsBefore,
+                "cacheHitRate": cache.stats["hits"] / lookups if lookups else None,
+                "cacheBytesSaved": cache.stats["bytesSaved"],
+                "unchangedPayloads": cache.stats["unchanged"],
+            }
+            if label == "initial":
+                fake.movePrices()
+        results[f"workers={workers}"] = runs
+    return results
+
+def scenarioDaemon(args):
+    """
+    One simulated trading day driven through syncStocks.runDaemon on a fake
+    clock. Counts FinanceGY requests against polling every symbol every
+    SYNC_MIN_INTERVAL, checks how stale 'stocks' is every 15 minutes of the
+    session and how many symbols a mid-session restart re-fetches.
+    """
+    calendar = syncStocks.MarketCalendar("Mon,Tue,Wed,Thu,Fri", "09:30", "14:30", "")
+    monday = date.today() + timedelta(days=-date.today().weekday() % 7)
+    opens, closes = calendar.sessionBounds(monday)
+    midday = opens + (closes - opens) / 2
+    statePath = os.path.join(tempfile.mkdtemp(prefix="gse-daemon-"), "sync_state.json")
+
+    db = FakeSupabase(latency=0)
+    useDatabase(db)
+    fake = FakeFinanceGY(args.symbols, 0, 0, 0, seed=args.seed, inactive=args.inactive)
+    syncStocks.financegy = fake
+    clock = {"now": datetime.combine(monday, dayTime(8, 0), syncStocks.guyanaTZ), "tick": opens}
+    checks, staleSymbols = 0, 0
+
+    def sleep(seconds):
+        #Advances the fake clock; prices move and freshness is sampled every 15 minutes of session
+        nonlocal checks, staleSymbols
+        target = clock["now"] + timedelta(seconds=seconds)
+        while clock["tick"] <= min(target, closes):
+            clock["now"] = clock["tick"]
+            stored = {r["ticker"]: r["current_price"] for r in db.tables["stocks"]}
+            checks += 1
+            staleSymbols += sum(stored.get(sym) != price for sym, price in fake.prices.items())
+            fake.movePrices(args.move_fraction)
+            clock["tick"] += timedelta(minutes=15)
+        clock["now"] = target
+
+    options = dict(calendar=calendar, clock=lambda: clock["now"], sleep=sleep, maxWorkers=8, timeout=args.fetch_timeout, retries=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        syncStocks.runDaemon(statePath, until=midday, **options)
+        beforeRestart = fake.requests
+        clock["now"] = midday
+        # A restart at midday only fetches what the saved schedule says is due
+        syncStocks.runDaemon(statePath, until=midday + timedelta(seconds=1), **options)
+        restartFetches = fake.requests - beforeRestart
+        syncStocks.runDaemon(statePath, until=clock["now"] + timedelta(days=1), **options)
+
+    sessionSeconds = (closes - opens).total_seconds()
+    fixedPolling = args.symbols * int(sessionSeconds // syncStocks.MIN_INTERVAL)
+    return {
+        "financegyRequests": fake.requests,
+        "fixedIntervalRequests": fixedPolling,
+        "requestReduction": fixedPolling / fake.requests if fake.requests else None,
+        "staleSymbolFraction": staleSymbols / (checks * args.symbols) if checks else None,
+        "restartFetches": restartFetches,
+        "symbols": args.symbols,
+    }
+
+VIEWS = {
+    "Market Prices": lambda userID: database.getRecentPriceHistory(
+        tuple(sorted(s["ticker"] for s in database.getAllStocks()))),
+    "My Portfolio": lambda userID: (
+        database.getMembership(userID),
+        valuePortfolio(database.getUserPortfolio(userID) or []),
+        database.getTransactionPage(userID, database.TRANSACTION_PAGE_SIZE)),
+    "Leaderboard": lambda userID: (database.getUserRank(userID), database.getLeaderboard(10, 0)),
+}
+
+def scenarioPageLoad(args):
+    #Data-loading time and round trips per dashboard view, on a cold cache and on warm reruns
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    db.responseHooks.append(instrumentation.recordResponseBytes) #What database.getHttpClient() installs on the real pool
+    userIDs = seedLeague(db, args.symbols, args.users, args.holdings, args.trades, args.history_days, rng)
+    results = {}
+    for view, load in VIEWS.items():
+        useDatabase(db)
+        userID = rng.choice(userIDs)
+
+        db.resetCalls()
+        instrumentation.startRun(view)
+        start = time.perf_counter()
+        load(userID)
+        cold = {"ms": (time.perf_counter() - start) * 1000, "dbRoundTrips": db.roundTrips}
+        traced = instrumentation.finishRun(path=None)
+        cold.update(dbMs=traced["dbMs"], rows=traced["rows"], payloadBytes=traced["bytes"])
+
+        db.resetCalls()
+        samples = []
+        for _ in range(args.reruns):
+            start = time.perf_counter()
+            load(rng.choice(userIDs) if args.mixed_users else userID)
+            samples.append((time.perf_counter() - start) * 1000)
+        warm = {"medianMs": statistics.median(samples), "dbRoundTripsPerRender": db.roundTrips / args.reruns}
+
+        results[view] = {"cold": cold, "warm": warm, "cache": database.getCacheStats()}
+    return results
+
+def scenarioTrades(args):
+    #Sustained buy/sell throughput through placeBuyOrder/placeSellOrder
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    userIDs = seedLeague(db, args.symbols, args.users, args.holdings, 0, 0, rng)
+    useDatabase(db)
+    prices = {s["ticker"]: s["current_price"] for s in db.tables["stocks"]}
+    holdings = [(h["user_id"], h["ticker"]) for h in db.tables["portfolios"]]
+
+    orders = []
+    for i in range(args.orders):
+        if i % 2 == 0:
+            userID, ticker = rng.choice(userIDs), rng.choice(list(prices))
+            orders.append((database.placeBuyOrder, userID, ticker))
+        else:
+            userID, ticker = rng.choice(holdings)
+            orders.append((database.placeSellOrder, userID, ticker))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.trade_threads) as pool:
+        outcomes = list(pool.map(lambda o: o[0](o[1], o[2], 1, prices[o[2]]), orders))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for ok, _ in outcomes if ok)
+    return {
+        "orders": args.orders,
+        "succeeded": succeeded,
+        "seconds": elapsed,
+        "tradesPerSecond": succeeded / elapsed if elapsed else None,
+        "dbRoundTripsPerOrder": db.roundTrips / args.orders,
+    }
+
+def scenarioBasket(args):
+    #N single-order RPCs against one placeBatchOrder call carrying the same N legs
+    results = {}
+    for legs in args.basket_legs:
+        rng = random.Random(args.seed)
+        db = FakeSupabase(latency=args.db_latency)
+        userIDs = seedLeague(db, max(args.symbols, legs), 2, 0, 0, 0, rng)
+        useDatabase(db)
+        basket = [{"side": "buy", "ticker": s["ticker"], "quantity": 1, "price": s["current_price"]}
+                  for s in db.tables["stocks"][:legs]]
+
+        db.resetCalls()
+        start = time.perf_counter()
+        for leg in basket:
+            database.placeBuyOrder(userIDs[0], leg["ticker"], leg["quantity"], leg["price"])
+        single = {"ms": (time.perf_counter() - start) * 1000, "dbRoundTrips": db.roundTrips}
+
+        db.resetCalls()
+        start = time.perf_counter()
+        success, _, _ = database.placeBatchOrder(userIDs[1], basket)
+        batch = {"ms": (time.perf_counter() - start) * 1000, "dbRoundTrips": db.roundTrips, "filled": success}
+
+        results[f"legs={legs}"] = {"singleOrders": single, "batchOrder": batch,
+                                   "speedup": single["ms"] / batch["ms"] if batch["ms"] else None}
+    return results
+
+def scenarioLiveReads(args):
+    """
+    Market-view reads for S open sessions rerunning R times while prices move.
+    Each render reads the prices and the 90-day history behind the daily
+    change. "poll" is the old uncached read of both on every rerun, "cached"
+    the sync-stamp caches and "push" the live snapshot fed by the local
+    Realtime stand-in (history still from the sync-stamp cache). A render is
+    stale when it shows an older price than the database holds.
+    """
+    start90 = date.today() - timedelta(days=90)
+    readers = {
+        "poll": lambda tickers: (database.getAllStocks.uncached(), database.getPriceHistory(tickers, start=start90)),
+        "cached": lambda tickers: (database.getAllStocks(), database.getRecentPriceHistory(tickers)),
+        "push": lambda tickers: (livePrices.getLivePrices(), database.getRecentPriceHistory(tickers)),
+    }
+    results = {}
+    for mode, read in readers.items():
+        rng = random.Random(args.seed)
+        db = FakeSupabase(latency=args.db_latency)
+        seedLeague(db, args.symbols, 2, 0, 0, 0, rng)
+        useDatabase(db)
+        livePrices.resetPriceFeed()
+        if mode == "push":
+            livePrices.startPriceFeed(subscribe=FakeRealtimePublisher(db).subscribe)
+        tickers = tuple(sorted(s["ticker"] for s in db.tables["stocks"]))
+        updateEvery = max(1, args.reruns // max(1, args.price_updates))
+
+        db.resetCalls()
+        stale = 0
+        start = time.perf_counter()
+        for rerun in range(args.reruns):
+            if rerun and rerun % updateEvery == 0:
+                # A sync lands between reruns; only the sessions' selects are counted below
+                ticker = rng.choice(tickers)
+                db.table("stocks").update({"current_price": round(rng.uniform(1, 500), 2)}).eq("ticker", ticker).execute()
+            latest = {s["ticker"]: s["current_price"] for s in db.tables["stocks"]}
+            for _ in range(args.sessions):
+                shown = {s["ticker"]: s["current_price"] for s in read(tickers)[0]}
+                stale += shown != latest
+        elapsed = time.perf_counter() - start
+        renders = args.reruns * args.sessions
+        reads = sum(n for key, n in db.calls.items() if key.startswith("select:"))
+        results[mode] = {
+            "dbReadsPerSession": reads / args.sessions,
+            "dbReadsPerRender": reads / renders,
+            "staleRenders": stale,
+            "msPerRender": elapsed * 1000 / renders,
+        }
+    livePrices.resetPriceFeed()
+    return results
+
+def scenarioAnalytics(args):
+    """
+    The nightly analytics job over the whole seeded league, with trades spread
+    across the price history. Reports the end-to-end job (reads, compute and
+    the upsert of every user's metrics) and the vectorized compute on its own.
+    """
+    import pandas as pd
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    seedLeague(db, args.symbols, args.users, args.holdings, args.trades, args.history_days, rng)
+    now = datetime.now(timezone.utc)
+    for tx in db.tables["transactions"]:
+        tx["created_at"] = (now - timedelta(days=rng.uniform(0, args.history_days))).isoformat()
+    useDatabase(db)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = analytics.runLeagueAnalytics()
+    jobSeconds = time.perf_counter() - start
+
+    transactions = pd.DataFrame(db.tables["transactions"], columns=database.LEAGUE_TRANSACTION_COLUMNS)
+    history = pd.DataFrame(db.tables["price_history"], columns=database.HISTORY_COLUMNS)
+    history["trade_date"] = pd.to_datetime(history["trade_date"])
+    tickers = sorted(s["ticker"] for s in db.tables["stocks"])
+    start = time.perf_counter()
+    analytics.computeLeagueAnalytics(transactions, history, tickers)
+    computeSeconds = time.perf_counter() - start
+    return {
+        "users": written,
+        "transactions": len(transactions),
+        "jobSeconds": jobSeconds,
+        "computeSeconds": computeSeconds,
+        "usersPerSecond": written / computeSeconds if computeSeconds else None,
+        "dbRoundTrips": db.roundTrips,
+    }
+
+def scenarioSnapshot(args):
+    """
+    The post-sync league snapshot. Runs syncStocks.snapshotLeague end to end
+    against the fake database for two days (prices move in between, so ranks
+    change), then values and ranks --snapshot-users synthetic players in one
+    vectorized pass and checks that against --snapshot-budget seconds.
+    """
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    seedLeague(db, args.symbols, args.users, args.holdings, 0, 0, rng)
+    useDatabase(db)
+    days = {}
+    for offset, label in ((1, "firstDay"), (0, "nextDay")):
+        db.resetCalls()
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = syncStocks.snapshotLeague((date.today() - timedelta(days=offset)).isoformat())
+        days[label] = dict(timings, dbRoundTrips=db.roundTrips)
+        for stock in db.tables["stocks"]:
+            stock["current_price"] = round(stock["current_price"] * rng.uniform(0.9, 1.1), 2)
+    today = date.today().isoformat()
+    days["nextDay"]["playersMoved"] = sum(1 for r in db.tables["league_snapshots"]
+                                          if r["snapshot_date"] == today and r["rank_change"])
+
+    # Scale check on synthetic arrays; only the in-process valuation and ranking are timed
+    import numpy as np
+    gen = np.random.default_rng(args.seed)
+    users = args.snapshot_users
+    tickers = [f"SYM{i:03d}" for i in range(args.symbols)]
+    userIDs = np.array([f"00000000-0000-0000-0000-{i:012d}" for i in range(users)], dtype=object)
+    holdingUsers = np.repeat(userIDs, args.holdings)
+    holdingTickers = np.array(tickers, dtype=object)[gen.integers(0, len(tickers), users * args.holdings)]
+    shares = gen.integers(1, 500, users * args.holdings)
+    prices = dict(zip(tickers, gen.uniform(1, 5000, len(tickers))))
+    previous = dict(zip(userIDs, gen.permutation(users) + 1))
+    start = time.perf_counter()
+    ranked = rankLeague(valueLeague(userIDs, gen.uniform(0, 1e6, users), holdingUsers, holdingTickers, shares, prices),
+                        previous)
+    seconds = time.perf_counter() - start
+    return {
+        "endToEnd": days,
+        "scale": {
+            "players": len(ranked),
+            "holdings": len(holdingUsers),
+            "seconds": seconds,
+            "budgetSeconds": args.snapshot_budget,
+            "withinBudget": seconds <= args.snapshot_budget,
+        },
+    }
+
+def scenarioDecode(args):
+    """
+    Decoding a large synthetic transactions table, as PostgREST returns it,
+    the old way (DataFrame of dicts, then to_datetime and tz_convert) and with
+    frames.transactionsFrame. Reports the best of three decode times and the
+    in-memory size of each frame.
+    """
+    import pandas as pd
+    rng = random.Random(args.seed)
+    tickers = [f"SYM{i:03d}" for i in range(args.symbols)]
+    now = datetime.now(timezone.utc)
+    rows = []
+    for k in range(args.decode_rows):
+        qty = rng.randint(1, 100)
+        price = round(rng.uniform(1, 5000), 2)
+        rows.append({"id": f"{k:08d}-0000-0000-0000-000000000000", "created_at": (now - timedelta(seconds=k * 7)).isoformat(),
+                     "type": rng.choice(["BUY", "SELL"]), "ticker": rng.choice(tickers),
+                     "quantity": qty, "price": price, "total_value": qty * price})
+
+    def listOfDicts():
+        df = pd.DataFrame(rows)
+        df["created_at"] = pd.to_datetime(df["created_at"]).dt.tz_convert(frames.LOCAL_TZ)
+        return df
+
+    def measure(decode):
+        seconds = []
+        for _ in range(3):
+            start = time.perf_counter()
+            df = decode()
+            seconds.append(time.perf_counter() - start)
+        return {"ms": min(seconds) * 1000, "megabytes": df.memory_usage(deep=True).sum() / 1e6}
+
+    results = {"rows": len(rows), "listOfDicts": measure(listOfDicts),
+               "typed": measure(lambda: frames.transactionsFrame(rows))}
+    results["memoryRatio"] = results["typed"]["megabytes"] / results["listOfDicts"]["megabytes"]
+    results["speedup"] = results["listOfDicts"]["ms"] / results["typed"]["ms"]
+    return results
+
+def seedStandingOrders(db, userIDs, perUser, rng):
+    #Adds `perUser` open limit/stop orders and alerts per user, resting up to 10% away from the current price
+    prices = {s["ticker"]: s["current_price"] for s in db.tables["stocks"]}
+    for u in userIDs:
+        for _ in range(perUser):
+            ticker = rng.choice(list(prices))
+            kind = rng.choice(["limit", "stop", "alert"])
+            side = None if kind == "alert" else rng.choice(["buy", "sell"])
+            direction = triggerDirection(kind, side, rng.choice(["above", "below"]))
+            away = rng.uniform(1.0, 1.1) if direction == "above" else rng.uniform(0.9, 1.0)
+            db.tables["standing_orders"].append(db._prepare("standing_orders", {
+                "user_id": u, "ticker": ticker, "kind": kind, "side": side,
+                "quantity": None if kind == "alert" else rng.randint(1, 20),
+                "trigger_price": round(prices[ticker] * away, 2),
+                "direction": direction,
+            }))
+
+def scenarioOrders(args):
+    """
+    Standing orders after a price move. Runs syncStocks.matchStandingOrders
+    end to end against the fake database (each user has --orders-per-user
+    resting orders and --move-fraction of the tickers move up to 10%; every
+    open order is matched, the rest against their stored prices), then
+    builds an OrderBook of --resting-orders synthetic orders and times
+    matching one sync's prices against it.
+    """
+    import numpy as np
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    userIDs = seedLeague(db, args.symbols, args.users, args.holdings, 0, 0, rng)
+    seedStandingOrders(db, userIDs, args.orders_per_user, rng)
+    useDatabase(db)
+    moved = rng.sample(db.tables["stocks"], max(1, int(len(db.tables["stocks"]) * args.move_fraction)))
+    prices = {s["ticker"]: round(s["current_price"] * rng.uniform(0.9, 1.1), 2) for s in moved}
+    db.resetCalls()
+    with contextlib.redirect_stdout(io.StringIO()):
+        endToEnd = syncStocks.matchStandingOrders(prices)
+    endToEnd["dbRoundTrips"] = db.roundTrips
+
+    # Scale check on synthetic arrays: building the book and matching are timed separately
+    gen = np.random.default_rng(args.seed)
+    n = args.resting_orders
+    tickers = [f"SYM{i:03d}" for i in range(args.symbols)]
+    basePrices = gen.uniform(1, 5000, len(tickers))
+    tickerIndex = gen.integers(0, len(tickers), n)
+    above = gen.random(n) < 0.5
+    triggers = basePrices[tickerIndex] * np.where(above, gen.uniform(1.0, 1.1, n), gen.uniform(0.9, 1.0, n))
+    start = time.perf_counter()
+    book = OrderBook(np.array(tickers, dtype=object)[tickerIndex], np.where(above, "above", "below"), triggers)
+    buildSeconds = time.perf_counter() - start
+    movedTickers = gen.choice(len(tickers), max(1, int(len(tickers) * args.move_fraction)), replace=False)
+    syncPrices = {tickers[i]: basePrices[i] * gen.uniform(0.97, 1.03) for i in movedTickers}
+    start = time.perf_counter()
+    positions, _ = book.match(syncPrices)
+    matchSeconds = time.perf_counter() - start
+    return {
+        "endToEnd": endToEnd,
+        "scale": {
+            "orders": len(book),
+            "tickersMoved": len(syncPrices),
+            "triggered": len(positions),
+            "buildSeconds": buildSeconds,
+            "matchSeconds": matchSeconds,
+        },
+    }
+
+def scenarioLeagues(args):
+    """
+    Many leagues trading at once. Seeds --leagues leagues of --league-size
+    players each (everyone also plays in the global league), then
+    --trade-threads threads run --orders mixed operations: each picks a random
+    league and member and either renders the portfolio and leaderboard views
+    or trades in that league. Afterwards every active league is snapshotted
+    (syncStocks.snapshotAllLeagues) and each league's leaderboard, snapshot
+    and trades are checked to contain only its own members.
+    """
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    seedLeague(db, args.symbols, 0, 0, 0, 0, rng)
+    tickers = [s["ticker"] for s in db.tables["stocks"]]
+    prices = {s["ticker"]: s["current_price"] for s in db.tables["stocks"]}
+    startsOn = (date.today() - timedelta(days=30)).isoformat()
+    members = {}
+    for i in range(args.leagues):
+        leagueID = f"10000000-0000-0000-0000-{i:012d}"
+        db.tables["leagues"].append({"id": leagueID, "name": f"League {i}", "slug": f"league-{i}",
+                                     "starting_cash": 100_000.0 * (1 + i % 10), "starts_on": startsOn,
+                                     "ends_on": None, "is_public": True, "join_code": f"code{i:06d}", "created_by": None,
+                                     "created_at": nowISO()})
+        userIDs = [f"20000000-0000-0000-{i:04d}-{k:012d}" for k in range(args.league_size)]
+        for u in userIDs:
+            db.tables["profiles"].append({"id": u, "username": f"player{u[-6:]}"})
+        seedMembers(db, leagueID, userIDs, tickers, args.holdings, 5, rng, 100_000.0 * (1 + i % 10))
+        seedMembers(db, GLOBAL_LEAGUE, userIDs, tickers, args.holdings, 5, rng)
+        members[leagueID] = userIDs
+    db.executeRPC("refresh_leaderboard", {})
+    useDatabase(db)
+
+    def operation(seed):
+        opRng = random.Random(seed)
+        leagueID = opRng.choice(list(members))
+        userID = opRng.choice(members[leagueID])
+        start = time.perf_counter()
+        if opRng.random() < 0.5:
+            database.getMembership(userID, leagueID)
+            database.getUserPortfolio(userID, leagueID)
+            database.getUserRank(userID, leagueID)
+            database.getLeaderboard(10, 0, leagueID)
+            kind, ok = "view", True
+        else:
+            ticker = opRng.choice(tickers)
+            ok, _ = database.placeBuyOrder(userID, ticker, 1, prices[ticker], leagueID)
+            kind = "trade"
+        return kind, ok, (time.perf_counter() - start) * 1000
+
+    db.resetCalls()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.trade_threads) as pool:
+        outcomes = list(pool.map(operation, range(args.orders)))
+    elapsed = time.perf_counter() - start
+    load = {"operations": len(outcomes), "seconds": elapsed, "operationsPerSecond": len(outcomes) / elapsed,
+            "dbRoundTripsPerOperation": db.roundTrips / len(outcomes)}
+    for kind in ("view", "trade"):
+        samples = [ms for k, _, ms in outcomes if k == kind]
+        if samples:
+            load[kind] = {"count": len(samples), "succeeded": sum(1 for k, ok, _ in outcomes if k == kind and ok),
+                          "medianMs": statistics.median(samples), "maxMs": max(samples)}
+
+    # Every active league's snapshot, then one league's on its own: its reads should track the league, not the table
+    db.resetCalls()
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings = syncStocks.snapshotAllLeagues()
+    custom = [t for leagueID, t in timings.items() if leagueID != GLOBAL_LEAGUE]
+    snapshot = {
+        "leagues": len(timings),
+        "seconds": sum(sum(t.values()) for t in timings.values()),
+        "meanSecondsPerLeague": statistics.mean(sum(t.values()) for t in custom) if custom else None,
+        "dbRoundTrips": db.roundTrips,
+    }
+    db.resetCalls()
+    with contextlib.redirect_stdout(io.StringIO()):
+        syncStocks.snapshotLeague(leagueID=next(iter(members)))
+    snapshot["oneLeague"] = {
+        "dbRoundTrips": db.roundTrips,
+        "rowsRead": sum(db.rowsReturned[t] for t in ("league_members", "portfolios")),
+        "rowsInTables": len(db.tables["league_members"]) + len(db.tables["portfolios"]),
+    }
+
+    # Isolation: nothing written in one league shows up in another
+    leaks = 0
+    today = date.today().isoformat()
+    for leagueID, userIDs in members.items():
+        allowed = set(userIDs)
+        ranked = database.getLeaderboard.uncached(args.league_size + 1, 0, leagueID)
+        snapshotRows = [r for r in db.tables["league_snapshots"]
+                        if r["league_id"] == leagueID and r["snapshot_date"] == today]
+        leaks += sum(1 for r in ranked if r["user_id"] not in allowed)
+        leaks += sum(1 for r in snapshotRows if r["user_id"] not in allowed)
+        leaks += abs(len(ranked) - len(allowed)) + abs(len(snapshotRows) - len(allowed))
+    leaks += sum(1 for tx in db.tables["transactions"]
+                 if tx["league_id"] != GLOBAL_LEAGUE and tx["user_id"] not in set(members[tx["league_id"]]))
+    return {
+        "leagues": args.leagues,
+        "playersPerLeague": args.league_size,
+        "load": load,
+        "snapshot": snapshot,
+        "isolationErrors": leaks,
+    }
+
+def scenarioBackfill(args):
+    """
+    syncStocks.backfillHistory loading --backfill-days of sessions for every
+    symbol into an empty database, once per worker-pool size. Then an
+    interrupted run (every request fails with --backfill-failure-rate and is
+    not retried) is resumed from its checkpoint. The resume should fetch only
+    the symbols that failed, and the two runs together should store exactly
+    the rows of a clean run. A final pass over the same range with --refresh
+    checks that reloading adds no duplicate rows. Last, two whole sessions are
+    deleted and backfilled with onlyMissing, which should restore exactly
+    the clean run's rows and then fetch nothing on a second run.
+    """
+    end = date.today()
+    start = end - timedelta(days=args.backfill_days)
+    statePath = lambda: os.path.join(tempfile.mkdtemp(prefix="gse-backfill-"), "state.json")
+    results, cleanRows = {}, None
+    for workers in sorted({1, max(args.workers)}):
+        db = FakeSupabase(latency=args.db_latency)
+        useDatabase(db)
+        fake = FakeFinanceGY(args.symbols, args.fetch_latency, args.fetch_jitter, 0.0, seed=args.seed,
+                             inactive=args.inactive)
+        syncStocks.financegy = fake
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = syncStocks.backfillHistory(start, end, maxWorkers=workers, timeout=args.fetch_timeout,
+                                                 statePath=statePath())
+        cleanRows = len(db.tables["price_history"])
+        results[f"workers={workers}"] = {
+            "seconds": summary["seconds"],
+            "symbolsPerSecond": args.symbols / summary["seconds"],
+            "rowsWritten": summary["rows"],
+            "rowsPerSecond": summary["rows"] / summary["seconds"],
+            "financegyRequests": fake.requests,
+            "dbRoundTrips": db.roundTrips,
+        }
+
+    db = FakeSupabase(latency=args.db_latency)
+    useDatabase(db)
+    path = statePath()
+    fake = FakeFinanceGY(args.symbols, args.fetch_latency, args.fetch_jitter, args.backfill_failure_rate,
+                         seed=args.seed, inactive=args.inactive)
+    syncStocks.financegy = fake
+    with contextlib.redirect_stdout(io.StringIO()):
+        interrupted = syncStocks.backfillHistory(start, end, maxWorkers=max(args.workers), timeout=args.fetch_timeout,
+                                                 retries=1, statePath=path)
+        fake.errorRate, before = 0.0, fake.requests
+        resumed = syncStocks.backfillHistory(start, end, maxWorkers=max(args.workers), timeout=args.fetch_timeout,
+                                             statePath=path)
+        resumeRequests = fake.requests - before
+        syncStocks.backfillHistory(start, end, maxWorkers=max(args.workers), timeout=args.fetch_timeout,
+                                   statePath=path, refresh=True)
+    results["resume"] = {
+        "failedSymbols": len(interrupted["failed"]),
+        "resumeRequests": resumeRequests,
+        "resumedOnlyFailed": resumeRequests == len(interrupted["failed"]) and not resumed["failed"],
+        "rowsStored": len(db.tables["price_history"]),
+        "matchesCleanRun": len(db.tables["price_history"]) == cleanRows,
+    }
+
+    # The daily workflow's --missing run: two whole sessions are deleted, then the same range is backfilled twice
+    calendar = syncStocks.MarketCalendar()
+    sessions = sorted(d for d in {r["trade_date"] for r in db.tables["price_history"]}
+                      if calendar.isTradingDay(date.fromisoformat(d)))
+    dropped = set(sessions[-3:-1])
+    db.tables["price_history"] = [r for r in db.tables["price_history"] if r["trade_date"] not in dropped]
+    with contextlib.redirect_stdout(io.StringIO()):
+        before = fake.requests
+        syncStocks.backfillHistory(start, end, maxWorkers=max(args.workers), timeout=args.fetch_timeout,
+                                   statePath=statePath(), onlyMissing=True)
+        refillRequests, before = fake.requests - before, fake.requests
+        syncStocks.backfillHistory(start, end, maxWorkers=max(args.workers), timeout=args.fetch_timeout,
+                                   statePath=statePath(), onlyMissing=True)
+    results["missing"] = {
+        "sessionsDropped": len(dropped),
+        "refillRequests": refillRequests,
+        "matchesCleanRun": len(db.tables["price_history"]) == cleanRows,
+        "requestsWhenNothingMissing": fake.requests - before,
+    }
+    return results
+
+def scenarioReplay(args):
+    """
+    syncStocks.replayLeague over --history-days of price history for --users
+    players whose --trades past trades are spread across the window. The
+    league is replayed twice without writing: both runs must produce the same
+    ranking digest, and the faster one gives the player-days per second that
+    valuation and ranking sustain. A third run writes every replayed day to
+    league_snapshots.
+    """
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency)
+    seedLeague(db, args.symbols, args.users, args.holdings, args.trades, args.history_days, rng)
+    now = datetime.now(timezone.utc)
+    for tx in db.tables["transactions"]:
+        tx["created_at"] = (now - timedelta(days=rng.uniform(0, args.history_days))).isoformat()
+    useDatabase(db)
+    start = date.today() - timedelta(days=args.history_days)
+
+    runs = []
+    for _ in range(2):
+        db.resetCalls()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(dict(syncStocks.replayLeague(start), dbRoundTrips=db.roundTrips))
+    fastest = min(runs, key=lambda r: r["timings"]["replay"])
+    db.resetCalls()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = syncStocks.replayLeague(start, write=True)
+    return {
+        "days": fastest["days"],
+        "players": fastest["players"],
+        "trades": fastest["trades"],
+        "timings": fastest["timings"],
+        "daysPerSecond": fastest["days"] / fastest["timings"]["replay"],
+        "playerDaysPerSecond": fastest["playerDaysPerSecond"],
+        "dbRoundTrips": fastest["dbRoundTrips"],
+        "deterministic": runs[0]["digest"] == runs[1]["digest"] == written["digest"],
+        "write": {"rowsWritten": written["rowsWritten"], "seconds": written["timings"]["write"],
+                  "dbRoundTrips": db.roundTrips},
+    }
+
+def scenarioStress(args):
+    """
+    Concurrency stress on the client side of the trade write path.
+    --trade-threads threads fire --stress-orders buy and sell orders at
+    --stress-users players through placeBuyOrder/placeSellOrder, so every
+    player has many orders in flight at once. Three kinds of orders are mixed
+    in:
+    * --double-submit-rate of orders are sent twice at once with the same
+      idempotency key, like a double click.
+    * --stale-rate of orders carry a price 10% off the synced one.
+    * --lost-response-rate of RPC responses are dropped after the trade
+      commits, so the client retries with the same key.
+    Afterwards the ledger is reconciled. Every player's cash and shares must
+    equal their seed plus their recorded transactions. There must be one
+    transaction per filled key, and no stale order may fill.
+
+    The trades run in the fake's Python mirror of the SQL, one RPC at a time
+    under its lock. This checks database.py's keys and retries and the
+    contract the fake mirrors, not the SQL's row locking: run
+    benchmarks/tradeStress.py against a real database for that.
+    """
+    rng = random.Random(args.seed)
+    db = FakeSupabase(latency=args.db_latency, seed=args.seed)
+    userIDs = seedLeague(db, args.symbols, args.stress_users, args.holdings, 0, 0, rng)
+    useDatabase(db)
+    db.lostResponseRate = args.lost_response_rate
+    prices = {s["ticker"]: s["current_price"] for s in db.tables["stocks"]}
+    cash = {m["user_id"]: m["cash_balance"] for m in db.tables["league_members"]}
+    shares = {(h["user_id"], h["ticker"]): h["shares_count"] for h in db.tables["portfolios"]}
+    submissions = stressOrders(rng, userIDs, prices, args.stress_orders, args.double_submit_rate, args.stale_rate)
+
+    def submit(order):
+        ok, message = order["place"](order["user"], order["ticker"], order["quantity"], order["price"],
+                                     GLOBAL_LEAGUE, order["key"])
+        return order, ok, message
+
+    db.resetCalls()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.trade_threads) as pool:
+        outcomes = list(pool.map(submit, submissions))
+    elapsed = time.perf_counter() - start
+
+    ledger = reconcileTrades(cash, shares, db.tables["league_members"], db.tables["portfolios"],
+                             db.tables["transactions"], db.tables["order_submissions"], outcomes)
+    rpcCalls = db.calls["rpc:execute_buy_order"] + db.calls["rpc:execute_sell_order"]
+    return dict({
+        "submissions": len(submissions),
+        "orders": args.stress_orders,
+        "players": args.stress_users,
+        "seconds": elapsed,
+        "tradesPerSecond": ledger["filled"] / elapsed,
+        "submissionsPerSecond": len(submissions) / elapsed,
+        "retriedRPCs": rpcCalls - len(submissions),
+    }, **ledger)
+
+SCENARIOS = {"sync": scenarioSync, "pageLoad": scenarioPageLoad, "trades": scenarioTrades, "basket": scenarioBasket,
+             "liveReads": scenarioLiveReads, "daemon": scenarioDaemon, "analytics": scenarioAnalytics,
+             "snapshot": scenarioSnapshot, "decode": scenarioDecode,
+             "orders": scenarioOrders, "leagues": scenarioLeagues, "backfill": scenarioBackfill,
+             "replay": scenarioReplay, "stress": scenarioStress}
+
+# --- reporting ---
+
+def flatten(tree, prefix=""):
+    #{"a": {"b": 1}} -> {"a.b": 1}, keeping only numeric leaves
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def printComparison(current, baseline):
+    #Prints every numeric metric next to the baseline with the relative change
+    now, then = flatten(current["results"]), flatten(baseline["results"])
+    print(f"\nComparison against {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for path in sorted(now):
+        if path in then and then[path]:
+            change = (now[path] - then[path]) / then[path] * 100
+            print(f"  {path:<70}{then[path]:>12.3f} -> {now[path]:>12.3f}  ({change:+.1f}%)")
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for GSE-FL")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="A previous results file to diff against")
+    parser.add_argument("--seed", type=int, default=7)
+    # Simulated environment
+    parser.add_argument("--db-latency", type=float, default=0.02, help="Seconds per database round trip")
+    parser.add_argument("--fetch-latency", type=float, default=0.3, help="Mean seconds per FinanceGY request")
+    parser.add_argument("--fetch-jitter", type=float, default=0.1)
+    parser.add_argument("--fetch-timeout", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Probability a FinanceGY request fails")
+    parser.add_argument("--retries", type=int, default=3)
+    # Data sizes
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--holdings", type=int, default=8)
+    parser.add_argument("--trades", type=int, default=50, help="Past transactions per user")
+    parser.add_argument("--history-days", type=int, default=90)
+    # Scenario knobs
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--reruns", type=int, default=20, help="Warm renders measured per view")
+    parser.add_argument("--mixed-users", action="store_true", help="Warm renders pick a random user each time")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--trade-threads", type=int, default=8)
+    parser.add_argument("--basket-legs", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--sessions", type=int, default=25, help="Open sessions in the liveReads scenario")
+    parser.add_argument("--price-updates", type=int, default=5, help="Price changes during the liveReads reruns")
+    parser.add_argument("--inactive", type=float, default=0.3, help="Fraction of symbols that have not traded in a month")
+    parser.add_argument("--snapshot-users", type=int, default=100_000, help="Synthetic players in the snapshot scale check")
+    parser.add_argument("--snapshot-budget", type=float, default=2.0, help="Seconds allowed to value and rank them")
+    parser.add_argument("--orders-per-user", type=int, default=5, help="Resting orders per user in the orders scenario")
+    parser.add_argument("--resting-orders", type=int, default=500_000, help="Synthetic orders in the matching scale check")
+    parser.add_argument("--decode-rows", type=int, default=500_000, help="Synthetic transactions in the decode scenario")
+    parser.add_argument("--move-fraction", type=float, default=0.1, help="Share of symbols moving every 15 minutes")
+    parser.add_argument("--leagues", type=int, default=100, help="Concurrent leagues in the leagues scenario")
+    parser.add_argument("--league-size", type=int, default=25, help="Players per league in the leagues scenario")
+    parser.add_argument("--backfill-days", type=int, default=365, help="Days of history loaded in the backfill scenario")
+    parser.add_argument("--stress-orders", type=int, default=5000, help="Distinct orders in the stress scenario")
+    parser.add_argument("--stress-users", type=int, default=20, help="Players sharing the stress scenario's orders")
+    parser.add_argument("--double-submit-rate", type=float, default=0.2, help="Share of stress orders sent twice")
+    parser.add_argument("--stale-rate", type=float, default=0.05, help="Share of stress orders at a stale price")
+    parser.add_argument("--lost-response-rate", type=float, default=0.02,
+                        help="Share of trade responses dropped after the trade commits")
+    parser.add_argument("--backfill-failure-rate", type=float, default=0.4,
+                        help="Share of requests failing in the interrupted backfill run")
+    return parser.parse_args()
+
+def main():
+    args = parseArgs()
+    report = {
+        "meta": {
+            "commit": gitCommit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+    for name in args.scenarios:
+        print(f"Running {name}...")
+        report["results"][name] = SCENARIOS[name](args)
+        print(json.dumps(report["results"][name], indent=2))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            printComparison(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
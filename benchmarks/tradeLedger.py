@@ -0,0 +1,51 @@
+"""
+Order generation and ledger reconciliation for the trade stress runs, shared
+by the in-memory scenario (run.py --scenarios stress) and the run against a
+real database (tradeStress.py).
+"""
+from collections import Counter
+
+import database
+
+def stressOrders(rng, userIDs, prices, count, doubleSubmitRate, staleRate):
+    #`count` random buys and sells, some sent twice under one key and some at a price 10% off the synced one
+    submissions = []
+    for _ in range(count):
+        stale = rng.random() < staleRate
+        order = {"place": rng.choice((database.placeBuyOrder, database.placeSellOrder)), "user": rng.choice(userIDs),
+                 "ticker": rng.choice(list(prices)), "quantity": rng.randint(1, 20), "key": database.newOrderKey(),
+                 "stale": stale}
+        order["price"] = prices[order["ticker"]] * (1.1 if stale else 1.0)
+        submissions.extend([order] * (2 if rng.random() < doubleSubmitRate else 1))
+    rng.shuffle(submissions)
+    return submissions
+
+def reconcileTrades(seedCash, seedShares, members, holdings, transactions, submissions, outcomes):
+    """
+    Checks a stress run's end state. `seedCash` ({user_id: cash}) and
+    `seedShares` ({(user_id, ticker): shares}) are the balances before the
+    run; `members`, `holdings`, `transactions` and `submissions` are the
+    league's rows after it, and `outcomes` the (order, ok, message) each
+    submission returned. Seed plus ledger must equal the stored balances to
+    the cent, with one transaction per filled key and no stale fill.
+    """
+    cash, shares = Counter(seedCash), Counter(seedShares)
+    for tx in transactions:
+        sign = 1 if tx["type"] == "BUY" else -1
+        cash[tx["user_id"]] -= sign * float(tx["total_value"])
+        shares[(tx["user_id"], tx["ticker"])] += sign * tx["quantity"]
+    stored = Counter({(h["user_id"], h["ticker"]): h["shares_count"] for h in holdings})
+    filledKeys = {r["idempotency_key"] for r in submissions if r["result"]}
+    confirmedKeys = {o["key"] for o, ok, _ in outcomes if ok}
+    return {
+        "filled": len(transactions),
+        "duplicatesAbsorbed": sum(1 for _, ok, message in outcomes if ok and message == "Order already placed."),
+        "staleRejected": sum(1 for o, ok, _ in outcomes if o["stale"] and not ok),
+        "staleFilled": sum(1 for o, ok, _ in outcomes if o["stale"] and ok),
+        "cashDrift": round(sum(abs(float(m["cash_balance"]) - cash[m["user_id"]]) for m in members), 2),
+        "shareDrift": sum(abs(stored[k] - shares[k]) for k in set(stored) | set(shares)),
+        "negativeHoldings": sum(1 for h in holdings if h["shares_count"] < 0)
+                            + sum(1 for m in members if float(m["cash_balance"]) < 0),
+        "duplicateTrades": len(transactions) - len(filledKeys | confirmedKeys),
+        "unconfirmedFills": len(filledKeys - confirmedKeys),
+    }
@@ -0,0 +1,116 @@
+"""
+Runs the trade stress scenario (run.py --scenarios stress) against a real
+Supabase project instead of the in-memory fake. The trades then go through
+the SQL in supabase/migrations: execute_buy_order() and execute_sell_order(),
+their row locks, claim_order_submission() and the price checks, with many
+orders per player in flight at once. Point it at a local stack
+(`supabase start`, then SUPABASE_URL=http://127.0.0.1:54321) or a staging
+project, never at production.
+
+Writes need a service-role key (SUPABASE_SERVICE_KEY). The run creates a
+private 'bench-stress-' league whose members are --players existing profiles,
+seeds their cash and holdings, trades, reconciles the ledger and then deletes
+the league. Its members, holdings, trades and submissions cascade with it.
+Pass --keep to leave it in place. Lost responses cannot be injected into a
+real server, so only double submits and stale prices are mixed in.
+
+    python benchmarks/tradeStress.py --orders 2000 --players 10 --threads 32
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from benchmarks.tradeLedger import stressOrders, reconcileTrades
+
+STARTING_CASH = 1_000_000.0
+READ_PAGE_SIZE = 1000
+
+def readLeagueRows(admin, table, columns, leagueID):
+    #Every row of one league in `table`, a page at a time
+    rows = []
+    while True:
+        page = admin.table(table).select(columns).eq("league_id", leagueID) \
+            .range(len(rows), len(rows) + READ_PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < READ_PAGE_SIZE:
+            return rows
+
+def seedLeague(admin, players, symbols, holdings, rng):
+    #A throwaway league with `players` existing profiles as members, each holding `holdings` of `symbols` tickers
+    profiles = admin.table("profiles").select("id, username").limit(players).execute().data
+    stocks = admin.table("stocks").select("ticker, current_price").gt("current_price", 0) \
+        .order("ticker").limit(symbols).execute().data
+    if not profiles or not stocks:
+        raise SystemExit("The project needs at least one profile and one priced stock")
+    leagueID = admin.table("leagues").insert({
+        "name": "Trade stress", "slug": f"bench-stress-{uuid.uuid4().hex[:12]}", "starting_cash": STARTING_CASH,
+        "is_public": False
+    }).execute().data[0]["id"]
+    admin.table("league_members").insert([
+        {"league_id": leagueID, "user_id": p["id"], "username": p["username"], "cash_balance": STARTING_CASH}
+        for p in profiles
+    ]).execute()
+    seeded = [{"league_id": leagueID, "user_id": p["id"], "ticker": s["ticker"], "shares_count": rng.randint(50, 500),
+               "avg_price": s["current_price"]}
+              for p in profiles for s in rng.sample(stocks, min(holdings, len(stocks)))]
+    admin.table("portfolios").insert(seeded).execute()
+    prices = {s["ticker"]: float(s["current_price"]) for s in stocks}
+    cash = {p["id"]: STARTING_CASH for p in profiles}
+    shares = {(h["user_id"], h["ticker"]): h["shares_count"] for h in seeded}
+    return leagueID, [p["id"] for p in profiles], prices, cash, shares
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade write-path stress against a real Supabase project")
+    parser.add_argument("--orders", type=int, default=2000, help="Distinct orders")
+    parser.add_argument("--players", type=int, default=10, help="Existing profiles to trade as")
+    parser.add_argument("--symbols", type=int, default=10, help="Tickers to trade")
+    parser.add_argument("--holdings", type=int, default=5, help="Tickers each player starts holding")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent submissions")
+    parser.add_argument("--double-submit-rate", type=float, default=0.2, help="Share of orders sent twice")
+    parser.add_argument("--stale-rate", type=float, default=0.05, help="Share of orders at a stale price")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Leave the stress league in place")
+    args = parser.parse_args()
+
+    admin = database.createClient(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+    database.supabase = admin
+    rng = random.Random(args.seed)
+    leagueID, userIDs, prices, cash, shares = seedLeague(admin, args.players, args.symbols, args.holdings, rng)
+    try:
+        submissions = stressOrders(rng, userIDs, prices, args.orders, args.double_submit_rate, args.stale_rate)
+
+        def submit(order):
+            ok, message = order["place"](order["user"], order["ticker"], order["quantity"], order["price"],
+                                         leagueID, order["key"])
+            return order, ok, message
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            outcomes = list(pool.map(submit, submissions))
+        elapsed = time.perf_counter() - start
+
+        ledger = reconcileTrades(
+            cash, shares,
+            readLeagueRows(admin, "league_members", "user_id, cash_balance", leagueID),
+            readLeagueRows(admin, "portfolios", "user_id, ticker, shares_count", leagueID),
+            readLeagueRows(admin, "transactions", "user_id, ticker, type, quantity, total_value", leagueID),
+            readLeagueRows(admin, "order_submissions", "idempotency_key, result", leagueID),
+            outcomes)
+        print(json.dumps(dict({"league": leagueID, "submissions": len(submissions), "seconds": elapsed,
+                               "tradesPerSecond": ledger["filled"] / elapsed}, **ledger), indent=2))
+    finally:
+        if not args.keep:
+            admin.table("leagues").delete().eq("id", leagueID).execute()
+            # leaderboard_ranked has no foreign key to leagues; a full refresh drops the league's rows
+            admin.rpc("refresh_leaderboard").execute()
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,805 @@
 import os
-from supabase import create_client, Client
+import json
+import uuid
+import threading
+import functools
+from datetime import date, timedelta
+from cachetools import TTLCache
 from dotenv import load_dotenv
+import instrumentation
 
 load_dotenv()
 
 URL = os.getenv("SUPABASE_URL")
 KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(URL, KEY)
 
+#Clients are built on first use rather than at import time. supabase (~1s) and pandas
+#(~0.5s) are imported lazily for the same reason, so importing this module is cheap.
+HTTP_POOL_SIZE = int(os.getenv("SUPABASE_HTTP_POOL_SIZE", "20"))
+supabase = None #Shared, unauthenticated client; see getClient()
+_httpClient = None
+_clientLock = threading.RLock()
+_sessionState = threading.local()
+
+#Local Parquet cache for price history that is old enough to never change again
+HISTORY_CACHE_DIR = os.getenv("PRICE_HISTORY_CACHE_DIR", os.path.join(".cache", "price_history"))
+#Must stay longer than the daily workflow's `--backfill --missing` window (14 days), which can still add older rows
+HISTORY_SEAL_DAYS = int(os.getenv("PRICE_HISTORY_SEAL_DAYS", "21"))
+HISTORY_PAGE_SIZE = 1000 #PostgREST's default max rows per response
+HISTORY_COLUMNS = ["ticker", "trade_date", "price"]
+_historyCacheLock = threading.Lock()
+
+#Every player belongs to the global league; other leagues are joined or created from the app
+GLOBAL_LEAGUE = "00000000-0000-0000-0000-000000000000"
+LEAGUE_COLUMNS = "id, name, slug, starting_cash, starts_on, ends_on, is_public"
+MEMBER_COLUMNS = "league_id, user_id, username, cash_balance, joined_at"
+
+LEADERBOARD_COLUMNS = "user_id, username, stock_value, total_net_worth"
+SNAPSHOT_COLUMNS = "snapshot_date, user_id, username, net_worth, rank, rank_change"
+
+STOCK_COLUMNS = "ticker, name, current_price, last_updated, shares_outstanding"
+PROFILE_COLUMNS = "id, username"
+TRANSACTION_COLUMNS = "id, created_at, type, ticker, quantity, price, total_value"
+TRANSACTION_PAGE_SIZE = 50
+STANDING_ORDER_COLUMNS = "id, ticker, kind, side, quantity, trigger_price, direction, status, filled_price, message, " \
+                         "created_at, closed_at"
+STANDING_ORDER_LIMIT = 50
+EXPORT_CHUNK_SIZE = 1000
+#Trades carry an idempotency key, so a call whose response was lost can be resent without trading twice
+TRADE_RPC_RETRIES = int(os.getenv("TRADE_RPC_RETRIES", "2"))
+LEAGUE_TRANSACTION_COLUMNS = ["id", "user_id", "created_at", "type", "ticker", "quantity", "total_value"]
+
+ANALYTICS_COLUMNS = "as_of, window_start, trading_days, net_worth, twr, annualized_return, volatility, " \
+                    "max_drawdown, sharpe, benchmark_return, excess_return, beta, index_method"
+ANALYTICS_WRITE_CHUNK = 500
+
+#Process-wide read caches, shared by every Streamlit session served by this process.
+#Market data is keyed to the latest sync timestamp, which is re-checked at most every SYNC_STAMP_TTL seconds.
+SYNC_STAMP_TTL = float(os.getenv("SYNC_STAMP_TTL", "60"))
+MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", "3600"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+MARKET_CACHE_SIZE = int(os.getenv("MARKET_CACHE_SIZE", "1024")) #Leaderboard pages are cached per league
+#Leaderboard pages are keyed to their league's latest leaderboard change instead, so trades show up without a price sync
+LEADERBOARD_VERSION_TTL = float(os.getenv("LEADERBOARD_VERSION_TTL", "5"))
+#Top movers are keyed to their league's latest snapshot date; the snapshot job writes to its own client, not this cache
+SNAPSHOT_DATE_TTL = float(os.getenv("SNAPSHOT_DATE_TTL", "60"))
+_cacheLock = threading.RLock()
+_syncStampCache = TTLCache(maxsize=1, ttl=SYNC_STAMP_TTL)
+_leaderboardVersionCache = TTLCache(maxsize=MARKET_CACHE_SIZE, ttl=LEADERBOARD_VERSION_TTL)
+_snapshotDateCache = TTLCache(maxsize=MARKET_CACHE_SIZE, ttl=SNAPSHOT_DATE_TTL)
+_marketCache = TTLCache(maxsize=MARKET_CACHE_SIZE, ttl=MARKET_CACHE_TTL)
+_userCache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_cacheStats = {}
+
+def getHttpClient():
+    #One HTTP connection pool with keep-alive, shared by every Supabase client in this process
+    global _httpClient
+    if _httpClient is None:
+        with _clientLock:
+            if _httpClient is None:
+                import httpx
+                _httpClient = httpx.Client(
+                    http2=True,
+                    timeout=httpx.Timeout(30.0),
+                    limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+                    event_hooks={"response": [instrumentation.recordResponseBytes]}
+                )
+    return _httpClient
+
+def createClient(url=URL, key=KEY):
+    #Builds a Supabase client on top of the shared connection pool. Auth headers live on the client, not the pool.
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+    return create_client(url, key, options=SyncClientOptions(httpx_client=getHttpClient()))
+
+def bindSessionClient(client):
+    #Routes this thread's database calls through a session's authenticated client (None to unbind)
+    _sessionState.client = client
+
+def getClient():
+    """
+    Returns the session client bound to this thread, or the shared client
+    (built on first use), wrapped so every request it sends is recorded by
+    instrumentation.py.
+    """
+    global supabase
+    client = getattr(_sessionState, "client", None)
+    if client is None and supabase is None:
+        with _clientLock:
+            if supabase is None:
+                supabase = createClient()
+    return instrumentation.instrumentClient(client if client is not None else supabase)
+
+def _recordCacheLookup(name, hit):
+    with _cacheLock:
+        stats = _cacheStats.setdefault(name, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+def getSyncStamp():
+    #Returns the most recent 'last_updated' in stocks; cached briefly so it costs at most one tiny query per SYNC_STAMP_TTL
+    with _cacheLock:
+        if "stamp" in _syncStampCache:
+            return _syncStampCache["stamp"]
+    response = getClient().table("stocks").select("last_updated") \
+        .order("last_updated", desc=True).limit(1).execute()
+    stamp = response.data[0]["last_updated"] if response.data else None
+    with _cacheLock:
+        _syncStampCache["stamp"] = stamp
+    return stamp
+
+def getLeaderboardVersion(leagueID=GLOBAL_LEAGUE):
+    """
+    Returns the latest 'updated_at' in one league's leaderboard rows. Trades,
+    syncs and new members all move it. Cached per league for
+    LEADERBOARD_VERSION_TTL seconds, so it costs at most one indexed one-row
+    query per league in that window.
+    """
+    with _cacheLock:
+        if leagueID in _leaderboardVersionCache:
+            return _leaderboardVersionCache[leagueID]
+    response = getClient().table("leaderboard_ranked").select("updated_at") \
+        .eq("league_id", leagueID).order("updated_at", desc=True).limit(1).execute()
+    version = response.data[0]["updated_at"] if response.data else None
+    with _cacheLock:
+        _leaderboardVersionCache[leagueID] = version
+    return version
+
+def getLatestSnapshotDate(leagueID=GLOBAL_LEAGUE):
+    #Returns one league's latest 'snapshot_date' (None before its first snapshot), re-checked at most every SNAPSHOT_DATE_TTL seconds
+    with _cacheLock:
+        if leagueID in _snapshotDateCache:
+            return _snapshotDateCache[leagueID]
+    response = getClient().table("league_snapshots").select("snapshot_date").eq("league_id", leagueID) \
+        .order("snapshot_date", desc=True).limit(1).execute()
+    snapshotDate = response.data[0]["snapshot_date"] if response.data else None
+    with _cacheLock:
+        _snapshotDateCache[leagueID] = snapshotDate
+    return snapshotDate
+
+def _cachedRead(cache, keyFn):
+    #Decorator factory: serves repeat calls from `cache` under the key built by keyFn(*args, **kwargs) plus any kwargs
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__,) + keyFn(*args, **kwargs) + tuple(sorted(kwargs.items()))
+            with _cacheLock:
+                if key in cache:
+                    _recordCacheLookup(fn.__name__, True)
+                    instrumentation.recordCacheHit(fn.__name__)
+                    return cache[key]
+            _recordCacheLookup(fn.__name__, False)
+            result = fn(*args, **kwargs)
+            # Failed reads (None) are not cached so the next rerun retries them
+            if result is not None:
+                with _cacheLock:
+                    cache[key] = result
+            return result
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+marketCached = _cachedRead(_marketCache, lambda *args, **kwargs: (getSyncStamp(),) + args)
+userCached = _cachedRead(_userCache, lambda userID, *args, **kwargs: (userID,) + args)
+leaderboardCached = _cachedRead(
+    _marketCache,
+    lambda limit=10, offset=0, leagueID=GLOBAL_LEAGUE: (getLeaderboardVersion(leagueID), limit, offset, leagueID)
+)
+moversCached = _cachedRead(
+    _marketCache,
+    lambda limit=5, leagueID=GLOBAL_LEAGUE: (getLatestSnapshotDate(leagueID), limit, leagueID)
+)
+
+def invalidateUser(userID):
+    #Drops every cached read for one user, e.g. after they trade
+    with _cacheLock:
+        for key in [k for k in _userCache.keys() if k[1] == userID]:
+            _userCache.pop(key, None)
+
+def invalidateMarket(name=None):
+    #Drops cached market-wide reads (all of them, or just one function's) and forces a fresh sync-stamp check
+    with _cacheLock:
+        _syncStampCache.clear()
+        for key in [k for k in _marketCache.keys() if name is None or k[0] == name]:
+            _marketCache.pop(key, None)
+
+def invalidateLeaderboard(leagueID=None):
+    #Forces a fresh version check for one league's leaderboard (or every league's); its pages are re-read only if it moved
+    with _cacheLock:
+        if leagueID is None:
+            _leaderboardVersionCache.clear()
+        else:
+            _leaderboardVersionCache.pop(leagueID, None)
+
+def clearCaches():
+    #Drops all cached reads, including the sync timestamp, leaderboard versions and snapshot dates
+    with _cacheLock:
+        _syncStampCache.clear()
+        _leaderboardVersionCache.clear()
+        _snapshotDateCache.clear()
+        _marketCache.clear()
+        _userCache.clear()
+
+def getCacheStats():
+    #Returns {function name: {"hits": n, "misses": n}} since the last reset
+    with _cacheLock:
+        return {name: dict(stats) for name, stats in _cacheStats.items()}
+
+def resetCacheStats():
+    with _cacheLock:
+        _cacheStats.clear()
+
+@marketCached
 def getAllStocks():
     #Fetches the list of all stocks from the database
-    response = supabase.table("stocks").select("*").order("ticker").execute()
+    response = getClient().table("stocks").select(STOCK_COLUMNS).order("ticker").execute()
     return response.data
 
+@userCached
 def getUserProfile(userID):
-    #Fetches a specific player's profile
+    #Fetches a specific player's profile; cash lives on their league memberships (see getMembership)
     try:
-        response = supabase.table("profiles").select("*").eq("id", userID).maybe_single().execute()
+        response = getClient().table("profiles").select(PROFILE_COLUMNS).eq("id", userID).maybe_single().execute()
         return response.data
     except Exception as e:
         print(f"Database Error: {e}")
         return None
 
+def getAllLeagues():
+    #Fetches every league the client can see, oldest first: all of them with the service key, for the nightly jobs. Not cached.
+    response = getClient().table("leagues").select(LEAGUE_COLUMNS).order("starts_on").order("name").execute()
+    return response.data
+
+@marketCached
+def getLeagues(today):
+    #Fetches the public leagues not finished by `today` (ISO date), oldest first; the same list for every caller, so it is shared
+    response = getClient().table("leagues").select(LEAGUE_COLUMNS) \
+        .eq("is_public", True) \
+        .or_(f"ends_on.is.null,ends_on.gte.{today}") \
+        .order("starts_on").order("name").execute()
+    return response.data
+
+@userCached
+def getUserLeagues(userID):
+    #Fetches the leagues a player belongs to, each membership row with its league embedded under 'leagues'
+    response = getClient().table("league_members") \
+        .select(f"{MEMBER_COLUMNS}, leagues({LEAGUE_COLUMNS}, join_code)") \
+        .eq("user_id", userID) \
+        .order("joined_at") \
+        .execute()
+    return response.data
+
+@userCached
+def getMembership(userID, leagueID=GLOBAL_LEAGUE):
+    #Fetches a player's membership in one league (username and that league's cash balance); None if not a member
+    try:
+        response = getClient().table("league_members").select(MEMBER_COLUMNS) \
+            .eq("league_id", leagueID).eq("user_id", userID).maybe_single().execute()
+        return response.data if response else None
+    except Exception as e:
+        print(f"Database Error: {e}")
+        return None
+
+def createLeague(userID, name, slug, startingCash, startsOn=None, endsOn=None, isPublic=True):
+    #Creates a league with the caller as its first member; returns (success, message, leagueID)
+    try:
+        response = getClient().rpc("create_league", {
+            "p_user_id": userID,
+            "p_name": name,
+            "p_slug": slug,
+            "p_starting_cash": float(startingCash),
+            "p_starts_on": _isoDate(startsOn),
+            "p_ends_on": _isoDate(endsOn),
+            "p_is_public": isPublic
+        }).execute()
+        return True, f"League '{name}' created!", response.data
+    except Exception as e:
+        return False, str(e), None
+    finally:
+        invalidateUser(userID)
+        invalidateMarket("getLeagues")
+
+def joinLeague(userID, leagueID=None, code=None):
+    #Adds the player to a league (by id, or by invite code for a private one) with its starting cash; returns (success, message)
+    try:
+        leagueID = getClient().rpc("join_league", {"p_user_id": userID, "p_league_id": leagueID, "p_code": code}).execute().data
+        return True, "Joined league!"
+    except Exception as e:
+        return False, str(e)
+    finally:
+        invalidateUser(userID)
+        invalidateLeaderboard(leagueID)
 
-def placeBuyOrder(userID, ticker, quantity, price):
-    #Calls the Supabase RPC function to process a trade
+def _isoDate(value):
+    return value if value is None or isinstance(value, str) else value.isoformat()
+
+
+def newOrderKey():
+    #A fresh idempotency key for one order submission
+    return str(uuid.uuid4())
+
+def _executeTrade(name, params):
+    """
+    Runs a trade RPC carrying `p_idempotency_key`. Connection errors and
+    timeouts are retried with the same key: if the first attempt committed,
+    the server returns its stored result instead of trading again. Errors
+    raised by the trade itself are not retried.
+    """
+    import httpx
+    for attempt in range(TRADE_RPC_RETRIES + 1):
+        try:
+            return getClient().rpc(name, params).execute().data
+        except httpx.TransportError:
+            if attempt == TRADE_RPC_RETRIES:
+                raise
+
+def _fillMessage(result, message, price):
+    #Tells the player when the order was a repeat, or filled away from the price they saw
+    result = result or {}
+    if result.get("duplicate"):
+        return "Order already placed."
+    filled = result.get("price")
+    if filled is not None and abs(float(filled) - float(price)) > 0.005:
+        return f"{message} Filled at ${float(filled):,.2f} GYD."
+    return message
+
+def placeBuyOrder(userID, ticker, quantity, price, leagueID=GLOBAL_LEAGUE, idempotencyKey=None):
+    """
+    Calls the Supabase RPC function to process a trade. `price` is the price
+    the player saw: the server rejects the trade if the synced price has moved
+    too far from it, and fills at the synced price. Pass the same
+    `idempotencyKey` for repeats of one submission (double clicks, reruns).
+    """
     try:
-        supabase.rpc("execute_buy_order", {
+        result = _executeTrade("execute_buy_order", {
             "p_user_id": userID,
             "p_ticker": ticker,
             "p_quantity": quantity,
-            "p_price": price
-        }).execute()
-        return True, "Trade Successful!"
+            "p_price": price,
+            "p_league_id": leagueID,
+            "p_idempotency_key": idempotencyKey or newOrderKey()
+        })
+        return True, _fillMessage(result, "Trade Successful!", price)
     except Exception as e:
         return False, str(e)
+    finally:
+        invalidateUser(userID)
+        invalidateLeaderboard(leagueID)
     
-def getUserPortfolio(userID):
+@userCached
+def getUserPortfolio(userID, leagueID=GLOBAL_LEAGUE):
     #Fetches the user's current holdings and joins with the stocks table to get live prices for P/L calc
-    response = supabase.table('portfolios') \
+    response = getClient().table('portfolios') \
         .select("ticker, shares_count, avg_price, stocks(name, current_price)") \
+        .eq("league_id", leagueID) \
         .eq("user_id", userID) \
         .execute()
     return response.data
 
-def placeSellOrder(userID, ticker, quantity, price):
-    #Calls another RPC function to process a sale
+def placeSellOrder(userID, ticker, quantity, price, leagueID=GLOBAL_LEAGUE, idempotencyKey=None):
+    #Calls another RPC function to process a sale; same price check and key as placeBuyOrder
     try:
-        supabase.rpc("execute_sell_order", {
+        result = _executeTrade("execute_sell_order", {
             "p_user_id": userID,
             'p_ticker': ticker,
             "p_quantity": quantity,
-            "p_price": price
-        }).execute()
-        return True, "Sale Successful!"
+            "p_price": price,
+            "p_league_id": leagueID,
+            "p_idempotency_key": idempotencyKey or newOrderKey()
+        })
+        return True, _fillMessage(result, "Sale Successful!", price)
     except Exception as e: return False, str(e)
+    finally:
+        invalidateUser(userID)
+        invalidateLeaderboard(leagueID)
+
+def placeBatchOrder(userID, legs, leagueID=GLOBAL_LEAGUE, idempotencyKey=None):
+    """
+    Submits a basket of buy/sell legs in one RPC call. The server executes the
+    whole basket atomically with a single cash check, so either every leg fills
+    or none do. Each leg's price is checked against the synced price like
+    placeBuyOrder, and `idempotencyKey` dedupes repeats of the same basket.
 
-def getTransactionHist(userID):
-    #Fetches a log of all completed trades
-    response = supabase.table("transactions") \
-        .select("*") \
+    `legs` is a list of {"side": "buy"|"sell", "ticker", "quantity", "price"}.
+    Returns (success, message, results) where results has one entry per leg
+    with a 'status' of 'filled' or 'rejected'.
+    """
+    payload = [{
+        "side": leg["side"].lower(),
+        "ticker": leg["ticker"],
+        "quantity": int(leg["quantity"]),
+        "price": float(leg["price"])
+    } for leg in legs]
+    try:
+        results = _executeTrade("execute_batch_order", {
+            "p_user_id": userID,
+            "p_legs": payload,
+            "p_league_id": leagueID,
+            "p_idempotency_key": idempotencyKey or newOrderKey()
+        })
+        if results and results[0].get("duplicate"):
+            return True, "Basket already placed.", results
+        return True, f"Basket of {len(payload)} orders filled!", results
+    except Exception as e:
+        return False, str(e), [dict(leg, status="rejected") for leg in payload]
+    finally:
+        invalidateUser(userID)
+        invalidateLeaderboard(leagueID)
+
+def placeStandingOrder(userID, ticker, kind, triggerPrice, side=None, quantity=None, direction=None,
+                       leagueID=GLOBAL_LEAGUE):
+    """
+    Stores a limit or stop order ('kind' with a 'side' and 'quantity') or a
+    price alert ('kind'="alert" with a 'direction' of "above"/"below"). The
+    market sync fills or fires it once a synced price crosses `triggerPrice`.
+    Returns (success, message).
+    """
+    from orders import triggerDirection
+    try:
+        row = {
+            "league_id": leagueID,
+            "user_id": userID,
+            "ticker": ticker,
+            "kind": kind,
+            "trigger_price": float(triggerPrice),
+            "direction": triggerDirection(kind, side, direction),
+        }
+        if triggerPrice <= 0:
+            raise ValueError("Trigger price must be positive")
+        if kind != "alert":
+            if quantity is None or int(quantity) <= 0:
+                raise ValueError("Quantity must be positive")
+            row.update(side=side, quantity=int(quantity))
+        getClient().table("standing_orders").insert(row).execute()
+        return True, "Alert set!" if kind == "alert" else f"{kind.title()} order placed!"
+    except Exception as e:
+        return False, str(e)
+    finally:
+        invalidateUser(userID)
+
+def cancelStandingOrder(userID, orderID):
+    #Cancels one of the user's orders or alerts if it is still open; returns (success, message)
+    from datetime import datetime, timezone
+    try:
+        response = getClient().table("standing_orders") \
+            .update({"status": "cancelled", "closed_at": datetime.now(timezone.utc).isoformat()}) \
+            .eq("id", orderID) \
+            .eq("user_id", userID) \
+            .eq("status", "open") \
+            .execute()
+        if not response.data:
+            return False, "Order is no longer open"
+        return True, "Order cancelled"
+    except Exception as e:
+        return False, str(e)
+    finally:
+        invalidateUser(userID)
+
+@userCached
+def getStandingOrders(userID, limit=STANDING_ORDER_LIMIT, leagueID=GLOBAL_LEAGUE):
+    #Fetches the user's most recent orders and alerts in one league, newest first, open or not
+    response = getClient().table("standing_orders") \
+        .select(STANDING_ORDER_COLUMNS) \
+        .eq("league_id", leagueID) \
         .eq("user_id", userID) \
         .order("created_at", desc=True) \
+        .limit(limit) \
         .execute()
     return response.data
 
-def getLeaderboard():
-    #Fetches top players by total net worth
-    response = supabase.table("leaderboard").select("*").limit(10).execute()
-    return response.data
\ No newline at end of file
+@userCached
+def getTransactionHist(userID, leagueID=GLOBAL_LEAGUE):
+    #Fetches every completed trade as one typed frame (see frames.py). Prefer getTransactionPage() for display.
+    import frames
+    pages = streamTransactions(userID, leagueID=leagueID)
+    return frames.concatFrames([frames.transactionsFrame(page) for page in pages], frames.TRANSACTION_SCHEMA)
+
+def _transactionQuery(userID, ticker=None, kind=None, start=None, end=None, leagueID=GLOBAL_LEAGUE):
+    #Builds the filtered, column-pruned history query; all filters run in the database
+    query = getClient().table("transactions") \
+        .select(TRANSACTION_COLUMNS) \
+        .eq("league_id", leagueID) \
+        .eq("user_id", userID)
+    if ticker:
+        query = query.eq("ticker", ticker)
+    if kind:
+        query = query.eq("type", kind.upper())
+    if start:
+        query = query.gte("created_at", _isoTimestamp(start))
+    if end:
+        query = query.lt("created_at", _isoTimestamp(end))
+    return query
+
+def _isoTimestamp(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+@userCached
+def getTransactionPage(userID, limit=TRANSACTION_PAGE_SIZE, cursor=None, ticker=None, kind=None, start=None, end=None,
+                       leagueID=GLOBAL_LEAGUE):
+    """
+    Fetches one page of a user's trades, newest first, as (rows, nextCursor).
+
+    Pages use keyset pagination on (created_at, id): pass the returned cursor to
+    get the next page, so deep pages cost the same as the first one. nextCursor
+    is None on the last page. `ticker`, `kind` ('BUY'/'SELL') and the
+    [start, end) date range are applied by the database, within one league.
+    """
+    query = _transactionQuery(userID, ticker, kind, start, end, leagueID)
+    if cursor is not None:
+        createdAt, rowID = cursor
+        query = query.or_(f"created_at.lt.{createdAt},and(created_at.eq.{createdAt},id.lt.{rowID})")
+    rows = query.order("created_at", desc=True) \
+        .order("id", desc=True) \
+        .limit(limit) \
+        .execute().data
+    nextCursor = (rows[-1]["created_at"], rows[-1]["id"]) if len(rows) == limit else None
+    return rows, nextCursor
+
+def streamTransactions(userID, chunkSize=EXPORT_CHUNK_SIZE, **filters):
+    #Yields a user's full (filtered) history one keyset page at a time, bypassing the cache
+    cursor = None
+    while True:
+        rows, cursor = getTransactionPage.uncached(userID, chunkSize, cursor, **filters)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+def exportTransactions(userID, path, fileFormat="csv", chunkSize=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Writes a user's full (filtered) history to `path` as CSV or Parquet, one
+    page at a time, so memory use is bounded by chunkSize rather than by the
+    length of the history. Returns the number of rows written.
+    """
+    written = 0
+    columns = [c.strip() for c in TRANSACTION_COLUMNS.split(",")]
+    if fileFormat == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([
+            ("id", pa.string()), ("created_at", pa.timestamp("us", tz="UTC")), ("type", pa.string()),
+            ("ticker", pa.string()), ("quantity", pa.int64()), ("price", pa.float64()), ("total_value", pa.float64())
+        ])
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in streamTransactions(userID, chunkSize, **filters):
+                chunk = {c: [row[c] for row in rows] for c in columns}
+                chunk["id"] = [str(v) for v in chunk["id"]]
+                chunk["created_at"] = _parseTimestamps(chunk["created_at"])
+                writer.write_table(pa.table(chunk, schema=schema))
+                written += len(rows)
+    else:
+        import csv
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            for rows in streamTransactions(userID, chunkSize, **filters):
+                writer.writerows(rows)
+                written += len(rows)
+    return written
+
+def streamLeagueTransactions(leagueID=GLOBAL_LEAGUE, chunkSize=EXPORT_CHUNK_SIZE):
+    #Yields every trade in one league, oldest first, one keyset page on (created_at, id) at a time
+    cursor = None
+    while True:
+        query = getClient().table("transactions").select(", ".join(LEAGUE_TRANSACTION_COLUMNS)) \
+            .eq("league_id", leagueID)
+        if cursor is not None:
+            createdAt, rowID = cursor
+            query = query.or_(f"created_at.gt.{createdAt},and(created_at.eq.{createdAt},id.gt.{rowID})")
+        rows = query.order("created_at").order("id").limit(chunkSize).execute().data
+        if rows:
+            yield rows
+        if len(rows) < chunkSize:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+def savePortfolioAnalytics(metrics, leagueID=GLOBAL_LEAGUE, chunkSize=ANALYTICS_WRITE_CHUNK):
+    #Upserts one league's analytics.computeLeagueAnalytics() frame into 'portfolio_analytics'; returns the rows written
+    rows = []
+    for record in metrics.to_dict("records"):
+        row = {}
+        for column, value in record.items():
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            elif hasattr(value, "item"):
+                value = value.item()
+            row[column] = None if isinstance(value, float) and value != value else value
+        row["league_id"] = leagueID
+        row["updated_at"] = "now()"
+        rows.append(row)
+    for i in range(0, len(rows), max(1, chunkSize)):
+        getClient().table("portfolio_analytics").upsert(rows[i:i + chunkSize]).execute()
+    with _cacheLock:
+        for key in [k for k in _userCache.keys() if k[0] == "getPortfolioAnalytics"]:
+            _userCache.pop(key, None)
+    return len(rows)
+
+@userCached
+def getPortfolioAnalytics(userID, leagueID=GLOBAL_LEAGUE):
+    #Fetches the metrics precomputed for one user by the nightly analytics job; None until it has run
+    response = getClient().table("portfolio_analytics").select(ANALYTICS_COLUMNS) \
+        .eq("league_id", leagueID).eq("user_id", userID).execute()
+    return response.data[0] if response.data else None
+
+def _parseTimestamps(values):
+    from datetime import datetime
+    return [datetime.fromisoformat(v) for v in values]
+
+@leaderboardCached
+def getLeaderboard(limit=10, offset=0, leagueID=GLOBAL_LEAGUE):
+    #Fetches a page of one league's players by total net worth from the materialized leaderboard (offset pagination)
+    response = getClient().table("leaderboard_ranked") \
+        .select(LEADERBOARD_COLUMNS) \
+        .eq("league_id", leagueID) \
+        .order("total_net_worth", desc=True) \
+        .order("user_id") \
+        .range(offset, offset + limit - 1) \
+        .execute()
+    return _withRanks(response.data, offset + 1)
+
+def getLeaderboardAfter(lastNetWorth, lastUserID, limit=10, lastRank=None, leagueID=GLOBAL_LEAGUE):
+    #Keyset pagination: the page right after (lastNetWorth, lastUserID), so deep pages cost the same as the first
+    response = getClient().table("leaderboard_ranked") \
+        .select(LEADERBOARD_COLUMNS) \
+        .eq("league_id", leagueID) \
+        .or_(f"total_net_worth.lt.{lastNetWorth},"
+             f"and(total_net_worth.eq.{lastNetWorth},user_id.gt.{lastUserID})") \
+        .order("total_net_worth", desc=True) \
+        .order("user_id") \
+        .limit(limit) \
+        .execute()
+    return _withRanks(response.data, lastRank + 1) if lastRank is not None else response.data
+
+@userCached
+def getUserRank(userID, leagueID=GLOBAL_LEAGUE):
+    #Fetches {rank, total_net_worth, total_players} for one user in a league without ranking everyone; None if unranked
+    response = getClient().rpc("get_leaderboard_rank", {"p_user_id": userID, "p_league_id": leagueID}).execute()
+    return response.data[0] if response.data else None
+
+@userCached
+def getRankHistory(userID, days=90, leagueID=GLOBAL_LEAGUE):
+    #Fetches one player's daily snapshots in a league (oldest first) for the last `days` days as a typed frame
+    import frames
+    response = getClient().table("league_snapshots") \
+        .select(SNAPSHOT_COLUMNS) \
+        .eq("league_id", leagueID) \
+        .eq("user_id", userID) \
+        .gte("snapshot_date", (date.today() - timedelta(days=days)).isoformat()) \
+        .order("snapshot_date") \
+        .execute()
+    return frames.snapshotsFrame(response.data)
+
+@moversCached
+def getTopMovers(limit=5, leagueID=GLOBAL_LEAGUE):
+    #Fetches the players who gained and lost the most places in a league's latest snapshot, as (risers, fallers)
+    snapshotDate = getLatestSnapshotDate(leagueID)
+    if snapshotDate is None:
+        return [], []
+    return _movers(leagueID, snapshotDate, limit, rising=True), _movers(leagueID, snapshotDate, limit, rising=False)
+
+def _movers(leagueID, snapshotDate, limit, rising):
+    query = getClient().table("league_snapshots") \
+        .select(SNAPSHOT_COLUMNS) \
+        .eq("league_id", leagueID) \
+        .eq("snapshot_date", snapshotDate)
+    query = query.gt("rank_change", 0) if rising else query.lt("rank_change", 0)
+    return query.order("rank_change", desc=rising).order("rank").limit(limit).execute().data
+
+def _withRanks(rows, firstRank):
+    for i, row in enumerate(rows):
+        row["rank"] = firstRank + i
+    return rows
+
+def _emptyHistory():
+    import pandas as pd
+    return pd.DataFrame({
+        "ticker": pd.Series(dtype="string"),
+        "trade_date": pd.Series(dtype="datetime64[ns]"),
+        "price": pd.Series(dtype="float64"),
+    })
+
+def _toHistoryFrame(rows):
+    #Converts PostgREST rows into typed columns
+    import pandas as pd
+    if not rows:
+        return _emptyHistory()
+    df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+    df["ticker"] = df["ticker"].astype("string")
+    df["trade_date"] = pd.to_datetime(df["trade_date"])
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").astype("float64")
+    return df
+
+def _queryPriceHistory(tickers, start, end):
+    #One bulk query for all tickers, paged only when the result exceeds PostgREST's row cap
+    rows = []
+    offset = 0
+    while True:
+        response = getClient().table("price_history") \
+            .select(", ".join(HISTORY_COLUMNS)) \
+            .in_("ticker", tickers) \
+            .gte("trade_date", start.isoformat()) \
+            .lte("trade_date", end.isoformat()) \
+            .order("trade_date").order("ticker") \
+            .range(offset, offset + HISTORY_PAGE_SIZE - 1) \
+            .execute()
+        rows.extend(response.data)
+        if len(response.data) < HISTORY_PAGE_SIZE:
+            return _toHistoryFrame(rows)
+        offset += HISTORY_PAGE_SIZE
+
+def _historyCachePaths():
+    return (os.path.join(HISTORY_CACHE_DIR, "price_history.parquet"),
+            os.path.join(HISTORY_CACHE_DIR, "manifest.json"))
+
+def _loadHistoryCache():
+    #Returns the cached rows and a {ticker: (from, through)} map of the date range each ticker covers
+    import pandas as pd
+    dataPath, manifestPath = _historyCachePaths()
+    try:
+        with open(manifestPath) as f:
+            manifest = {t: (date.fromisoformat(a), date.fromisoformat(b)) for t, (a, b) in json.load(f).items()}
+        return pd.read_parquet(dataPath), manifest
+    except (OSError, ValueError):
+        return _emptyHistory(), {}
+
+def _saveHistoryCache(df, manifest):
+    #Writes to temp files first so a concurrent reader never sees a half-written cache
+    os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+    dataPath, manifestPath = _historyCachePaths()
+    df.to_parquet(dataPath + ".tmp", index=False)
+    with open(manifestPath + ".tmp", "w") as f:
+        json.dump({t: [a.isoformat(), b.isoformat()] for t, (a, b) in manifest.items()}, f)
+    os.replace(dataPath + ".tmp", dataPath)
+    os.replace(manifestPath + ".tmp", manifestPath)
+
+@marketCached
+def getRecentPriceHistory(tickers, days=90):
+    """
+    getPriceHistory() for `tickers` (a tuple) over the last `days` days, shared
+    by every session until the next sync moves the sync stamp. Callers must
+    not modify the returned frame.
+    """
+    return getPriceHistory(tickers, start=date.today() - timedelta(days=days))
+
+def getPriceHistory(tickers, start=None, end=None, useCache=True):
+    """
+    Fetches daily prices for many tickers between start and end (inclusive) as a
+    long DataFrame with columns ticker, trade_date and price, sorted by date.
+
+    All tickers are read in a single bulk query. Rows older than
+    HISTORY_SEAL_DAYS are kept in a local Parquet cache, so repeat calls only
+    ask the database for the recent dates the cache does not cover yet.
+    """
+    import pandas as pd
+    tickers = sorted(set(tickers))
+    end = pd.Timestamp(end).date() if end is not None else date.today()
+    start = pd.Timestamp(start).date() if start is not None else date(1900, 1, 1)
+    if not tickers or start > end:
+        return _emptyHistory()
+
+    with _historyCacheLock:
+        cached, manifest = _loadHistoryCache() if useCache else (_emptyHistory(), {})
+
+        # Only trust the cache when it covers the start of the window for every ticker
+        cacheHit = all(t in manifest and manifest[t][0] <= start for t in tickers)
+        queryFrom = min(manifest[t][1] for t in tickers) + timedelta(days=1) if cacheHit else start
+
+        fresh = _queryPriceHistory(tickers, queryFrom, end) if queryFrom <= end else _emptyHistory()
+        fromCache = cached[cached["ticker"].isin(tickers)] if cacheHit else _emptyHistory()
+
+        if useCache:
+            sealed = min(end, date.today() - timedelta(days=HISTORY_SEAL_DAYS))
+            if queryFrom <= sealed:
+                kept = cached[~cached["ticker"].isin(tickers)] if not cacheHit else cached
+                newRows = fresh[fresh["trade_date"] <= pd.Timestamp(sealed)]
+                merged = pd.concat([kept, newRows], ignore_index=True) \
+                    .drop_duplicates(["ticker", "trade_date"], keep="last")
+                for t in tickers:
+                    manifest[t] = (manifest[t][0] if cacheHit else start,
+                                   max(sealed, manifest[t][1]) if cacheHit else sealed)
+                _saveHistoryCache(merged, manifest)
+
+    window = pd.concat([fromCache, fresh], ignore_index=True)
+    window = window[(window["trade_date"] >= pd.Timestamp(start)) & (window["trade_date"] <= pd.Timestamp(end))]
+    return window.drop_duplicates(["ticker", "trade_date"], keep="last") \
+        .sort_values(["trade_date", "ticker"], ignore_index=True)
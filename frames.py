@@ -0,0 +1,74 @@
+"""
+Typed columnar decoding of PostgREST rows.
+
+database.py returns JSON rows as lists of dicts. The decoders here turn them
+into DataFrames with one Arrow conversion per column: strings and numbers are
+Arrow-backed (numbers stay numeric, with nulls instead of object columns),
+tickers are dictionary-encoded categoricals, and ISO timestamps are parsed by
+Arrow and converted to Guyana time once, when the rows are decoded. Readers
+that return frames keep them in database.py's caches, so a rerun reuses the
+converted columns. Only pandas and pyarrow are used, so this can be used (and
+tested) without Streamlit.
+"""
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+LOCAL_TZ = ZoneInfo("America/Guyana")
+
+# Column kinds: "category", "string", "float", "int", "timestamp" (tz-aware, local) and "date" (naive)
+STOCK_SCHEMA = {"ticker": "category", "name": "string", "current_price": "float", "last_updated": "timestamp"}
+TRANSACTION_SCHEMA = {"id": "string", "created_at": "timestamp", "type": "category", "ticker": "category",
+                      "quantity": "int", "price": "float", "total_value": "float"}
+SNAPSHOT_SCHEMA = {"snapshot_date": "date", "user_id": "string", "username": "string", "net_worth": "float",
+                   "rank": "int", "rank_change": "float"}
+
+_ARROW_TYPES = {"string": pa.string(), "float": pa.float64(), "int": pa.int64()}
+
+def _arrowStrings(values):
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+def localTimestamps(values, tz=LOCAL_TZ):
+    #Parses ISO timestamp strings (any offset) into a tz-aware DatetimeIndex in `tz`; None becomes NaT
+    utc = pc.cast(_arrowStrings(values), pa.timestamp("ns", tz="UTC"))
+    return pd.DatetimeIndex(utc.to_pandas()).tz_convert(tz)
+
+def _decodeColumn(values, kind, tz):
+    if kind == "category":
+        return _arrowStrings(values).dictionary_encode().to_pandas().array
+    if kind == "timestamp":
+        return localTimestamps(values, tz)
+    if kind == "date":
+        return pc.cast(_arrowStrings(values), pa.timestamp("ns")).to_pandas().to_numpy()
+    return pd.arrays.ArrowExtensionArray(pa.array(values, type=_ARROW_TYPES[kind], from_pandas=True))
+
+def decodeRows(rows, schema, tz=LOCAL_TZ):
+    """
+    Decodes a list of row dicts into a DataFrame with one typed column per
+    `schema` entry, in schema order. Keys missing from a row decode as nulls;
+    keys not in the schema are dropped.
+    """
+    return pd.DataFrame({column: _decodeColumn([row.get(column) for row in rows], kind, tz)
+                         for column, kind in schema.items()})
+
+def concatFrames(frames, schema):
+    #Joins decoded pages; categorical columns are re-unified instead of falling back to object
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return decodeRows([], schema)
+    if len(frames) == 1:
+        return frames[0]
+    categorical = [c for c, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    joined = pd.concat([f.astype({c: object for c in categorical}) for f in frames], ignore_index=True)
+    return joined.astype({c: "category" for c in categorical})
+
+def stocksFrame(rows, tz=LOCAL_TZ):
+    return decodeRows(rows, STOCK_SCHEMA, tz)
+
+def transactionsFrame(rows, tz=LOCAL_TZ):
+    return decodeRows(rows, TRANSACTION_SCHEMA, tz)
+
+def snapshotsFrame(rows):
+    return decodeRows(rows, SNAPSHOT_SCHEMA)
@@ -0,0 +1,321 @@
+"""
+Request-level instrumentation for database.py and the dashboard views.
+
+Every query or RPC that database.py sends through getClient() is timed, with
+its row count, response bytes and error (if any). Each call is
+added to the current rerun's trace (one per thread, so one per Streamlit
+session run) and to process-wide aggregates. Views record their render time
+the same way. Only the standard library is used, so importing this is cheap.
+
+    GSE_INSTRUMENTATION=0   turn recording off
+    GSE_METRICS_FILE=path   append every finished rerun as one JSON line
+    GSE_METRICS_PORT=9108   serve the aggregates in Prometheus text format at /metrics
+    GSE_METRICS_HOST=addr   address the metrics server binds (default 127.0.0.1)
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+ENABLED = os.getenv("GSE_INSTRUMENTATION", "1") != "0"
+METRICS_FILE = os.getenv("GSE_METRICS_FILE")
+METRICS_PORT = int(os.getenv("GSE_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("GSE_METRICS_HOST", "127.0.0.1") #Loopback only unless a scraper elsewhere needs it
+PROFILE_INTERVAL = float(os.getenv("GSE_PROFILE_INTERVAL", "0.005"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#Query-builder methods that decide what kind of request a chain sends
+WRITE_METHODS = ("insert", "upsert", "update", "delete")
+
+_lock = threading.Lock()
+_local = threading.local()
+_callStats = {} #(function, call) -> aggregate
+_viewStats = {} #view -> aggregate
+_metricsServer = None
+
+# --- traces and aggregates ---
+
+def _newAggregate():
+    return {"count": 0, "errors": 0, "seconds": 0.0, "rows": 0, "bytes": 0, "buckets": [0] * len(LATENCY_BUCKETS)}
+
+def _aggregate(stats, key, seconds, rows=0, payloadBytes=0, error=False):
+    with _lock:
+        agg = stats.setdefault(key, _newAggregate())
+        agg["count"] += 1
+        agg["errors"] += bool(error)
+        agg["seconds"] += seconds
+        agg["rows"] += rows
+        agg["bytes"] += payloadBytes
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                agg["buckets"][i] += 1
+
+def startRun(label=None):
+    #Starts a fresh trace for this thread's rerun; calls made before the first startRun() only reach the aggregates
+    _local.run = {"label": label, "startedAt": time.time(), "start": time.perf_counter(), "calls": [], "views": []}
+    return _local.run
+
+def currentRun():
+    return getattr(_local, "run", None)
+
+def recordResponseBytes(response):
+    #httpx "response" event hook: notes the body size on the wire for the request this thread is executing
+    if not ENABLED:
+        return
+    length = response.headers.get("content-length")
+    if length is None:
+        response.read()
+        length = response.num_bytes_downloaded
+    _local.responseBytes = int(length)
+
+def _payloadStats(data):
+    #Row count and the body size recordResponseBytes saw (0 if the client has no hook installed)
+    rows = 0 if data is None else len(data) if isinstance(data, list) else 1
+    return rows, getattr(_local, "responseBytes", 0)
+
+def recordCall(function, call, seconds, rows=0, payloadBytes=0, error=None):
+    if not ENABLED:
+        return
+    _aggregate(_callStats, (function, call), seconds, rows, payloadBytes, error)
+    run = currentRun()
+    if run is not None:
+        run["calls"].append({"function": function, "call": call, "ms": seconds * 1000,
+                             "rows": rows, "bytes": payloadBytes, "error": error, "cached": False})
+
+def recordCacheHit(function):
+    #Cache hits cost no round trip; they only show up in the rerun's trace
+    run = currentRun()
+    if ENABLED and run is not None:
+        run["calls"].append({"function": function, "call": "cache", "ms": 0.0,
+                             "rows": 0, "bytes": 0, "error": None, "cached": True})
+
+def recordView(view, seconds):
+    if not ENABLED:
+        return
+    _aggregate(_viewStats, view, seconds)
+    run = currentRun()
+    if run is not None:
+        run["views"].append({"view": view, "ms": seconds * 1000})
+
+def timedExecute(function, call, execute):
+    #Runs one request (`execute` is the builder's execute method) and records it, re-raising any error
+    _local.responseBytes = 0
+    start = time.perf_counter()
+    try:
+        response = execute()
+    except Exception as e:
+        recordCall(function, call, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        raise
+    seconds = time.perf_counter() - start
+    if ENABLED:
+        rows, payloadBytes = _payloadStats(getattr(response, "data", None))
+        recordCall(function, call, seconds, rows, payloadBytes)
+    return response
+
+def runSummary(run=None):
+    #Totals for a trace: wall time so far, round trips, cache hits, rows, bytes and errors
+    run = run or currentRun()
+    if run is None:
+        return None
+    calls = [c for c in run["calls"] if not c["cached"]]
+    return {
+        "label": run["label"],
+        "ms": (time.perf_counter() - run["start"]) * 1000,
+        "dbMs": sum(c["ms"] for c in calls),
+        "roundTrips": len(calls),
+        "cacheHits": len(run["calls"]) - len(calls),
+        "rows": sum(c["rows"] for c in calls),
+        "bytes": sum(c["bytes"] for c in calls),
+        "errors": sum(1 for c in calls if c["error"]),
+    }
+
+def finishRun(path=METRICS_FILE):
+    #Closes this thread's trace and, when a metrics file is configured, appends it as one JSON line
+    run = currentRun()
+    if run is None:
+        return None
+    summary = runSummary(run)
+    if ENABLED and path:
+        record = dict(summary, startedAt=run["startedAt"], views=run["views"], calls=run["calls"])
+        with _lock, open(path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    return summary
+
+def getCallStats():
+    #Returns {(function, call): aggregate} since the last reset
+    with _lock:
+        return {key: dict(agg, buckets=list(agg["buckets"])) for key, agg in _callStats.items()}
+
+def resetStats():
+    with _lock:
+        _callStats.clear()
+        _viewStats.clear()
+
+# --- client wrapper ---
+
+class _InstrumentedQuery:
+    #Proxies a postgrest-py builder; execute() is timed and labelled "<method> <table>" or "rpc <function>"
+    def __init__(self, builder, target, method="select"):
+        self._builder = builder
+        self._target = target
+        self._method = method
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+        method = name if name in WRITE_METHODS else self._method
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _InstrumentedQuery(result, self._target, method) if hasattr(result, "execute") else result
+        return chained
+
+    def execute(self):
+        # The caller is the database.py function that built the query
+        function = sys._getframe(1).f_code.co_name
+        call = self._target if self._target.startswith("rpc ") else f"{self._method} {self._target}"
+        return timedExecute(function, call, self._builder.execute)
+
+class _InstrumentedClient:
+    #Proxies a Supabase client so table(), from_() and rpc() requests are recorded; everything else passes through
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _InstrumentedQuery(self._client.table(name), name)
+
+    def from_(self, name):
+        return _InstrumentedQuery(self._client.from_(name), name)
+
+    def rpc(self, name, params=None):
+        return _InstrumentedQuery(self._client.rpc(name, params or {}), f"rpc {name}")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def instrumentClient(client):
+    return _InstrumentedClient(client) if ENABLED and client is not None else client
+
+# --- export ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+def _histogram(lines, name, labels, agg):
+    for bound, count in zip(LATENCY_BUCKETS, agg["buckets"]):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {agg["count"]}')
+    lines.append(f"{name}_sum{{{labels}}} {agg['seconds']:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {agg['count']}")
+
+def prometheusText():
+    #Renders the process-wide aggregates in the Prometheus text exposition format
+    with _lock:
+        calls = {k: dict(v) for k, v in _callStats.items()}
+        views = {k: dict(v) for k, v in _viewStats.items()}
+    lines = [
+        "# HELP gse_db_call_seconds Latency of database and RPC calls made by database.py",
+        "# TYPE gse_db_call_seconds histogram",
+    ]
+    for (function, call), agg in sorted(calls.items()):
+        _histogram(lines, "gse_db_call_seconds", _labels(function=function, call=call), agg)
+    for metric, field, description in (("gse_db_call_errors_total", "errors", "Database calls that raised"),
+                                ("gse_db_rows_total", "rows", "Rows returned by database calls"),
+                                ("gse_db_bytes_total", "bytes", "Approximate payload bytes returned by database calls")):
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{{{_labels(function=function, call=call)}}} {agg[field]}"
+                  for (function, call), agg in sorted(calls.items())]
+    lines += ["# HELP gse_view_render_seconds Render time of each dashboard view",
+              "# TYPE gse_view_render_seconds histogram"]
+    for view, agg in sorted(views.items()):
+        _histogram(lines, "gse_view_render_seconds", _labels(view=view), agg)
+    return "\n".join(lines) + "\n"
+
+def startMetricsServer(port=METRICS_PORT, host=METRICS_HOST):
+    #Serves prometheusText() at /metrics on `host` from a daemon thread; only the first call in a process starts it
+    global _metricsServer
+    if not port:
+        return None
+    with _lock:
+        if _metricsServer is not None:
+            return _metricsServer
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = prometheusText().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _metricsServer = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=_metricsServer.serve_forever, name="gse-metrics", daemon=True).start()
+        return _metricsServer
+
+# --- sampling profiler ---
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread, with no dependencies and no tracing overhead on the
+    profiled code. top() ranks functions by samples where they were running
+    ("self") and where they were anywhere on the stack ("total").
+    """
+    def __init__(self, interval=PROFILE_INTERVAL, threadID=None):
+        self.interval = interval
+        self.threadID = threadID or threading.get_ident()
+        self.samples = 0
+        self.selfCounts = {}
+        self.totalCounts = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.threadID)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                if top:
+                    self.selfCounts[key] = self.selfCounts.get(key, 0) + 1
+                    top = False
+                if key not in seen:
+                    seen.add(key)
+                    self.totalCounts[key] = self.totalCounts.get(key, 0) + 1
+                frame = frame.f_back
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="gse-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def top(self, limit=15):
+        rows = [{"function": key, "selfMs": self.selfCounts.get(key, 0) * self.interval * 1000,
+                 "totalMs": count * self.interval * 1000,
+                 "totalPct": count / self.samples * 100 if self.samples else 0.0}
+                for key, count in self.totalCounts.items()]
+        return sorted(rows, key=lambda r: (r["selfMs"], r["totalMs"]), reverse=True)[:limit]
@@ -0,0 +1,158 @@
+"""
+Process-wide live price snapshot.
+
+One Supabase Realtime subscription per server process listens for changes to
+'stocks' (and 'leaderboard_ranked') and keeps an in-memory copy of every
+stock row up to date. Streamlit sessions read prices from that copy, so a
+rerun costs no database read. The database is read once when the feed starts
+and again after a reconnect.
+"""
+import os
+import time
+import asyncio
+import threading
+
+import database
+
+LEADERBOARD_TABLE = "leaderboard_ranked"
+
+class PriceSnapshot:
+    #Thread-safe {ticker: stock row} with a version number that increases on every change
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self.version = 0
+        self.updatedAt = None
+
+    def replace(self, rows):
+        with self._lock:
+            self._rows = {row['ticker']: dict(row) for row in rows}
+            self.version += 1
+            self.updatedAt = time.time()
+
+    def apply(self, eventType, record, oldRecord=None):
+        with self._lock:
+            if eventType == "DELETE":
+                self._rows.pop((oldRecord or record or {}).get('ticker'), None)
+            elif record:
+                self._rows.setdefault(record['ticker'], {}).update(record)
+            self.version += 1
+            self.updatedAt = time.time()
+
+    def rows(self):
+        #Same shape as database.getAllStocks(): a list of rows ordered by ticker
+        with self._lock:
+            return [dict(self._rows[t]) for t in sorted(self._rows)]
+
+snapshot = PriceSnapshot()
+_feedLock = threading.Lock()
+_feedStarted = False
+_feedReady = threading.Event()
+_feedFailed = threading.Event()
+stats = {"snapshotLoads": 0, "stockEvents": 0, "leaderboardEvents": 0}
+
+def reloadSnapshot():
+    #Re-reads every stock in one query; used on start-up and after a reconnect
+    snapshot.replace(database.getAllStocks.uncached())
+    stats["snapshotLoads"] += 1
+
+def handleChange(payload):
+    """
+    Applies one Realtime postgres_changes payload. Stock changes update the
+    snapshot and leaderboard changes force a fresh check of that league's
+    leaderboard version.
+    """
+    data = payload.get("data", payload)
+    table = data.get("table")
+    if table == "stocks":
+        snapshot.apply(data.get("type"), data.get("record"), data.get("old_record"))
+        stats["stockEvents"] += 1
+        # New prices: let the sync-stamp-keyed caches (stocks, history) refresh on their next read
+        database.invalidateMarket()
+    elif table == LEADERBOARD_TABLE:
+        stats["leaderboardEvents"] += 1
+        # Only the changed league's version is re-checked; other leagues keep their cached pages
+        record = data.get("record") or data.get("old_record") or {}
+        database.invalidateLeaderboard(record.get("league_id"))
+
+def _subscribeRealtime(onChange, onSubscribed):
+    #Runs the Supabase Realtime websocket on its own daemon thread with its own event loop
+    from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+
+    async def run():
+        client = AsyncRealtimeClient(f"{database.URL}/realtime/v1", database.KEY)
+        await client.connect()
+        channel = client.channel("live-prices")
+        channel.on_postgres_changes("*", onChange, table="stocks", schema="public")
+        channel.on_postgres_changes("*", onChange, table=LEADERBOARD_TABLE, schema="public")
+
+        def onState(state, error):
+            if state == RealtimeSubscribeStates.SUBSCRIBED:
+                onSubscribed()
+            elif error:
+                print(f"Live price feed error: {error}")
+
+        await channel.subscribe(onState)
+        # The client listens and reconnects on its own tasks; just keep the loop alive
+        await asyncio.Event().wait()
+
+    def runForever():
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            # Sessions fall back to regular cached reads if the websocket cannot be kept up
+            print(f"Live price feed stopped: {e}")
+            _feedFailed.set()
+
+    threading.Thread(target=runForever, name="live-prices", daemon=True).start()
+
+def startPriceFeed(subscribe=None):
+    """
+    Starts the process-wide feed once; later calls are no-ops. `subscribe` is
+    called as subscribe(onChange, onSubscribed) and defaults to Supabase
+    Realtime. The offline benchmarks pass a local publisher instead.
+    """
+    global _feedStarted
+    with _feedLock:
+        if _feedStarted:
+            return
+        try:
+            reloadSnapshot()
+        except Exception as e:
+            print(f"Could not load the live price snapshot: {e}")
+            return
+        _feedStarted = True
+        _feedReady.set()
+    # A (re)subscribe may have missed changes while disconnected, so reload on every SUBSCRIBED after the first
+    firstSubscribe = [True]
+
+    def onSubscribed():
+        if firstSubscribe[0]:
+            firstSubscribe[0] = False
+        else:
+            reloadSnapshot()
+
+    (subscribe or _subscribeRealtime)(handleChange, onSubscribed)
+
+def feedEnabled():
+    return os.getenv("LIVE_PRICES", "1") != "0"
+
+def getLivePrices():
+    #Current stock rows from the live snapshot, or a regular (cached) read when the feed is disabled
+    if not feedEnabled() or _feedFailed.is_set():
+        return database.getAllStocks()
+    startPriceFeed()
+    if not _feedReady.is_set():
+        return database.getAllStocks()
+    return snapshot.rows()
+
+def resetPriceFeed():
+    #Forgets the running feed and snapshot so a benchmark can start a fresh one
+    global _feedStarted, snapshot
+    with _feedLock:
+        _feedStarted = False
+        _feedReady.clear()
+        _feedFailed.clear()
+        snapshot = PriceSnapshot()
+        for key in stats:
+            stats[key] = 0
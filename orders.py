@@ -0,0 +1,97 @@
+"""
+Matching engine for standing orders and price alerts.
+
+Limit and stop orders and alerts rest in 'standing_orders' until a synced
+price crosses their trigger. Every order reduces to a direction: it fires when
+the price rises to or above its trigger ('above') or falls to or below it
+('below'):
+
+    limit buy  -> below        limit sell -> above
+    stop buy   -> above        stop sell  -> below
+    alert      -> whichever the user picked
+
+OrderBook sorts the triggers of each (ticker, direction) group once, so
+matching a new price is one binary search per group and the triggered orders
+are a contiguous slice; orders that did not trigger are never looked at.
+Nothing here talks to the database: syncStocks.py loads the open orders and
+executes the matches.
+"""
+import numpy as np
+import pandas as pd
+
+ORDER_KINDS = ("limit", "stop", "alert")
+ORDER_SIDES = ("buy", "sell")
+ORDER_DIRECTIONS = ("above", "below")
+
+_DIRECTIONS = {("limit", "buy"): "below", ("limit", "sell"): "above",
+               ("stop", "buy"): "above", ("stop", "sell"): "below"}
+
+def triggerDirection(kind, side=None, direction=None):
+    #Returns the direction an order fires in; alerts must name theirs, orders derive it from kind and side
+    if kind not in ORDER_KINDS:
+        raise ValueError(f"Order kind must be one of {', '.join(ORDER_KINDS)}")
+    if kind == "alert":
+        if direction not in ORDER_DIRECTIONS:
+            raise ValueError("Alerts need a direction: above or below")
+        return direction
+    if side not in ORDER_SIDES:
+        raise ValueError("Limit and stop orders need a side: buy or sell")
+    return _DIRECTIONS[(kind, side)]
+
+class OrderBook:
+    """
+    Open orders indexed for matching. `tickers`, `directions` and `triggers`
+    are aligned, one entry per order; matches are reported as positions into
+    them, so the caller can keep any other order columns alongside.
+    """
+    def __init__(self, tickers, directions, triggers):
+        tickers = np.asarray(tickers, dtype=object)
+        above = np.asarray(directions, dtype=object) == "above"
+        triggers = np.asarray(triggers, dtype=np.float64)
+        self.size = len(triggers)
+
+        # One sort groups orders by (ticker, direction) and orders each group by trigger
+        codes, self._tickers = pd.factorize(tickers)
+        groups = codes * 2 + above
+        self._order = np.lexsort((triggers, groups))
+        self._triggers = triggers[self._order]
+        sortedGroups = groups[self._order]
+        starts = np.flatnonzero(np.r_[True, sortedGroups[1:] != sortedGroups[:-1]]) if self.size else np.array([], int)
+        ends = np.r_[starts[1:], self.size]
+        self._slices = {int(g): (int(s), int(e)) for g, s, e in zip(sortedGroups[starts], starts, ends)}
+        self._codes = {t: i for i, t in enumerate(self._tickers)}
+
+    def __len__(self):
+        return self.size
+
+    def match(self, prices):
+        """
+        Finds the orders triggered by `prices` ({ticker: price}). Returns
+        (positions, fillPrices): the triggered orders' positions, ascending,
+        and the price each one triggered at. Missing or non-positive prices
+        trigger nothing.
+        """
+        positions, fillPrices = [], []
+        for ticker, price in prices.items():
+            code = self._codes.get(ticker)
+            if code is None or price is None or not price > 0:
+                continue
+            for above in (True, False):
+                bounds = self._slices.get(code * 2 + above)
+                if bounds is None:
+                    continue
+                start, end = bounds
+                if above:
+                    # Triggers at or below the price have been reached from below
+                    end = start + int(np.searchsorted(self._triggers[start:end], price, side="right"))
+                else:
+                    start = start + int(np.searchsorted(self._triggers[start:end], price, side="left"))
+                if end > start:
+                    positions.append(self._order[start:end])
+                    fillPrices.append(np.full(end - start, price, dtype=np.float64))
+        if not positions:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+        positions = np.concatenate(positions)
+        fillPrices = np.concatenate(fillPrices)
+        keep = np.argsort(positions, kind="stable")
+        return positions[keep], fillPrices[keep]
@@ -0,0 +1,21 @@
+-- Append-only history of every price observed by syncStocks.py.
+-- One row per ticker per GSE trade date; re-syncing the same session is a no-op.
+create table if not exists public.price_history (
+    ticker      text        not null references public.stocks (ticker) on delete cascade,
+    trade_date  date        not null,
+    session     text,
+    price       numeric     not null,
+    observed_at timestamptz not null default now(),
+    primary key (ticker, trade_date)
+);
+
+-- getPriceHistory() filters on a date range across many tickers at once
+create index if not exists price_history_trade_date_idx
+    on public.price_history (trade_date, ticker);
+
+alter table public.price_history enable row level security;
+
+drop policy if exists "Price history is readable by everyone" on public.price_history;
+create policy "Price history is readable by everyone"
+    on public.price_history for select
+    using (true);
@@ -0,0 +1,155 @@
+-- Materialized leaderboard.
+-- Net worth (cash + shares * current price) is stored per user instead of being
+-- recomputed for everyone on every read. refresh_leaderboard() rebuilds it after
+-- a price sync and triggers keep the affected user's row current after each trade.
+-- user_id deliberately has no foreign key so benchmarks can seed synthetic rows.
+create table if not exists public.leaderboard_ranked (
+    user_id         uuid        primary key,
+    username        text,
+    cash_balance    numeric     not null default 0,
+    stock_value     numeric     not null default 0,
+    total_net_worth numeric     not null default 0,
+    updated_at      timestamptz not null default now()
+);
+
+-- Serves top-N reads, keyset pages and rank counts without touching other tables
+create index if not exists leaderboard_ranked_net_worth_idx
+    on public.leaderboard_ranked (total_net_worth desc, user_id);
+
+alter table public.leaderboard_ranked enable row level security;
+
+-- One global board for now; 20261017170000_leagues.sql scopes it to public leagues and their members
+drop policy if exists "Leaderboard is readable by everyone" on public.leaderboard_ranked;
+create policy "Leaderboard is readable by everyone"
+    on public.leaderboard_ranked for select
+    using (true);
+
+-- Recomputes one user's row
+create or replace function public.refresh_leaderboard_user(p_user_id uuid)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    insert into leaderboard_ranked (user_id, username, cash_balance, stock_value, total_net_worth, updated_at)
+    select pr.id,
+           pr.username,
+           pr.cash_balance,
+           coalesce(h.stock_value, 0),
+           pr.cash_balance + coalesce(h.stock_value, 0),
+           now()
+    from profiles pr
+    left join (
+        select po.user_id, sum(po.shares_count * s.current_price) as stock_value
+        from portfolios po
+        join stocks s on s.ticker = po.ticker
+        where po.user_id = p_user_id
+        group by po.user_id
+    ) h on h.user_id = pr.id
+    where pr.id = p_user_id
+    on conflict (user_id) do update
+        set username        = excluded.username,
+            cash_balance    = excluded.cash_balance,
+            stock_value     = excluded.stock_value,
+            total_net_worth = excluded.total_net_worth,
+            updated_at      = excluded.updated_at;
+$$;
+
+-- Rebuilds every row in one set-based pass; called by syncStocks.py after prices change
+create or replace function public.refresh_leaderboard()
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_rows integer;
+begin
+    insert into leaderboard_ranked (user_id, username, cash_balance, stock_value, total_net_worth, updated_at)
+    select pr.id,
+           pr.username,
+           pr.cash_balance,
+           coalesce(h.stock_value, 0),
+           pr.cash_balance + coalesce(h.stock_value, 0),
+           now()
+    from profiles pr
+    left join (
+        select po.user_id, sum(po.shares_count * s.current_price) as stock_value
+        from portfolios po
+        join stocks s on s.ticker = po.ticker
+        group by po.user_id
+    ) h on h.user_id = pr.id
+    on conflict (user_id) do update
+        set username        = excluded.username,
+            cash_balance    = excluded.cash_balance,
+            stock_value     = excluded.stock_value,
+            total_net_worth = excluded.total_net_worth,
+            updated_at      = excluded.updated_at
+        where leaderboard_ranked.total_net_worth is distinct from excluded.total_net_worth
+           or leaderboard_ranked.username is distinct from excluded.username;
+    get diagnostics v_rows = row_count;
+
+    delete from leaderboard_ranked lr
+    where not exists (select 1 from profiles pr where pr.id = lr.user_id);
+
+    return v_rows;
+end;
+$$;
+
+-- 1-based rank of one user. Counts only the rows above them through the
+-- (total_net_worth desc, user_id) index instead of ranking the whole table.
+-- total_players is the planner's row estimate, which is cheap and close enough for display.
+create or replace function public.get_leaderboard_rank(p_user_id uuid)
+returns table (rank bigint, total_net_worth numeric, total_players bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select (select count(*)
+            from leaderboard_ranked o
+            where o.total_net_worth > me.total_net_worth
+               or (o.total_net_worth = me.total_net_worth and o.user_id < me.user_id)) + 1,
+           me.total_net_worth,
+           (select reltuples::bigint from pg_class where oid = 'public.leaderboard_ranked'::regclass)
+    from leaderboard_ranked me
+    where me.user_id = p_user_id;
+$$;
+
+-- Incremental maintenance: any change to a user's holdings or cash refreshes just that user
+create or replace function public.leaderboard_user_changed()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_table_name = 'profiles' and tg_op = 'DELETE' then
+        delete from leaderboard_ranked where user_id = old.id;
+    elsif tg_table_name = 'profiles' then
+        perform refresh_leaderboard_user(new.id);
+    else
+        perform refresh_leaderboard_user(coalesce(new.user_id, old.user_id));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists portfolios_refresh_leaderboard on public.portfolios;
+create trigger portfolios_refresh_leaderboard
+    after insert or update or delete on public.portfolios
+    for each row execute function public.leaderboard_user_changed();
+
+drop trigger if exists profiles_refresh_leaderboard on public.profiles;
+create trigger profiles_refresh_leaderboard
+    after insert or delete or update of cash_balance, username on public.profiles
+    for each row execute function public.leaderboard_user_changed();
+
+-- Keep the existing 'leaderboard' view working on top of the materialized table
+drop view if exists public.leaderboard;
+create view public.leaderboard as
+    select user_id, username, cash_balance, stock_value, total_net_worth
+    from public.leaderboard_ranked
+    order by total_net_worth desc, user_id;
+
+select public.refresh_leaderboard();
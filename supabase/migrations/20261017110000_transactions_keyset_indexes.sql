@@ -0,0 +1,7 @@
+-- Indexes for keyset-paginated transaction history (getTransactionPage in database.py).
+-- Each page is an index range scan from the (created_at, id) cursor, with or without a ticker filter.
+create index if not exists transactions_user_created_idx
+    on public.transactions (user_id, created_at desc, id desc);
+
+create index if not exists transactions_user_ticker_created_idx
+    on public.transactions (user_id, ticker, created_at desc, id desc);
@@ -0,0 +1,107 @@
+-- Executes a basket of buy/sell legs for one user in a single transaction.
+--   p_legs: [{"side": "buy"|"sell", "ticker": text, "quantity": int, "price": numeric}, ...]
+-- Cash is checked once against the basket's net cash flow (sell proceeds fund buys),
+-- sells are applied before buys, and any failing leg rolls back the whole basket.
+-- Returns one result object per leg, in the order submitted.
+create or replace function public.execute_batch_order(p_user_id uuid, p_legs jsonb)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_leg      jsonb;
+    v_index    integer;
+    v_side     text;
+    v_ticker   text;
+    v_quantity integer;
+    v_price    numeric;
+    v_cash     numeric;
+    v_net      numeric := 0;
+    v_held     integer;
+    v_results  jsonb := '[]'::jsonb;
+begin
+    -- Anonymous callers have no uid and must not slip past the check; only the service role trades for others
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+
+    if p_legs is null or jsonb_typeof(p_legs) <> 'array' or jsonb_array_length(p_legs) = 0 then
+        raise exception 'Basket is empty';
+    end if;
+
+    -- Lock the user's cash row for the duration of the basket
+    select cash_balance into v_cash from profiles where id = p_user_id for update;
+    if not found then
+        raise exception 'Profile not found';
+    end if;
+
+    -- 1. Validate every leg and compute the net cash flow
+    for v_leg, v_index in select value, ordinality from jsonb_array_elements(p_legs) with ordinality loop
+        v_side := lower(v_leg ->> 'side');
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        v_price := (v_leg ->> 'price')::numeric;
+        if v_side not in ('buy', 'sell') then
+            raise exception 'Leg %: side must be buy or sell', v_index;
+        end if;
+        if v_quantity is null or v_quantity <= 0 or v_price is null or v_price <= 0 then
+            raise exception 'Leg %: quantity and price must be positive', v_index;
+        end if;
+        if not exists (select 1 from stocks where ticker = v_leg ->> 'ticker') then
+            raise exception 'Leg %: unknown ticker %', v_index, v_leg ->> 'ticker';
+        end if;
+        v_net := v_net + case when v_side = 'sell' then v_quantity * v_price else -v_quantity * v_price end;
+    end loop;
+
+    -- 2. One cash check for the whole basket
+    if v_cash + v_net < 0 then
+        raise exception 'Insufficient funds: basket needs % more GYD', -(v_cash + v_net);
+    end if;
+
+    -- 3. Apply sells first, then buys
+    for v_leg, v_index in
+        select value, ordinality from jsonb_array_elements(p_legs) with ordinality
+        order by (lower(value ->> 'side') = 'buy'), ordinality
+    loop
+        v_side := lower(v_leg ->> 'side');
+        v_ticker := v_leg ->> 'ticker';
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        v_price := (v_leg ->> 'price')::numeric;
+
+        if v_side = 'sell' then
+            update portfolios
+               set shares_count = shares_count - v_quantity
+             where user_id = p_user_id and ticker = v_ticker and shares_count >= v_quantity
+            returning shares_count into v_held;
+            if not found then
+                raise exception 'Leg %: insufficient shares of %', v_index, v_ticker;
+            end if;
+            if v_held = 0 then
+                delete from portfolios where user_id = p_user_id and ticker = v_ticker;
+            end if;
+        else
+            insert into portfolios (user_id, ticker, shares_count, avg_price)
+            values (p_user_id, v_ticker, v_quantity, v_price)
+            on conflict (user_id, ticker) do update
+                set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                                / (portfolios.shares_count + excluded.shares_count),
+                    shares_count = portfolios.shares_count + excluded.shares_count;
+        end if;
+
+        insert into transactions (user_id, ticker, type, quantity, price, total_value)
+        values (p_user_id, v_ticker, upper(v_side), v_quantity, v_price, v_quantity * v_price);
+
+        v_results := v_results || jsonb_build_object(
+            'leg', v_index, 'side', v_side, 'ticker', v_ticker, 'quantity', v_quantity,
+            'price', v_price, 'total_value', v_quantity * v_price, 'status', 'filled'
+        );
+    end loop;
+
+    update profiles set cash_balance = cash_balance + v_net where id = p_user_id;
+
+    -- Report legs in submission order
+    return (select jsonb_agg(r order by (r ->> 'leg')::integer) from jsonb_array_elements(v_results) r);
+end;
+$$;
+
+revoke execute on function public.execute_batch_order(uuid, jsonb) from public, anon;
@@ -0,0 +1,13 @@
+-- Publish price and leaderboard changes to Supabase Realtime for livePrices.py
+do $$
+begin
+    if not exists (select 1 from pg_publication_tables
+                   where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'stocks') then
+        alter publication supabase_realtime add table public.stocks;
+    end if;
+    if not exists (select 1 from pg_publication_tables
+                   where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'leaderboard_ranked') then
+        alter publication supabase_realtime add table public.leaderboard_ranked;
+    end if;
+end;
+$$;
@@ -0,0 +1,34 @@
+-- Per-user performance metrics precomputed nightly by analytics.py.
+-- The portfolio view reads one row per user instead of rebuilding the value series.
+-- user_id deliberately has no foreign key so benchmarks can seed synthetic rows.
+create table if not exists public.portfolio_analytics (
+    user_id           uuid        primary key,
+    as_of             date        not null,
+    window_start      date        not null,
+    trading_days      integer     not null default 0,
+    net_worth         numeric,
+    twr               double precision,
+    annualized_return double precision,
+    volatility        double precision,
+    max_drawdown      double precision,
+    sharpe            double precision,
+    benchmark_return  double precision,
+    excess_return     double precision,
+    beta              double precision,
+    index_method      text        not null default 'equal',
+    updated_at        timestamptz not null default now()
+);
+
+alter table public.portfolio_analytics enable row level security;
+
+drop policy if exists "Users can read their own analytics" on public.portfolio_analytics;
+create policy "Users can read their own analytics"
+    on public.portfolio_analytics for select
+    using (auth.uid() = user_id);
+
+-- Optional input for the cap-weighted GSE index (analytics.py --index cap)
+alter table public.stocks add column if not exists shares_outstanding numeric;
+
+-- streamLeagueTransactions() reads every user's trades oldest first in (created_at, id) keyset pages
+create index if not exists transactions_created_id_idx
+    on public.transactions (created_at, id);
@@ -0,0 +1,31 @@
+-- Daily record of every player's standing, written by snapshotLeague() in syncStocks.py
+-- right after the market sync. Backs rank history and the "movers" table on the leaderboard.
+-- user_id deliberately has no foreign key so benchmarks can seed synthetic rows.
+create table if not exists public.league_snapshots (
+    snapshot_date date        not null,
+    user_id       uuid        not null,
+    username      text,
+    cash_balance  numeric     not null default 0,
+    stock_value   numeric     not null default 0,
+    net_worth     numeric     not null default 0,
+    rank          integer     not null,
+    rank_change   integer,    -- positive when the player moved up; null on their first snapshot
+    created_at    timestamptz not null default now(),
+    primary key (snapshot_date, user_id)
+);
+
+-- One player's rank history, newest first
+create index if not exists league_snapshots_user_date_idx
+    on public.league_snapshots (user_id, snapshot_date desc);
+
+-- Biggest movers of a given day
+create index if not exists league_snapshots_date_change_idx
+    on public.league_snapshots (snapshot_date, rank_change desc);
+
+alter table public.league_snapshots enable row level security;
+
+-- One global league for now; 20261017170000_leagues.sql scopes snapshots to public leagues and their members
+drop policy if exists "Snapshots are readable by everyone" on public.league_snapshots;
+create policy "Snapshots are readable by everyone"
+    on public.league_snapshots for select
+    using (true);
@@ -0,0 +1,144 @@
+-- Standing limit/stop orders and price alerts.
+-- Each row rests until a synced price crosses trigger_price in its direction:
+--   'above' fires when the price rises to or above the trigger, 'below' when it falls to or below it.
+--   limit buy -> below, limit sell -> above, stop buy -> above, stop sell -> below; alerts pick either.
+-- syncStocks.py matches open orders against every price it writes (see orders.py) and
+-- executes the triggered ones through execute_standing_orders() in batches.
+-- user_id deliberately has no foreign key so benchmarks can seed synthetic rows.
+create table if not exists public.standing_orders (
+    id            uuid        primary key default gen_random_uuid(),
+    user_id       uuid        not null,
+    ticker        text        not null references public.stocks (ticker),
+    kind          text        not null check (kind in ('limit', 'stop', 'alert')),
+    side          text        check (side in ('buy', 'sell')),
+    quantity      integer     check (quantity > 0),
+    trigger_price numeric     not null check (trigger_price > 0),
+    direction     text        not null check (direction in ('above', 'below')),
+    status        text        not null default 'open'
+                              check (status in ('open', 'filled', 'triggered', 'rejected', 'cancelled')),
+    filled_price  numeric,
+    message       text,
+    created_at    timestamptz not null default now(),
+    closed_at     timestamptz,
+    check (
+        (kind = 'alert' and side is null and quantity is null)
+        or (kind <> 'alert' and side is not null and quantity is not null and direction =
+            case when (kind = 'limit') = (side = 'buy') then 'below' else 'above' end)
+    )
+);
+
+-- The sync reads a ticker's open orders; only open rows are indexed, so filled history does not slow it down
+create index if not exists standing_orders_open_idx
+    on public.standing_orders (ticker, direction, trigger_price)
+    where status = 'open';
+
+-- One user's orders, newest first
+create index if not exists standing_orders_user_idx
+    on public.standing_orders (user_id, created_at desc);
+
+alter table public.standing_orders enable row level security;
+
+drop policy if exists "Users can read their own standing orders" on public.standing_orders;
+create policy "Users can read their own standing orders"
+    on public.standing_orders for select
+    using (auth.uid() = user_id);
+
+drop policy if exists "Users can place their own standing orders" on public.standing_orders;
+create policy "Users can place their own standing orders"
+    on public.standing_orders for insert
+    with check (auth.uid() = user_id and status = 'open');
+
+-- Users may only cancel; fills are written by execute_standing_orders()
+drop policy if exists "Users can cancel their own open orders" on public.standing_orders;
+create policy "Users can cancel their own open orders"
+    on public.standing_orders for update
+    using (auth.uid() = user_id and status = 'open')
+    with check (status = 'cancelled');
+
+-- Executes a batch of triggered orders.
+--   p_fills: [{"id": uuid, "price": numeric}, ...] in the order they should run
+-- Each order is re-checked against its trigger and filled at `price` in its own savepoint,
+-- so one order failing (e.g. not enough cash) marks only that order 'rejected'.
+-- Orders that are no longer open, or are locked by a concurrent run, are skipped.
+-- Returns one {"id", "status", "message"} object per order that was processed.
+create or replace function public.execute_standing_orders(p_fills jsonb)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_fill    jsonb;
+    v_order   standing_orders%rowtype;
+    v_price   numeric;
+    v_held    integer;
+    v_cash    numeric;
+    v_status  text;
+    v_message text;
+    v_results jsonb := '[]'::jsonb;
+begin
+    if auth.uid() is not null then
+        raise exception 'Standing orders are executed by the market sync';
+    end if;
+
+    for v_fill in select value from jsonb_array_elements(coalesce(p_fills, '[]'::jsonb)) loop
+        select * into v_order from standing_orders
+         where id = (v_fill ->> 'id')::uuid and status = 'open'
+           for update skip locked;
+        continue when not found;
+
+        v_price := (v_fill ->> 'price')::numeric;
+        continue when v_price is null or v_price <= 0
+            or (v_order.direction = 'above' and v_price < v_order.trigger_price)
+            or (v_order.direction = 'below' and v_price > v_order.trigger_price);
+
+        v_status := case when v_order.kind = 'alert' then 'triggered' else 'filled' end;
+        v_message := null;
+        begin
+            if v_order.side = 'buy' then
+                update profiles set cash_balance = cash_balance - v_order.quantity * v_price
+                 where id = v_order.user_id and cash_balance >= v_order.quantity * v_price
+                returning cash_balance into v_cash;
+                if not found then
+                    raise exception 'Insufficient funds';
+                end if;
+                insert into portfolios (user_id, ticker, shares_count, avg_price)
+                values (v_order.user_id, v_order.ticker, v_order.quantity, v_price)
+                on conflict (user_id, ticker) do update
+                    set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                                    / (portfolios.shares_count + excluded.shares_count),
+                        shares_count = portfolios.shares_count + excluded.shares_count;
+            elsif v_order.side = 'sell' then
+                update portfolios set shares_count = shares_count - v_order.quantity
+                 where user_id = v_order.user_id and ticker = v_order.ticker and shares_count >= v_order.quantity
+                returning shares_count into v_held;
+                if not found then
+                    raise exception 'Insufficient shares';
+                end if;
+                if v_held = 0 then
+                    delete from portfolios where user_id = v_order.user_id and ticker = v_order.ticker;
+                end if;
+                update profiles set cash_balance = cash_balance + v_order.quantity * v_price where id = v_order.user_id;
+            end if;
+            if v_order.side is not null then
+                insert into transactions (user_id, ticker, type, quantity, price, total_value)
+                values (v_order.user_id, v_order.ticker, upper(v_order.side), v_order.quantity, v_price,
+                        v_order.quantity * v_price);
+            end if;
+        exception when others then
+            v_status := 'rejected';
+            v_message := sqlerrm;
+        end;
+
+        update standing_orders
+           set status = v_status, message = v_message, closed_at = now(),
+               -- Only a fill has a fill price; rejected orders and alerts leave it empty
+               filled_price = case when v_status = 'filled' then v_price end
+         where id = v_order.id;
+        v_results := v_results || jsonb_build_object('id', v_order.id, 'status', v_status, 'message', v_message);
+    end loop;
+    return v_results;
+end;
+$$;
+
+revoke execute on function public.execute_standing_orders(jsonb) from public, anon, authenticated;
@@ -0,0 +1,671 @@
+-- Leagues: separate competitions (schools, clubs, tournaments) with their own start and end dates,
+-- starting capital and membership. Every player belongs to the global league, which keeps the
+-- behaviour from before leagues existed.
+--
+-- Cash now lives on the membership (league_members), and holdings, trades, rankings, snapshots,
+-- analytics and standing orders carry a league_id. Every primary key and read index leads with
+-- league_id, so a league's leaderboard, history or snapshot only scans that league's rows.
+-- league_snapshots, the fastest-growing table, is also hash-partitioned on league_id.
+-- Existing rows move to the global league.
+
+create table if not exists public.leagues (
+    id            uuid        primary key default gen_random_uuid(),
+    name          text        not null,
+    slug          text        not null unique,
+    starting_cash numeric     not null default 1000000 check (starting_cash > 0),
+    starts_on     date        not null default current_date,
+    ends_on       date,
+    is_public     boolean     not null default true,
+    created_by    uuid,
+    created_at    timestamptz not null default now(),
+    check (ends_on is null or ends_on >= starts_on)
+);
+
+insert into public.leagues (id, name, slug, starting_cash, starts_on)
+values ('00000000-0000-0000-0000-000000000000', 'Global League', 'global', 1000000, '2000-01-01')
+on conflict (id) do nothing;
+
+-- One row per player per league; cash_balance is that league's balance
+-- user_id deliberately has no foreign key so benchmarks can seed synthetic rows.
+create table if not exists public.league_members (
+    league_id    uuid        not null references public.leagues (id) on delete cascade,
+    user_id      uuid        not null,
+    username     text,
+    cash_balance numeric     not null check (cash_balance >= 0),
+    joined_at    timestamptz not null default now(),
+    primary key (league_id, user_id)
+);
+
+-- A player's leagues for the league picker
+create index if not exists league_members_user_idx on public.league_members (user_id);
+
+insert into public.league_members (league_id, user_id, username, cash_balance)
+select '00000000-0000-0000-0000-000000000000', id, username, cash_balance from public.profiles
+on conflict (league_id, user_id) do nothing;
+
+-- True when the caller may see a league's rows: it is public or the caller is a member.
+-- Security definer so the policies below can read league_members without recursing into its own policy.
+create or replace function public.can_read_league(p_league_id uuid)
+returns boolean
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select exists (select 1 from leagues where id = p_league_id and is_public)
+        or exists (select 1 from league_members where league_id = p_league_id and user_id = auth.uid());
+$$;
+
+alter table public.leagues enable row level security;
+alter table public.league_members enable row level security;
+
+drop policy if exists "Leagues are readable by everyone" on public.leagues;
+create policy "Leagues are readable by everyone"
+    on public.leagues for select
+    using (can_read_league(id));
+
+-- Private leagues' rosters, rankings and snapshots are only visible to their members
+drop policy if exists "Memberships are readable by everyone" on public.league_members;
+drop policy if exists "Memberships of visible leagues are readable" on public.league_members;
+create policy "Memberships of visible leagues are readable"
+    on public.league_members for select
+    using (can_read_league(league_id));
+
+-- --- league_id on the per-player tables ---
+
+alter table public.portfolios
+    add column if not exists league_id uuid not null default '00000000-0000-0000-0000-000000000000'
+    references public.leagues (id) on delete cascade;
+alter table public.transactions
+    add column if not exists league_id uuid not null default '00000000-0000-0000-0000-000000000000'
+    references public.leagues (id) on delete cascade;
+alter table public.standing_orders
+    add column if not exists league_id uuid not null default '00000000-0000-0000-0000-000000000000'
+    references public.leagues (id) on delete cascade;
+alter table public.leaderboard_ranked
+    add column if not exists league_id uuid not null default '00000000-0000-0000-0000-000000000000';
+alter table public.portfolio_analytics
+    add column if not exists league_id uuid not null default '00000000-0000-0000-0000-000000000000';
+
+-- Re-key holdings, rankings and analytics by league: a player can hold the same ticker in several leagues
+do $$
+declare
+    v_table text;
+    v_name  text;
+begin
+    foreach v_table in array array['portfolios', 'leaderboard_ranked', 'portfolio_analytics'] loop
+        for v_name in select conname from pg_constraint
+                      where conrelid = format('public.%I', v_table)::regclass and contype in ('p', 'u') loop
+            execute format('alter table public.%I drop constraint %I', v_table, v_name);
+        end loop;
+    end loop;
+end;
+$$;
+alter table public.portfolios add primary key (league_id, user_id, ticker);
+alter table public.leaderboard_ranked add primary key (league_id, user_id);
+alter table public.portfolio_analytics add primary key (league_id, user_id);
+
+drop index if exists public.leaderboard_ranked_net_worth_idx;
+create index if not exists leaderboard_ranked_league_net_worth_idx
+    on public.leaderboard_ranked (league_id, total_net_worth desc, user_id);
+
+drop policy if exists "Leaderboard is readable by everyone" on public.leaderboard_ranked;
+drop policy if exists "Leaderboards of visible leagues are readable" on public.leaderboard_ranked;
+create policy "Leaderboards of visible leagues are readable"
+    on public.leaderboard_ranked for select
+    using (can_read_league(league_id));
+
+-- Keyset history pages and the analytics job's league-wide scan, one league at a time
+drop index if exists public.transactions_user_created_idx;
+drop index if exists public.transactions_user_ticker_created_idx;
+drop index if exists public.transactions_created_id_idx;
+create index if not exists transactions_league_user_created_idx
+    on public.transactions (league_id, user_id, created_at desc, id desc);
+create index if not exists transactions_league_user_ticker_created_idx
+    on public.transactions (league_id, user_id, ticker, created_at desc, id desc);
+create index if not exists transactions_league_created_idx
+    on public.transactions (league_id, created_at, id);
+
+drop index if exists public.standing_orders_user_idx;
+create index if not exists standing_orders_league_user_idx
+    on public.standing_orders (league_id, user_id, created_at desc);
+
+-- --- league_snapshots, hash-partitioned on league_id ---
+
+alter table public.league_snapshots rename to league_snapshots_unpartitioned;
+
+create table public.league_snapshots (
+    league_id     uuid        not null default '00000000-0000-0000-0000-000000000000',
+    snapshot_date date        not null,
+    user_id       uuid        not null,
+    username      text,
+    cash_balance  numeric     not null default 0,
+    stock_value   numeric     not null default 0,
+    net_worth     numeric     not null default 0,
+    rank          integer     not null,
+    rank_change   integer,    -- positive when the player moved up; null on their first snapshot
+    created_at    timestamptz not null default now(),
+    primary key (league_id, snapshot_date, user_id)
+) partition by hash (league_id);
+
+do $$
+begin
+    for i in 0..15 loop
+        execute format('create table if not exists public.league_snapshots_p%s partition of public.league_snapshots '
+                       'for values with (modulus 16, remainder %s)', i, i);
+    end loop;
+end;
+$$;
+
+insert into public.league_snapshots (snapshot_date, user_id, username, cash_balance, stock_value, net_worth,
+                                     rank, rank_change, created_at)
+select snapshot_date, user_id, username, cash_balance, stock_value, net_worth, rank, rank_change, created_at
+from public.league_snapshots_unpartitioned;
+
+drop table public.league_snapshots_unpartitioned;
+
+create index if not exists league_snapshots_league_user_date_idx
+    on public.league_snapshots (league_id, user_id, snapshot_date desc);
+create index if not exists league_snapshots_league_date_change_idx
+    on public.league_snapshots (league_id, snapshot_date, rank_change desc);
+
+alter table public.league_snapshots enable row level security;
+
+drop policy if exists "Snapshots are readable by everyone" on public.league_snapshots;
+drop policy if exists "Snapshots of visible leagues are readable" on public.league_snapshots;
+create policy "Snapshots of visible leagues are readable"
+    on public.league_snapshots for select
+    using (can_read_league(league_id));
+
+-- --- helpers ---
+
+-- True while a league accepts trades
+create or replace function public.league_is_open(p_league_id uuid)
+returns boolean
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select exists (select 1 from leagues
+                   where id = p_league_id
+                     and starts_on <= current_date
+                     and (ends_on is null or current_date <= ends_on));
+$$;
+
+-- New players join the global league; username changes follow them into every league
+create or replace function public.profile_joins_global_league()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into league_members (league_id, user_id, username, cash_balance)
+        select id, new.id, new.username, starting_cash from leagues where id = '00000000-0000-0000-0000-000000000000'
+        on conflict (league_id, user_id) do nothing;
+    elsif new.username is distinct from old.username then
+        update league_members set username = new.username where user_id = new.id;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists profiles_join_global_league on public.profiles;
+create trigger profiles_join_global_league
+    after insert or update of username on public.profiles
+    for each row execute function public.profile_joins_global_league();
+
+-- --- leaderboard, per league ---
+
+drop function if exists public.refresh_leaderboard_user(uuid);
+create or replace function public.refresh_leaderboard_user(p_user_id uuid, p_league_id uuid)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    insert into leaderboard_ranked (league_id, user_id, username, cash_balance, stock_value, total_net_worth, updated_at)
+    select m.league_id,
+           m.user_id,
+           m.username,
+           m.cash_balance,
+           coalesce(h.stock_value, 0),
+           m.cash_balance + coalesce(h.stock_value, 0),
+           now()
+    from league_members m
+    left join (
+        select sum(po.shares_count * s.current_price) as stock_value
+        from portfolios po
+        join stocks s on s.ticker = po.ticker
+        where po.league_id = p_league_id and po.user_id = p_user_id
+    ) h on true
+    where m.league_id = p_league_id and m.user_id = p_user_id
+    on conflict (league_id, user_id) do update
+        set username        = excluded.username,
+            cash_balance    = excluded.cash_balance,
+            stock_value     = excluded.stock_value,
+            total_net_worth = excluded.total_net_worth,
+            updated_at      = excluded.updated_at;
+$$;
+
+-- Rebuilds every league's rows in one set-based pass; called by syncStocks.py after prices change
+create or replace function public.refresh_leaderboard()
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_rows integer;
+begin
+    insert into leaderboard_ranked (league_id, user_id, username, cash_balance, stock_value, total_net_worth, updated_at)
+    select m.league_id,
+           m.user_id,
+           m.username,
+           m.cash_balance,
+           coalesce(h.stock_value, 0),
+           m.cash_balance + coalesce(h.stock_value, 0),
+           now()
+    from league_members m
+    left join (
+        select po.league_id, po.user_id, sum(po.shares_count * s.current_price) as stock_value
+        from portfolios po
+        join stocks s on s.ticker = po.ticker
+        group by po.league_id, po.user_id
+    ) h on h.league_id = m.league_id and h.user_id = m.user_id
+    on conflict (league_id, user_id) do update
+        set username        = excluded.username,
+            cash_balance    = excluded.cash_balance,
+            stock_value     = excluded.stock_value,
+            total_net_worth = excluded.total_net_worth,
+            updated_at      = excluded.updated_at
+        where leaderboard_ranked.total_net_worth is distinct from excluded.total_net_worth
+           or leaderboard_ranked.username is distinct from excluded.username;
+    get diagnostics v_rows = row_count;
+
+    delete from leaderboard_ranked lr
+    where not exists (select 1 from league_members m where m.league_id = lr.league_id and m.user_id = lr.user_id);
+
+    return v_rows;
+end;
+$$;
+
+-- 1-based rank of one player within a league, counted through the (league_id, total_net_worth desc, user_id) index
+drop function if exists public.get_leaderboard_rank(uuid);
+create or replace function public.get_leaderboard_rank(p_user_id uuid, p_league_id uuid)
+returns table (rank bigint, total_net_worth numeric, total_players bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select (select count(*)
+            from leaderboard_ranked o
+            where o.league_id = p_league_id
+              and (o.total_net_worth > me.total_net_worth
+                   or (o.total_net_worth = me.total_net_worth and o.user_id < me.user_id))) + 1,
+           me.total_net_worth,
+           (select count(*) from leaderboard_ranked a where a.league_id = p_league_id)
+    from leaderboard_ranked me
+    where me.league_id = p_league_id and me.user_id = p_user_id
+      and (auth.role() = 'service_role' or can_read_league(p_league_id));
+$$;
+
+-- Incremental maintenance: a change to a player's holdings or cash in a league refreshes just that row
+create or replace function public.leaderboard_user_changed()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_table_name = 'league_members' and tg_op = 'DELETE' then
+        delete from leaderboard_ranked where league_id = old.league_id and user_id = old.user_id;
+    elsif tg_op = 'DELETE' then
+        perform refresh_leaderboard_user(old.user_id, old.league_id);
+    else
+        perform refresh_leaderboard_user(new.user_id, new.league_id);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists profiles_refresh_leaderboard on public.profiles;
+drop trigger if exists league_members_refresh_leaderboard on public.league_members;
+create trigger league_members_refresh_leaderboard
+    after insert or delete or update of cash_balance, username on public.league_members
+    for each row execute function public.leaderboard_user_changed();
+
+drop view if exists public.leaderboard;
+-- security_invoker so the view applies leaderboard_ranked's policy to the caller
+create view public.leaderboard with (security_invoker = true) as
+    select league_id, user_id, username, cash_balance, stock_value, total_net_worth
+    from public.leaderboard_ranked
+    order by league_id, total_net_worth desc, user_id;
+
+-- --- trading, per league ---
+
+drop function if exists public.execute_buy_order(uuid, text, integer, numeric);
+create or replace function public.execute_buy_order(p_user_id uuid, p_ticker text, p_quantity integer, p_price numeric,
+                                                    p_league_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+    if p_quantity is null or p_quantity <= 0 or p_price is null or p_price <= 0 then
+        raise exception 'Quantity and price must be positive';
+    end if;
+
+    update league_members set cash_balance = cash_balance - p_quantity * p_price
+     where league_id = p_league_id and user_id = p_user_id and cash_balance >= p_quantity * p_price;
+    if not found then
+        raise exception 'Insufficient funds';
+    end if;
+
+    insert into portfolios (league_id, user_id, ticker, shares_count, avg_price)
+    values (p_league_id, p_user_id, p_ticker, p_quantity, p_price)
+    on conflict (league_id, user_id, ticker) do update
+        set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                        / (portfolios.shares_count + excluded.shares_count),
+            shares_count = portfolios.shares_count + excluded.shares_count;
+
+    insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+    values (p_league_id, p_user_id, p_ticker, 'BUY', p_quantity, p_price, p_quantity * p_price);
+end;
+$$;
+
+drop function if exists public.execute_sell_order(uuid, text, integer, numeric);
+create or replace function public.execute_sell_order(p_user_id uuid, p_ticker text, p_quantity integer, p_price numeric,
+                                                     p_league_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_held integer;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+    if p_quantity is null or p_quantity <= 0 or p_price is null or p_price <= 0 then
+        raise exception 'Quantity and price must be positive';
+    end if;
+
+    update portfolios set shares_count = shares_count - p_quantity
+     where league_id = p_league_id and user_id = p_user_id and ticker = p_ticker and shares_count >= p_quantity
+    returning shares_count into v_held;
+    if not found then
+        raise exception 'Insufficient shares';
+    end if;
+    if v_held = 0 then
+        delete from portfolios where league_id = p_league_id and user_id = p_user_id and ticker = p_ticker;
+    end if;
+
+    update league_members set cash_balance = cash_balance + p_quantity * p_price
+     where league_id = p_league_id and user_id = p_user_id;
+
+    insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+    values (p_league_id, p_user_id, p_ticker, 'SELL', p_quantity, p_price, p_quantity * p_price);
+end;
+$$;
+
+-- Same contract as before (see 20261017120000_execute_batch_order.sql), inside one league
+drop function if exists public.execute_batch_order(uuid, jsonb);
+create or replace function public.execute_batch_order(p_user_id uuid, p_legs jsonb, p_league_id uuid)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_leg      jsonb;
+    v_index    integer;
+    v_side     text;
+    v_ticker   text;
+    v_quantity integer;
+    v_price    numeric;
+    v_cash     numeric;
+    v_net      numeric := 0;
+    v_held     integer;
+    v_results  jsonb := '[]'::jsonb;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+
+    if p_legs is null or jsonb_typeof(p_legs) <> 'array' or jsonb_array_length(p_legs) = 0 then
+        raise exception 'Basket is empty';
+    end if;
+
+    -- Lock the player's cash in this league for the duration of the basket
+    select cash_balance into v_cash from league_members
+     where league_id = p_league_id and user_id = p_user_id for update;
+    if not found then
+        raise exception 'Not a member of this league';
+    end if;
+
+    for v_leg, v_index in select value, ordinality from jsonb_array_elements(p_legs) with ordinality loop
+        v_side := lower(v_leg ->> 'side');
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        v_price := (v_leg ->> 'price')::numeric;
+        if v_side not in ('buy', 'sell') then
+            raise exception 'Leg %: side must be buy or sell', v_index;
+        end if;
+        if v_quantity is null or v_quantity <= 0 or v_price is null or v_price <= 0 then
+            raise exception 'Leg %: quantity and price must be positive', v_index;
+        end if;
+        if not exists (select 1 from stocks where ticker = v_leg ->> 'ticker') then
+            raise exception 'Leg %: unknown ticker %', v_index, v_leg ->> 'ticker';
+        end if;
+        v_net := v_net + case when v_side = 'sell' then v_quantity * v_price else -v_quantity * v_price end;
+    end loop;
+
+    if v_cash + v_net < 0 then
+        raise exception 'Insufficient funds: basket needs % more GYD', -(v_cash + v_net);
+    end if;
+
+    for v_leg, v_index in
+        select value, ordinality from jsonb_array_elements(p_legs) with ordinality
+        order by (lower(value ->> 'side') = 'buy'), ordinality
+    loop
+        v_side := lower(v_leg ->> 'side');
+        v_ticker := v_leg ->> 'ticker';
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        v_price := (v_leg ->> 'price')::numeric;
+
+        if v_side = 'sell' then
+            update portfolios
+               set shares_count = shares_count - v_quantity
+             where league_id = p_league_id and user_id = p_user_id and ticker = v_ticker and shares_count >= v_quantity
+            returning shares_count into v_held;
+            if not found then
+                raise exception 'Leg %: insufficient shares of %', v_index, v_ticker;
+            end if;
+            if v_held = 0 then
+                delete from portfolios where league_id = p_league_id and user_id = p_user_id and ticker = v_ticker;
+            end if;
+        else
+            insert into portfolios (league_id, user_id, ticker, shares_count, avg_price)
+            values (p_league_id, p_user_id, v_ticker, v_quantity, v_price)
+            on conflict (league_id, user_id, ticker) do update
+                set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                                / (portfolios.shares_count + excluded.shares_count),
+                    shares_count = portfolios.shares_count + excluded.shares_count;
+        end if;
+
+        insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+        values (p_league_id, p_user_id, v_ticker, upper(v_side), v_quantity, v_price, v_quantity * v_price);
+
+        v_results := v_results || jsonb_build_object(
+            'leg', v_index, 'side', v_side, 'ticker', v_ticker, 'quantity', v_quantity,
+            'price', v_price, 'total_value', v_quantity * v_price, 'status', 'filled'
+        );
+    end loop;
+
+    update league_members set cash_balance = cash_balance + v_net
+     where league_id = p_league_id and user_id = p_user_id;
+
+    return (select jsonb_agg(r order by (r ->> 'leg')::integer) from jsonb_array_elements(v_results) r);
+end;
+$$;
+
+-- Same contract as before (see 20261017160000_standing_orders.sql); each order fills in its own league
+create or replace function public.execute_standing_orders(p_fills jsonb)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_fill    jsonb;
+    v_order   standing_orders%rowtype;
+    v_price   numeric;
+    v_held    integer;
+    v_status  text;
+    v_message text;
+    v_results jsonb := '[]'::jsonb;
+begin
+    if auth.uid() is not null then
+        raise exception 'Standing orders are executed by the market sync';
+    end if;
+
+    for v_fill in select value from jsonb_array_elements(coalesce(p_fills, '[]'::jsonb)) loop
+        select * into v_order from standing_orders
+         where id = (v_fill ->> 'id')::uuid and status = 'open'
+           for update skip locked;
+        continue when not found;
+
+        v_price := (v_fill ->> 'price')::numeric;
+        continue when v_price is null or v_price <= 0
+            or (v_order.direction = 'above' and v_price < v_order.trigger_price)
+            or (v_order.direction = 'below' and v_price > v_order.trigger_price);
+
+        v_status := case when v_order.kind = 'alert' then 'triggered' else 'filled' end;
+        v_message := null;
+        begin
+            if v_order.side is not null and not league_is_open(v_order.league_id) then
+                raise exception 'This league is not open for trading';
+            end if;
+            if v_order.side = 'buy' then
+                update league_members set cash_balance = cash_balance - v_order.quantity * v_price
+                 where league_id = v_order.league_id and user_id = v_order.user_id
+                   and cash_balance >= v_order.quantity * v_price;
+                if not found then
+                    raise exception 'Insufficient funds';
+                end if;
+                insert into portfolios (league_id, user_id, ticker, shares_count, avg_price)
+                values (v_order.league_id, v_order.user_id, v_order.ticker, v_order.quantity, v_price)
+                on conflict (league_id, user_id, ticker) do update
+                    set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                                    / (portfolios.shares_count + excluded.shares_count),
+                        shares_count = portfolios.shares_count + excluded.shares_count;
+            elsif v_order.side = 'sell' then
+                update portfolios set shares_count = shares_count - v_order.quantity
+                 where league_id = v_order.league_id and user_id = v_order.user_id and ticker = v_order.ticker
+                   and shares_count >= v_order.quantity
+                returning shares_count into v_held;
+                if not found then
+                    raise exception 'Insufficient shares';
+                end if;
+                if v_held = 0 then
+                    delete from portfolios
+                     where league_id = v_order.league_id and user_id = v_order.user_id and ticker = v_order.ticker;
+                end if;
+                update league_members set cash_balance = cash_balance + v_order.quantity * v_price
+                 where league_id = v_order.league_id and user_id = v_order.user_id;
+            end if;
+            if v_order.side is not null then
+                insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+                values (v_order.league_id, v_order.user_id, v_order.ticker, upper(v_order.side), v_order.quantity,
+                        v_price, v_order.quantity * v_price);
+            end if;
+        exception when others then
+            v_status := 'rejected';
+            v_message := sqlerrm;
+        end;
+
+        update standing_orders
+           set status = v_status, message = v_message, closed_at = now(),
+               -- Only a fill has a fill price; rejected orders and alerts leave it empty
+               filled_price = case when v_status = 'filled' then v_price end
+         where id = v_order.id;
+        v_results := v_results || jsonb_build_object('id', v_order.id, 'status', v_status, 'message', v_message);
+    end loop;
+    return v_results;
+end;
+$$;
+
+revoke execute on function public.execute_standing_orders(jsonb) from public, anon, authenticated;
+
+-- --- creating and joining leagues ---
+
+-- Creates a league and makes its creator the first member; returns the new league's id
+create or replace function public.create_league(p_user_id uuid, p_name text, p_slug text, p_starting_cash numeric,
+                                                p_starts_on date, p_ends_on date default null,
+                                                p_is_public boolean default true)
+returns uuid
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_league_id uuid;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot create a league on behalf of another user';
+    end if;
+    insert into leagues (name, slug, starting_cash, starts_on, ends_on, is_public, created_by)
+    values (p_name, p_slug, p_starting_cash, coalesce(p_starts_on, current_date), p_ends_on, p_is_public, p_user_id)
+    returning id into v_league_id;
+    perform join_league(p_user_id, v_league_id);
+    return v_league_id;
+end;
+$$;
+
+-- Adds a player to a league with its starting cash; joining twice is a no-op
+create or replace function public.join_league(p_user_id uuid, p_league_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot join a league on behalf of another user';
+    end if;
+    if not exists (select 1 from leagues where id = p_league_id and (ends_on is null or ends_on >= current_date)) then
+        raise exception 'League not found or already finished';
+    end if;
+    insert into league_members (league_id, user_id, username, cash_balance)
+    select l.id, p.id, p.username, l.starting_cash
+    from leagues l, profiles p
+    where l.id = p_league_id and p.id = p_user_id
+    on conflict (league_id, user_id) do nothing;
+end;
+$$;
+
+-- Anonymous callers have no uid, so the guards above refuse them; anon cannot call these at all
+revoke execute on function public.execute_buy_order(uuid, text, integer, numeric, uuid) from public, anon;
+revoke execute on function public.execute_sell_order(uuid, text, integer, numeric, uuid) from public, anon;
+revoke execute on function public.execute_batch_order(uuid, jsonb, uuid) from public, anon;
+revoke execute on function public.create_league(uuid, text, text, numeric, date, date, boolean) from public, anon;
+revoke execute on function public.join_league(uuid, uuid) from public, anon;
+
+select public.refresh_leaderboard();
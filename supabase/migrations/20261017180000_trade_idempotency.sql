@@ -0,0 +1,329 @@
+-- Hardens the trade write path.
+--   * Idempotency: every buy, sell and basket can carry a client-generated p_idempotency_key. The first call
+--     with a key claims it in order_submissions and stores its result in the same transaction. Repeats (a
+--     double click, or a retry after a lost response) wait for that transaction and get its result back
+--     instead of trading again. A call that fails rolls back its claim, so it can be retried with the same key.
+--     The claim also stores a hash of the order (ticker, quantity and side, or every leg of a basket), and a
+--     repeat whose order differs is rejected instead of being answered with the first order's result.
+--   * Price checks: the submitted price is what the player saw when the page rendered. It must be within
+--     trade_price_tolerance() of the latest synced stocks.current_price, and the trade fills at the synced
+--     price, so a stale page can neither trade at an old price nor fill far from what the player confirmed.
+-- execute_standing_orders() is unchanged: it already fills at the price the sync has just written.
+
+create table if not exists public.order_submissions (
+    user_id         uuid        not null,
+    idempotency_key uuid        not null,
+    league_id       uuid        not null references public.leagues (id) on delete cascade,
+    kind            text        not null check (kind in ('buy', 'sell', 'batch')),
+    payload_hash    text        not null,
+    result          jsonb,
+    created_at      timestamptz not null default now(),
+    primary key (user_id, idempotency_key)
+);
+
+create index if not exists order_submissions_created_idx on public.order_submissions (created_at);
+
+-- Only the trade functions (security definer) read or write submissions
+alter table public.order_submissions enable row level security;
+
+-- Largest relative gap allowed between the submitted price and the synced one
+create or replace function public.trade_price_tolerance()
+returns numeric
+language sql
+immutable
+as $$ select 0.02::numeric $$;
+
+-- Returns the synced price of p_ticker, or raises when p_price is too far from it
+create or replace function public.checked_trade_price(p_ticker text, p_price numeric)
+returns numeric
+language plpgsql
+stable
+set search_path = public
+as $$
+declare
+    v_current numeric;
+begin
+    if p_price is null or p_price <= 0 then
+        raise exception 'Quantity and price must be positive';
+    end if;
+    select current_price into v_current from stocks where ticker = p_ticker;
+    if not found or v_current is null or v_current <= 0 then
+        raise exception 'Unknown ticker %', p_ticker;
+    end if;
+    if abs(p_price - v_current) > v_current * trade_price_tolerance() then
+        raise exception 'Price of % has moved to % since you loaded it (you saw %). Review the order and resubmit',
+            p_ticker, v_current, p_price;
+    end if;
+    return v_current;
+end;
+$$;
+
+-- Only the trade functions (security definer) check prices
+revoke execute on function public.checked_trade_price(text, numeric) from public, anon, authenticated;
+
+-- Claims p_key for this user. Returns null when the key is new; otherwise waits for the call holding it and
+-- returns that call's stored result. p_payload describes the order; a repeat must carry the same one (jsonb
+-- prints its keys in a fixed order, so equal payloads hash the same). A null key opts out of deduplication.
+create or replace function public.claim_order_submission(p_user_id uuid, p_key uuid, p_league_id uuid, p_kind text,
+                                                         p_payload jsonb)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+    v_submission order_submissions%rowtype;
+    v_hash       text := md5(p_payload::text);
+begin
+    if p_key is null then
+        return null;
+    end if;
+    insert into order_submissions (user_id, idempotency_key, league_id, kind, payload_hash)
+    values (p_user_id, p_key, p_league_id, p_kind, v_hash)
+    on conflict (user_id, idempotency_key) do nothing;
+    if found then
+        return null;
+    end if;
+
+    select * into v_submission from order_submissions where user_id = p_user_id and idempotency_key = p_key;
+    if v_submission.league_id <> p_league_id or v_submission.kind <> p_kind or v_submission.payload_hash <> v_hash then
+        raise exception 'This order key was already used for a different order';
+    end if;
+    return v_submission.result || jsonb_build_object('duplicate', true);
+end;
+$$;
+
+revoke execute on function public.claim_order_submission(uuid, uuid, uuid, text, jsonb) from public, anon, authenticated;
+
+drop function if exists public.execute_buy_order(uuid, text, integer, numeric, uuid);
+create or replace function public.execute_buy_order(p_user_id uuid, p_ticker text, p_quantity integer, p_price numeric,
+                                                    p_league_id uuid, p_idempotency_key uuid default null)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_price  numeric;
+    v_result jsonb;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    v_result := claim_order_submission(p_user_id, p_idempotency_key, p_league_id, 'buy',
+                                       jsonb_build_object('ticker', p_ticker, 'quantity', p_quantity));
+    if v_result is not null then
+        return v_result;
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+    if p_quantity is null or p_quantity <= 0 then
+        raise exception 'Quantity and price must be positive';
+    end if;
+    v_price := checked_trade_price(p_ticker, p_price);
+
+    update league_members set cash_balance = cash_balance - p_quantity * v_price
+     where league_id = p_league_id and user_id = p_user_id and cash_balance >= p_quantity * v_price;
+    if not found then
+        raise exception 'Insufficient funds';
+    end if;
+
+    insert into portfolios (league_id, user_id, ticker, shares_count, avg_price)
+    values (p_league_id, p_user_id, p_ticker, p_quantity, v_price)
+    on conflict (league_id, user_id, ticker) do update
+        set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                        / (portfolios.shares_count + excluded.shares_count),
+            shares_count = portfolios.shares_count + excluded.shares_count;
+
+    insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+    values (p_league_id, p_user_id, p_ticker, 'BUY', p_quantity, v_price, p_quantity * v_price);
+
+    v_result := jsonb_build_object('status', 'filled', 'ticker', p_ticker, 'quantity', p_quantity,
+                                   'price', v_price, 'total_value', p_quantity * v_price, 'duplicate', false);
+    update order_submissions set result = v_result where user_id = p_user_id and idempotency_key = p_idempotency_key;
+    return v_result;
+end;
+$$;
+
+drop function if exists public.execute_sell_order(uuid, text, integer, numeric, uuid);
+create or replace function public.execute_sell_order(p_user_id uuid, p_ticker text, p_quantity integer, p_price numeric,
+                                                     p_league_id uuid, p_idempotency_key uuid default null)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_price  numeric;
+    v_held   integer;
+    v_result jsonb;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    v_result := claim_order_submission(p_user_id, p_idempotency_key, p_league_id, 'sell',
+                                       jsonb_build_object('ticker', p_ticker, 'quantity', p_quantity));
+    if v_result is not null then
+        return v_result;
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+    if p_quantity is null or p_quantity <= 0 then
+        raise exception 'Quantity and price must be positive';
+    end if;
+    v_price := checked_trade_price(p_ticker, p_price);
+
+    update portfolios set shares_count = shares_count - p_quantity
+     where league_id = p_league_id and user_id = p_user_id and ticker = p_ticker and shares_count >= p_quantity
+    returning shares_count into v_held;
+    if not found then
+        raise exception 'Insufficient shares';
+    end if;
+    if v_held = 0 then
+        delete from portfolios where league_id = p_league_id and user_id = p_user_id and ticker = p_ticker;
+    end if;
+
+    update league_members set cash_balance = cash_balance + p_quantity * v_price
+     where league_id = p_league_id and user_id = p_user_id;
+
+    insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+    values (p_league_id, p_user_id, p_ticker, 'SELL', p_quantity, v_price, p_quantity * v_price);
+
+    v_result := jsonb_build_object('status', 'filled', 'ticker', p_ticker, 'quantity', p_quantity,
+                                   'price', v_price, 'total_value', p_quantity * v_price, 'duplicate', false);
+    update order_submissions set result = v_result where user_id = p_user_id and idempotency_key = p_idempotency_key;
+    return v_result;
+end;
+$$;
+
+-- Same contract as before (see 20261017120000_execute_batch_order.sql); every leg is price-checked and fills
+-- at the synced price. A repeated key returns the stored legs, each with "duplicate": true.
+drop function if exists public.execute_batch_order(uuid, jsonb, uuid);
+create or replace function public.execute_batch_order(p_user_id uuid, p_legs jsonb, p_league_id uuid,
+                                                      p_idempotency_key uuid default null)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_leg      jsonb;
+    v_index    integer;
+    v_side     text;
+    v_ticker   text;
+    v_quantity integer;
+    v_price    numeric;
+    v_prices   jsonb := '{}'::jsonb;
+    v_cash     numeric;
+    v_net      numeric := 0;
+    v_held     integer;
+    v_results  jsonb := '[]'::jsonb;
+    v_stored   jsonb;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot trade on behalf of another user';
+    end if;
+    -- The basket's legs in order, without the prices the player saw
+    v_stored := claim_order_submission(p_user_id, p_idempotency_key, p_league_id, 'batch', (
+        select coalesce(jsonb_agg(jsonb_build_object('side', lower(l ->> 'side'), 'ticker', l ->> 'ticker',
+                                                     'quantity', l -> 'quantity') order by n), '[]'::jsonb)
+          from jsonb_array_elements(case when jsonb_typeof(p_legs) = 'array' then p_legs else '[]'::jsonb end)
+               with ordinality as t(l, n)));
+    if v_stored is not null then
+        return (select jsonb_agg(r || jsonb_build_object('duplicate', true) order by (r ->> 'leg')::integer)
+                  from jsonb_array_elements(v_stored -> 'legs') r);
+    end if;
+    if not league_is_open(p_league_id) then
+        raise exception 'This league is not open for trading';
+    end if;
+
+    if p_legs is null or jsonb_typeof(p_legs) <> 'array' or jsonb_array_length(p_legs) = 0 then
+        raise exception 'Basket is empty';
+    end if;
+
+    -- Lock the player's cash in this league for the duration of the basket
+    select cash_balance into v_cash from league_members
+     where league_id = p_league_id and user_id = p_user_id for update;
+    if not found then
+        raise exception 'Not a member of this league';
+    end if;
+
+    -- 1. Validate every leg against the synced prices and compute the net cash flow
+    for v_leg, v_index in select value, ordinality from jsonb_array_elements(p_legs) with ordinality loop
+        v_side := lower(v_leg ->> 'side');
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        if v_side not in ('buy', 'sell') then
+            raise exception 'Leg %: side must be buy or sell', v_index;
+        end if;
+        if v_quantity is null or v_quantity <= 0 then
+            raise exception 'Leg %: quantity and price must be positive', v_index;
+        end if;
+        begin
+            v_price := checked_trade_price(v_leg ->> 'ticker', (v_leg ->> 'price')::numeric);
+        exception when others then
+            raise exception 'Leg %: %', v_index, sqlerrm;
+        end;
+        v_prices := v_prices || jsonb_build_object(v_index::text, v_price);
+        v_net := v_net + case when v_side = 'sell' then v_quantity * v_price else -v_quantity * v_price end;
+    end loop;
+
+    -- 2. One cash check for the whole basket
+    if v_cash + v_net < 0 then
+        raise exception 'Insufficient funds: basket needs % more GYD', -(v_cash + v_net);
+    end if;
+
+    -- 3. Apply sells first, then buys
+    for v_leg, v_index in
+        select value, ordinality from jsonb_array_elements(p_legs) with ordinality
+        order by (lower(value ->> 'side') = 'buy'), ordinality
+    loop
+        v_side := lower(v_leg ->> 'side');
+        v_ticker := v_leg ->> 'ticker';
+        v_quantity := (v_leg ->> 'quantity')::integer;
+        v_price := (v_prices ->> v_index::text)::numeric;
+
+        if v_side = 'sell' then
+            update portfolios
+               set shares_count = shares_count - v_quantity
+             where league_id = p_league_id and user_id = p_user_id and ticker = v_ticker and shares_count >= v_quantity
+            returning shares_count into v_held;
+            if not found then
+                raise exception 'Leg %: insufficient shares of %', v_index, v_ticker;
+            end if;
+            if v_held = 0 then
+                delete from portfolios where league_id = p_league_id and user_id = p_user_id and ticker = v_ticker;
+            end if;
+        else
+            insert into portfolios (league_id, user_id, ticker, shares_count, avg_price)
+            values (p_league_id, p_user_id, v_ticker, v_quantity, v_price)
+            on conflict (league_id, user_id, ticker) do update
+                set avg_price = (portfolios.shares_count * portfolios.avg_price + excluded.shares_count * excluded.avg_price)
+                                / (portfolios.shares_count + excluded.shares_count),
+                    shares_count = portfolios.shares_count + excluded.shares_count;
+        end if;
+
+        insert into transactions (league_id, user_id, ticker, type, quantity, price, total_value)
+        values (p_league_id, p_user_id, v_ticker, upper(v_side), v_quantity, v_price, v_quantity * v_price);
+
+        v_results := v_results || jsonb_build_object(
+            'leg', v_index, 'side', v_side, 'ticker', v_ticker, 'quantity', v_quantity,
+            'price', v_price, 'total_value', v_quantity * v_price, 'status', 'filled'
+        );
+    end loop;
+
+    update league_members set cash_balance = cash_balance + v_net
+     where league_id = p_league_id and user_id = p_user_id;
+
+    v_results := (select jsonb_agg(r order by (r ->> 'leg')::integer) from jsonb_array_elements(v_results) r);
+    update order_submissions set result = jsonb_build_object('legs', v_results)
+     where user_id = p_user_id and idempotency_key = p_idempotency_key;
+    return v_results;
+end;
+$$;
+
+-- Every trade function checks that the caller is p_user_id (anon has no uid, so it is refused outright);
+-- only the service role may trade on another user's behalf
+revoke execute on function public.execute_buy_order(uuid, text, integer, numeric, uuid, uuid) from public, anon;
+revoke execute on function public.execute_sell_order(uuid, text, integer, numeric, uuid, uuid) from public, anon;
+revoke execute on function public.execute_batch_order(uuid, jsonb, uuid, uuid) from public, anon;
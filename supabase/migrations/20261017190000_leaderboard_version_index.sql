@@ -0,0 +1,4 @@
+-- database.getLeaderboardVersion() reads a league's latest leaderboard change to key its cached pages:
+--   select updated_at from leaderboard_ranked where league_id = $1 order by updated_at desc limit 1
+create index if not exists leaderboard_ranked_league_updated_idx
+    on public.leaderboard_ranked (league_id, updated_at desc);
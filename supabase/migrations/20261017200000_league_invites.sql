@@ -0,0 +1,48 @@
+-- Private leagues. join_league() used to accept any league id, so anyone who learned a private league's id
+-- could join it. Every league now has a join_code, which its members can read (the leagues RLS policy only
+-- shows private leagues to members) and share. A private league can only be joined with its code, or by its
+-- creator. join_league() can also look a league up by code, because non-members cannot see private leagues.
+
+alter table public.leagues
+    add column if not exists join_code text not null default substr(md5(gen_random_uuid()::text), 1, 10);
+
+create unique index if not exists leagues_join_code_idx on public.leagues (join_code);
+
+-- The old two-argument signature would make PostgREST's call ambiguous
+drop function if exists public.join_league(uuid, uuid);
+
+-- Adds a player to a league with its starting cash and returns the league's id; joining twice is a no-op
+create or replace function public.join_league(p_user_id uuid, p_league_id uuid default null, p_code text default null)
+returns uuid
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_league leagues%rowtype;
+begin
+    if auth.role() is distinct from 'service_role' and auth.uid() is distinct from p_user_id then
+        raise exception 'Cannot join a league on behalf of another user';
+    end if;
+    if p_league_id is null then
+        select * into v_league from leagues where join_code = p_code;
+    else
+        select * into v_league from leagues where id = p_league_id;
+    end if;
+    if not found or (v_league.ends_on is not null and v_league.ends_on < current_date) then
+        raise exception 'League not found or already finished';
+    end if;
+    if not v_league.is_public and v_league.created_by is distinct from p_user_id
+       and p_code is distinct from v_league.join_code then
+        raise exception 'This league is private: join it with its invite code';
+    end if;
+    insert into league_members (league_id, user_id, username, cash_balance)
+    select v_league.id, p.id, p.username, v_league.starting_cash
+    from profiles p
+    where p.id = p_user_id
+    on conflict (league_id, user_id) do nothing;
+    return v_league.id;
+end;
+$$;
+
+revoke execute on function public.join_league(uuid, uuid, text) from public, anon;
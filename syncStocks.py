@@ -1,4 +1,12 @@
 import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 import financegy
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -11,54 +19,1082 @@ URL = os.getenv("SUPABASE_URL")
 KEY = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(URL, KEY)
 
-def syncMarketData():
+#Fetch tuning - override through the environment or the CLI flags below
+MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.getenv("SYNC_FETCH_TIMEOUT", "20"))
+FETCH_RETRIES = int(os.getenv("SYNC_FETCH_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("SYNC_RETRY_BACKOFF", "0.5"))
+UPSERT_CHUNK_SIZE = int(os.getenv("SYNC_UPSERT_CHUNK_SIZE", "500"))
+
+guyanaTZ = ZoneInfo("America/Guyana")
+
+#Daemon schedule - GSE session times are in Guyana time
+SESSION_OPEN = os.getenv("GSE_SESSION_OPEN", "09:30")
+SESSION_CLOSE = os.getenv("GSE_SESSION_CLOSE", "14:30")
+TRADING_DAYS = os.getenv("GSE_TRADING_DAYS", "Mon,Tue,Wed,Thu,Fri")
+HOLIDAYS = os.getenv("GSE_HOLIDAYS", "") # Comma-separated ISO dates the exchange is closed
+MIN_INTERVAL = float(os.getenv("SYNC_MIN_INTERVAL", "300"))
+MAX_INTERVAL = float(os.getenv("SYNC_MAX_INTERVAL", "3600"))
+INACTIVE_DAYS = int(os.getenv("SYNC_INACTIVE_DAYS", "14"))
+STATE_FILE = os.getenv("SYNC_STATE_FILE", os.path.join(".cache", "sync_state.json"))
+ERROR_BACKOFF = float(os.getenv("SYNC_ERROR_BACKOFF", "60")) # First retry after a failed daemon pass, doubled per failure
+MAX_ERROR_BACKOFF = float(os.getenv("SYNC_MAX_ERROR_BACKOFF", "1800"))
+
+#FinanceGY response cache - the securities list rarely changes, trades move intraday
+CACHE_FILE = os.getenv("SYNC_CACHE_FILE", os.path.join(".cache", "financegy.json"))
+SECURITIES_TTL = float(os.getenv("SYNC_SECURITIES_TTL", "86400"))
+TRADE_TTL = float(os.getenv("SYNC_TRADE_TTL", "300"))
+
+#League snapshot, written after each sync
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "5000"))
+READ_PAGE_SIZE = 1000 #PostgREST's default max rows per response
+GLOBAL_LEAGUE = "00000000-0000-0000-0000-000000000000" #Every player's default league
+
+#Standing orders and alerts, matched against every price the sync writes
+ORDER_FILL_CHUNK_SIZE = int(os.getenv("ORDER_FILL_CHUNK_SIZE", "500"))
+STANDING_ORDER_COLUMNS = "id, user_id, ticker, kind, side, quantity, trigger_price, direction, created_at"
+
+#Historical backfill and replay
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "1000"))
+BACKFILL_STATE_FILE = os.getenv("BACKFILL_STATE_FILE", os.path.join(".cache", "backfill_state.json"))
+REPLAY_TRADE_COLUMNS = "id, user_id, created_at, type, ticker, quantity, total_value"
+
+class FetchCache:
     """
-    Fetches the latest trading data from the Guyana Stock Exchange 
-    and updates the local Supabase 'stocks' table.
+    On-disk cache of FinanceGY responses with a TTL per endpoint. Each entry
+    keeps the payload, when it was fetched, its size and a content hash, plus
+    the hash that was last written to Supabase ('syncedHash'), so a payload
+    that has not changed since the last successful sync can skip parsing and
+    the upsert. `stats` counts hits, misses, bytes served from the cache and
+    unchanged payloads for the current run.
     """
-    print("Starting Guyana Stock Exchange Market Sync.....")
+    def __init__(self, path=CACHE_FILE, ttls=None):
+        self.path = path
+        self.ttls = {"securities": SECURITIES_TTL, "trade": TRADE_TTL, **(ttls or {})}
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self.resetStats()
+
+    def resetStats(self):
+        self.stats = {"hits": 0, "misses": 0, "bytesSaved": 0, "unchanged": 0}
+
+    def lookup(self, endpoint, key=""):
+        #Returns the cached payload while it is younger than the endpoint's TTL, otherwise None
+        with self.lock:
+            entry = self.entries.get(f"{endpoint}:{key}")
+            if entry is not None and time.time() - entry["fetchedAt"] < self.ttls[endpoint]:
+                self.stats["hits"] += 1
+                self.stats["bytesSaved"] += entry["bytes"]
+                return entry["payload"]
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, endpoint, key, payload):
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        with self.lock:
+            entry = self.entries.setdefault(f"{endpoint}:{key}", {})
+            entry.update(payload=payload, fetchedAt=time.time(), bytes=len(body),
+                         hash=hashlib.sha256(body).hexdigest())
+
+    def isSynced(self, endpoint, key):
+        #True when the current payload is the one the last successful sync wrote
+        with self.lock:
+            entry = self.entries.get(f"{endpoint}:{key}")
+            return entry is not None and entry.get("hash") == entry.get("syncedHash")
+
+    def markSynced(self, endpoint, keys):
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(f"{endpoint}:{key}")
+                if entry is not None:
+                    entry["syncedHash"] = entry["hash"]
+
+    def prune(self, endpoint, keep):
+        #Drops entries for keys no longer listed (e.g. delisted securities)
+        keep = {f"{endpoint}:{key}" for key in keep}
+        with self.lock:
+            for name in [n for n in self.entries if n.startswith(f"{endpoint}:") and n not in keep]:
+                del self.entries[name]
+
+    def save(self):
+        #Same temp-file-then-replace as saveSyncState
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmpPath = f"{self.path}.tmp"
+        with self.lock, open(tmpPath, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmpPath, self.path)
+
+def attemptPool(workers, retries=FETCH_RETRIES):
+    #One executor for a whole run's FinanceGY calls: room for every attempt of `workers` fetchers, so a hung call never delays a retry
+    return ThreadPoolExecutor(max_workers=max(1, workers) * max(1, retries), thread_name_prefix="financegy")
+
+def callWithRetry(fn, args, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF, pool=None):
+    """
+    Calls fn(*args) with each attempt bounded by `timeout` seconds, retrying
+    failed attempts with exponential backoff. Attempts run on `pool` (see
+    attemptPool) so a hung request can be abandoned; its thread is reused once
+    the request returns, and a run never holds more threads than the pool.
+    Returns (result, error, attempts); result is None and error the last
+    failure when every attempt failed.
+    """
+    ownPool = pool is None
+    pool = pool or attemptPool(1, retries)
+    error = None
+    try:
+        for attempt in range(1, retries + 1):
+            future = pool.submit(fn, *args)
+            try:
+                return future.result(timeout=timeout), None, attempt
+            except FutureTimeout:
+                future.cancel()
+                error = f"timed out after {timeout:.1f}s"
+            except Exception as e:
+                error = str(e)
+
+            if attempt < retries:
+                time.sleep(backoff * (2 ** (attempt - 1)))
+        return None, error, retries
+    finally:
+        if ownPool:
+            pool.shutdown(wait=False)
+
+def fetchRecentTrade(symbol, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF, pool=None):
+    """
+    Fetches the most recent trade for a single symbol.
+
+    Each attempt is bounded by `timeout` seconds and failed attempts are retried
+    with exponential backoff. Returns a dict with the trade (or None), the last
+    error, the number of attempts and the wall time spent on this symbol.
+    """
+    start = time.perf_counter()
+    trade, error, attempts = callWithRetry(financegy.get_recent_trade, (symbol,), timeout, retries, backoff, pool)
+    return {
+        "symbol": symbol,
+        "trade": trade,
+        "error": error,
+        "attempts": attempts,
+        "latency": time.perf_counter() - start
+    }
+
+def cachedRecentTrade(symbol, cache=None, refresh=False, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF,
+                      pool=None):
+    #Serves the trade from `cache` while it is fresh (unless `refresh`), otherwise fetches and stores it
+    if cache is not None and not refresh:
+        trade = cache.lookup("trade", symbol)
+        if trade is not None:
+            return {"symbol": symbol, "trade": trade, "error": None, "attempts": 0, "latency": 0.0, "cached": True}
+
+    result = fetchRecentTrade(symbol, timeout, retries, backoff, pool)
+    result["cached"] = False
+    if cache is not None and result["trade"]:
+        cache.store("trade", symbol, result["trade"])
+    return result
 
-    # 1. Retrieve the list of all companies/securities currently traded on the GSE
+def fetchAllTrades(symbols, maxWorkers=MAX_WORKERS, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF,
+                   cache=None, refresh=False):
+    #Fetches trades for every symbol through a bounded worker pool, preserving input order
+    workers = max(1, min(maxWorkers, len(symbols) or 1))
+    attempts = attemptPool(workers, retries)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda s: cachedRecentTrade(s, cache, refresh, timeout, retries, backoff, attempts),
+                                 symbols))
+    finally:
+        attempts.shutdown(wait=False)
+
+def fetchSecurities(cache=None, refresh=False):
+    #Returns the GSE securities list, from `cache` while it is younger than SECURITIES_TTL
+    if cache is not None and not refresh:
+        securities = cache.lookup("securities")
+        if securities is not None:
+            return securities
     securities = financegy.get_securities()
+    if cache is not None:
+        cache.store("securities", "", securities)
+    return securities
+
+def parsePrice(symbol, trade):
+    #Extracts the LTP from a trade record, returning None when it is missing or malformed
+    if not trade:
+        return None
+
+    # 'ltp' (Last Traded Price) is the standard market value
+    raw_price = trade.get('ltp')
+    if not raw_price:
+        print(f"No price data for {symbol}")
+        return None
+
+    try:
+        # Data Cleaning: GSE prices often contain commas (e.g., "3,500.0").
+        # We strip commas so Postgres 'numeric' type can process it as a float.
+        return float(str(raw_price).replace(',', ''))
+    except ValueError:
+        # Log parsing errors without crashing the entire sync
+        print(f"Could not parse price for {symbol}: {raw_price}")
+        return None
+
+def parseTradeDate(trade):
+    #Converts FinanceGY's DD/MM/YYYY trade date to ISO format, falling back to today in Guyana
+    try:
+        return datetime.strptime(trade.get('date') or '', "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return datetime.now(guyanaTZ).date().isoformat()
+
+def printFetchReport(results, totalTime):
+    #Prints per-symbol latency and the overall fetch time
+    print(f"{'SYMBOL':<10}{'LATENCY':>10}{'TRIES':>7}  STATUS")
+    for r in sorted(results, key=lambda r: r["latency"], reverse=True):
+        status = "cached" if r.get("cached") else "ok" if r["error"] is None else f"failed: {r['error']}"
+        print(f"{r['symbol']:<10}{r['latency']:>9.2f}s{r['attempts']:>7}  {status}")
+
+    serialTime = sum(r["latency"] for r in results)
+    speedup = serialTime / totalTime if totalTime else 0
+    print(f"Fetched {len(results)} symbols in {totalTime:.2f}s "
+          f"(sum of per-symbol latency {serialTime:.2f}s, {speedup:.1f}x)")
+
+def printCacheReport(cache):
+    #Prints this run's FinanceGY cache hit rate and what it saved
+    stats = cache.stats
+    lookups = stats["hits"] + stats["misses"]
+    hitRate = stats["hits"] / lookups * 100 if lookups else 0
+    print(f"FinanceGY cache: {stats['hits']}/{lookups} hits ({hitRate:.0f}%), "
+          f"{stats['hits']} requests and {stats['bytesSaved'] / 1024:.1f} KB saved, "
+          f"{stats['unchanged']} unchanged payloads skipped")
+
+def loadSyncedPrices(tickers=None):
+    #Reads the last-synced price of every ticker (or just `tickers`) in one bulk query
+    query = supabase.table("stocks").select("ticker, name, current_price")
+    if tickers is not None:
+        query = query.in_("ticker", list(tickers))
+    response = query.execute()
+    return {row['ticker']: row for row in response.data or []}
+
+def diffStocks(stock_data, synced):
+    """
+    Splits freshly fetched rows into new tickers, changed tickers and unchanged
+    tickers, comparing against the snapshot returned by loadSyncedPrices().
+    """
+    inserts, updates, skipped = [], [], []
+    for row in stock_data:
+        previous = synced.get(row['ticker'])
+        if previous is None:
+            inserts.append(row)
+        elif previous.get('current_price') is None \
+                or round(float(previous['current_price']), 6) != round(row['current_price'], 6) \
+                or previous.get('name') != row['name']:
+            updates.append(row)
+        else:
+            skipped.append(row)
+    return inserts, updates, skipped
+
+def upsertInChunks(table, rows, chunkSize=UPSERT_CHUNK_SIZE, **upsertOptions):
+    #Upserts rows in batches of at most chunkSize so large diffs stay within request limits
+    chunkSize = max(1, chunkSize)
+    for i in range(0, len(rows), chunkSize):
+        supabase.table(table).upsert(rows[i:i + chunkSize], **upsertOptions).execute()
+
+def appendPriceHistory(history_data, chunkSize=UPSERT_CHUNK_SIZE):
+    #Appends observations to 'price_history'; a ticker's existing row for the same trade date is never rewritten
+    upsertInChunks("price_history", history_data, chunkSize,
+                   on_conflict="ticker,trade_date", ignore_duplicates=True)
+
+def syncTrades(names, maxWorkers=MAX_WORKERS, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES,
+               chunkSize=UPSERT_CHUNK_SIZE, fullSync=False, cache=None, refresh=False, matchOrders=True):
+    """
+    Fetches the latest trade for every symbol in `names` ({symbol: company name})
+    and writes the new or changed ones to Supabase. Returns the rows written to
+    'stocks' and the per-symbol fetch results.
+
+    With a `cache`, fresh trades are served from it (unless `refresh`) and
+    trades whose payload matches the last synced one are neither parsed nor
+    written (unless `fullSync`). Every open standing order and alert is then
+    matched against the current prices unless `matchOrders` is False, so an
+    order that was already crossed when it was placed fills without waiting
+    for its ticker to move.
+    """
+    # 1. Fetch each security's market performance through the worker pool
+    fetchStart = time.perf_counter()
+    results = fetchAllTrades(list(names), maxWorkers, timeout, retries, cache=cache, refresh=refresh)
+    printFetchReport(results, time.perf_counter() - fetchStart)
 
     stock_data = []
-    
-    # 2. Iterate through each security to fetch its specific market performance
-    for sec in securities:
-        symbol = sec['symbol']
-        trade = financegy.get_recent_trade(symbol)
-
-        # Skip logic if no trade data is returned for this ticker
-        if trade:
-            # 3. Extract 'ltp' (Last Traded Price) - the standard market value
-            raw_price = trade.get('ltp')
-            
-            if raw_price:
-                try:
-                    # Data Cleaning: GSE prices often contain commas (e.g., "3,500.0").
-                    # We strip commas so Postgres 'numeric' type can process it as a float.
-                    price = float(str(raw_price).replace(',', ''))
-
-                    # Prepare the object for Supabase upsert
-                    stock_data.append({
-                        "ticker": symbol,
-                        "name": sec.get('name', 'Unknown'),
-                        "current_price": price,
-                        "last_updated": "now()" # Postgres will interpret this as the current timestamp
-                    })
-                except ValueError:
-                    # Log parsing errors without crashing the entire sync
-                    print(f"Could not parse price for {symbol}: {raw_price}")
+    history_data = []
+    fetched = [r["symbol"] for r in results if r["trade"]]
+    for r in results:
+        if cache is not None and not fullSync and r["trade"] and cache.isSynced("trade", r["symbol"]):
+            cache.stats["unchanged"] += 1
+            continue
+        price = parsePrice(r["symbol"], r["trade"])
+        if price is not None:
+            history_data.append({
+                "ticker": r["symbol"],
+                "trade_date": parseTradeDate(r["trade"]),
+                "session": r["trade"].get('session'),
+                "price": price
+            })
+            # Prepare the object for Supabase upsert
+            stock_data.append({
+                "ticker": r["symbol"],
+                "name": names[r["symbol"]],
+                "current_price": price,
+                "last_updated": "now()" # Postgres will interpret this as the current timestamp
+            })
+
+    failed = [r["symbol"] for r in results if r["error"] is not None]
+    if failed:
+        print(f"Failed to fetch {len(failed)} securities: {', '.join(failed)}")
+
+    if not stock_data:
+        print("No new trade data found to sync")
+        if matchOrders:
+            matchStandingOrders()
+        if cache is not None:
+            cache.markSynced("trade", fetched)
+            cache.save()
+        return [], results
+
+    # 2. Diff against the prices already stored so unchanged rows are not rewritten
+    if fullSync:
+        inserts, updates, skipped = [], stock_data, []
+    else:
+        inserts, updates, skipped = diffStocks(stock_data, loadSyncedPrices([row['ticker'] for row in stock_data]))
+
+    # 3. Batch update the database
+    # 'upsert' updates the price if the ticker exists, or inserts it if new
+    changed = inserts + updates
+    upsertInChunks("stocks", changed, chunkSize)
+    print(f"Synced {len(changed)} securities to the DB: "
+          f"{len(inserts)} inserted, {len(updates)} updated, {len(skipped)} skipped (unchanged)")
+
+    # 4. Record every observation in the append-only price history
+    appendPriceHistory(history_data, chunkSize)
+    print(f"Recorded {len(history_data)} price observations")
+
+    # 5. Fill the standing orders and fire the alerts the current prices reached
+    if matchOrders:
+        matchStandingOrders({row['ticker']: row['current_price'] for row in changed})
+
+    # 6. Re-rank everyone against the new prices in one server-side pass
+    if changed:
+        refreshed = supabase.rpc("refresh_leaderboard").execute().data
+        print(f"Refreshed leaderboard ({refreshed} rows changed)")
+
+    # Only now that the writes went through can these payloads be skipped next time
+    if cache is not None:
+        cache.markSynced("trade", fetched)
+        cache.save()
+    return changed, results
+
+def syncMarketData(maxWorkers=MAX_WORKERS, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES,
+                   chunkSize=UPSERT_CHUNK_SIZE, fullSync=False, refresh=False, cache=None, useCache=True,
+                   matchOrders=True):
+    """
+    Fetches the latest trading data from the Guyana Stock Exchange
+    and updates the local Supabase 'stocks' table.
+
+    Trades are fetched concurrently through a pool of `maxWorkers` threads
+    (pass 1 for the old serial behaviour). Symbols that fail after all retries
+    are reported and skipped; the ones that succeeded are still upserted.
+
+    Only new or changed tickers are written unless `fullSync` is set, so an
+    unchanged LTP keeps its previous 'last_updated' timestamp.
+
+    FinanceGY responses go through a FetchCache at CACHE_FILE (or `cache`):
+    the securities list is reused for SECURITIES_TTL and trades for TRADE_TTL.
+    `refresh` fetches everything again; `useCache=False` bypasses the cache.
+
+    Standing orders and alerts are matched against the current prices (see
+    matchStandingOrders) unless `matchOrders` is False.
+    """
+    print("Starting Guyana Stock Exchange Market Sync.....")
+    syncStart = time.perf_counter()
+    if useCache and cache is None:
+        cache = FetchCache()
+
+    # Retrieve the list of all companies/securities currently traded on the GSE
+    securities = fetchSecurities(cache, refresh)
+    names = {sec['symbol']: sec.get('name', 'Unknown') for sec in securities}
+    if cache is not None:
+        cache.prune("trade", names)
+    changed, _ = syncTrades(names, maxWorkers, timeout, retries, chunkSize, fullSync, cache, refresh, matchOrders)
+
+    if cache is not None:
+        printCacheReport(cache)
+    print(f"Total sync time: {time.perf_counter() - syncStart:.2f}s")
+    return changed
+
+# --- Standing orders ---
+
+def loadOpenOrders(tickers=None):
+    #Every open order and alert (or just those on `tickers`), in keyset pages; the partial index only holds open orders
+    if tickers is not None and not tickers:
+        return []
+    isIn = {"ticker": tickers} if tickers is not None else None
+    return readAllRows("standing_orders", STANDING_ORDER_COLUMNS, ("id",), eq={"status": "open"}, isIn=isIn)
+
+def matchStandingOrders(prices=None, chunkSize=ORDER_FILL_CHUNK_SIZE):
+    """
+    Fills the standing orders and fires the alerts that the current prices
+    trigger. Every open order is read in bulk, along with the stored price of
+    each ticker that has one; `prices` ({ticker: price}, e.g. the ones just
+    synced) take precedence over the stored ones. Orders are matched in one
+    pass (orders.OrderBook) and only the triggered ones are sent to
+    execute_standing_orders(), oldest first, in chunks of `chunkSize`.
+    Orders fill at the price that triggered them. Returns counts and
+    per-stage timings.
+    """
+    from orders import OrderBook
+    timings = {}
+    stageStart = time.perf_counter()
+    openOrders = loadOpenOrders()
+    tickers = sorted({o["ticker"] for o in openOrders})
+    current = {t: row["current_price"] for t, row in loadSyncedPrices(tickers).items()} if tickers else {}
+    current.update(prices or {})
+    timings["load"] = time.perf_counter() - stageStart
+
+    stageStart = time.perf_counter()
+    book = OrderBook([o["ticker"] for o in openOrders], [o["direction"] for o in openOrders],
+                     [o["trigger_price"] for o in openOrders])
+    positions, fillPrices = book.match(current)
+    timings["match"] = time.perf_counter() - stageStart
+
+    stageStart = time.perf_counter()
+    fills = sorted(zip(positions.tolist(), fillPrices.tolist()),
+                   key=lambda fill: (openOrders[fill[0]]["created_at"] or "", fill[0]))
+    fills = [{"id": openOrders[i]["id"], "price": price} for i, price in fills]
+    results = []
+    for start in range(0, len(fills), chunkSize):
+        response = supabase.rpc("execute_standing_orders", {"p_fills": fills[start:start + chunkSize]}).execute()
+        results.extend(response.data or [])
+    timings["execute"] = time.perf_counter() - stageStart
+
+    statuses = {status: sum(1 for r in results if r["status"] == status)
+                for status in ("filled", "triggered", "rejected")}
+    print(f"Standing orders: {len(openOrders)} open on {len(tickers)} tickers, {len(fills)} triggered - "
+          f"{statuses['filled']} filled, {statuses['triggered']} alerts, {statuses['rejected']} rejected "
+          f"in {sum(timings.values()):.2f}s - " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    return dict(statuses, open=len(openOrders), matched=len(fills), timings=timings)
+
+# --- League snapshot ---
+
+def readAllRows(table, columns, keys, pageSize=READ_PAGE_SIZE, eq=None, isIn=None, gte=None, lte=None):
+    """
+    Reads every row of `table` (optionally filtered by `eq` {column: value},
+    `isIn` {column: values} and the inclusive bounds `gte`/`lte` {column:
+    value}) in keyset pages on `keys`, a unique one- or two-column key, so
+    deep pages cost the same as the first one.
+    """
+    rows, last = [], None
+    while True:
+        query = supabase.table(table).select(columns)
+        for column, value in (eq or {}).items():
+            query = query.eq(column, value)
+        for column, values in (isIn or {}).items():
+            query = query.in_(column, list(values))
+        for column, value in (gte or {}).items():
+            query = query.gte(column, value)
+        for column, value in (lte or {}).items():
+            query = query.lte(column, value)
+        if last is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last[keys[0]])
             else:
-                print(f"No price data for {symbol}")
+                a, b = keys
+                query = query.or_(f"{a}.gt.{last[a]},and({a}.eq.{last[a]},{b}.gt.{last[b]})")
+        for key in keys:
+            query = query.order(key)
+        page = query.limit(pageSize).execute().data
+        rows.extend(page)
+        if len(page) < pageSize:
+            return rows
+        last = page[-1]
+
+def loadPreviousRanks(before, leagueID=GLOBAL_LEAGUE):
+    #{user_id: rank} from the league's latest snapshot dated before `before`, or {} if there is none
+    latest = supabase.table("league_snapshots").select("snapshot_date").eq("league_id", leagueID) \
+        .lt("snapshot_date", before).order("snapshot_date", desc=True).limit(1).execute().data
+    if not latest:
+        return {}
+    rows = readAllRows("league_snapshots", "user_id, rank", ("user_id",),
+                       eq={"league_id": leagueID, "snapshot_date": latest[0]["snapshot_date"]})
+    return {row["user_id"]: row["rank"] for row in rows}
+
+def loadPrices():
+    return {row["ticker"]: row["current_price"]
+            for row in supabase.table("stocks").select("ticker, current_price").execute().data}
+
+def snapshotLeague(snapshotDate=None, chunkSize=SNAPSHOT_CHUNK_SIZE, leagueID=GLOBAL_LEAGUE, prices=None):
+    """
+    Writes one dated row per member of a league to 'league_snapshots': cash,
+    stock value and net worth at the current prices, rank within the league,
+    and the change in rank since the league's previous snapshot. Members and
+    portfolios are read in bulk, filtered to the league, and everyone is
+    valued and ranked in one vectorized pass (valuation.valueLeague).
+    Re-running on the same date overwrites that date's rows. `prices`
+    ({ticker: price}) saves re-reading stocks when snapshotting many leagues.
+    Returns per-stage timings.
+    """
+    from valuation import valueLeague, rankLeague
+    snapshotDate = snapshotDate or datetime.now(guyanaTZ).date().isoformat()
+    timings = {}
+    stageStart = time.perf_counter()
+
+    # 1. Bulk reads, one league only
+    members = readAllRows("league_members", "user_id, username, cash_balance", ("user_id",), eq={"league_id": leagueID})
+    portfolios = readAllRows("portfolios", "user_id, ticker, shares_count", ("user_id", "ticker"),
+                             eq={"league_id": leagueID})
+    prices = prices if prices is not None else loadPrices()
+    previous = loadPreviousRanks(snapshotDate, leagueID)
+    timings["load"] = time.perf_counter() - stageStart
+
+    # 2. Value and rank everyone at once
+    stageStart = time.perf_counter()
+    valued = valueLeague([m["user_id"] for m in members], [m["cash_balance"] or 0 for m in members],
+                         [h["user_id"] for h in portfolios], [h["ticker"] for h in portfolios],
+                         [h["shares_count"] for h in portfolios], prices)
+    ranked = rankLeague(valued, previous)
+    timings["value"] = time.perf_counter() - stageStart
+
+    # 3. One bulk write, chunked only to stay within request size limits
+    stageStart = time.perf_counter()
+    usernames = {m["user_id"]: m.get("username") for m in members}
+    rows = [{
+        "league_id": leagueID,
+        "snapshot_date": snapshotDate,
+        "user_id": userID,
+        "username": usernames.get(userID),
+        "cash_balance": cash,
+        "stock_value": stockValue,
+        "net_worth": netWorth,
+        "rank": rank,
+        "rank_change": None if change != change else int(change)
+    } for userID, cash, stockValue, netWorth, rank, change in zip(
+        ranked["user_id"], ranked["cash_balance"].tolist(), ranked["stock_value"].tolist(),
+        ranked["net_worth"].tolist(), ranked["rank"].tolist(), ranked["rank_change"].tolist())]
+    upsertInChunks("league_snapshots", rows, chunkSize, on_conflict="league_id,snapshot_date,user_id")
+    timings["write"] = time.perf_counter() - stageStart
+
+    print(f"League snapshot {snapshotDate} ({leagueID}): {len(rows)} players "
+          f"({len(previous)} ranked previously) in {sum(timings.values()):.2f}s - "
+          + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    return timings
+
+def loadActiveLeagues(onDate):
+    #Ids of the leagues running on `onDate` (ISO date): started, and not finished before it
+    leagues = readAllRows("leagues", "id, starts_on, ends_on", ("id",))
+    return [l["id"] for l in leagues if l["starts_on"] <= onDate and (l["ends_on"] is None or onDate <= l["ends_on"])]
+
+def snapshotAllLeagues(snapshotDate=None, chunkSize=SNAPSHOT_CHUNK_SIZE):
+    #Snapshots every active league one at a time, each reading only its own rows; returns {leagueID: timings}
+    snapshotDate = snapshotDate or datetime.now(guyanaTZ).date().isoformat()
+    prices = loadPrices()
+    return {leagueID: snapshotLeague(snapshotDate, chunkSize, leagueID, prices)
+            for leagueID in loadActiveLeagues(snapshotDate)}
+
+# --- Historical backfill ---
+
+def fetchHistoricalTrades(symbol, start, end, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=RETRY_BACKOFF,
+                          pool=None):
+    #Fetches every session of `symbol` between the dates `start` and `end`, with the live sync's timeout and retries
+    def request():
+        trades = financegy.get_historical_trades(symbol, start.strftime("%d/%m/%Y"), end.strftime("%d/%m/%Y"))
+        if trades is None:
+            raise ValueError("could not parse the trade history")
+        return trades
+
+    started = time.perf_counter()
+    trades, error, attempts = callWithRetry(request, (), timeout, retries, backoff, pool)
+    return {"symbol": symbol, "trades": trades, "error": error, "attempts": attempts,
+            "latency": time.perf_counter() - started}
+
+def parseHistoricalTrades(symbol, trades):
+    #Turns FinanceGY sessions into price_history rows, one per trade date (the last session wins); bad rows are skipped
+    rows = {}
+    for trade in trades or []:
+        try:
+            tradeDate = datetime.strptime(trade.get('date') or '', "%d/%m/%Y").date().isoformat()
+        except ValueError:
+            continue
+        price = parsePrice(symbol, trade)
+        if price is not None:
+            rows[tradeDate] = {"ticker": symbol, "trade_date": tradeDate, "session": trade.get('session'), "price": price}
+    return [rows[d] for d in sorted(rows)]
+
+def loadBackfillState(path=BACKFILL_STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def missingSessions(start, end, calendar=None):
+    #Trading days from `start` to `end` (inclusive) with no row at all in 'price_history', i.e. sessions no sync recorded
+    calendar = calendar or MarketCalendar()
+    stored = {row["trade_date"] for row in readAllRows("price_history", "trade_date, ticker", ("trade_date", "ticker"),
+                                                         gte={"trade_date": start.isoformat()},
+                                                         lte={"trade_date": end.isoformat()})}
+    days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+    return [day for day in days if calendar.isTradingDay(day) and day.isoformat() not in stored]
+
+def backfillHistory(start, end=None, symbols=None, maxWorkers=MAX_WORKERS, timeout=FETCH_TIMEOUT,
+                    retries=FETCH_RETRIES, chunkSize=BACKFILL_CHUNK_SIZE, statePath=BACKFILL_STATE_FILE, refresh=False,
+                    onlyMissing=False):
+    """
+    Loads every GSE session between the dates `start` and `end` (inclusive,
+    default today) into 'price_history' for each symbol, or just `symbols`.
+
+    Symbols are fetched in parallel through a pool of `maxWorkers` threads
+    with the live sync's timeout and retries. Rows are bulk-inserted
+    `chunkSize` at a time and never overwrite a date that is already stored.
+    Symbols missing from 'stocks' get a row there first, priced at their last
+    backfilled session. Once a chunk is written, the symbols it completed are
+    checkpointed to `statePath` under this date range. A rerun of the same
+    range skips them and only fetches the rest, unless `refresh` is set.
+
+    With `onlyMissing`, the range first shrinks to the span of trading days
+    that have no 'price_history' rows at all (see missingSessions), and
+    nothing is fetched when there are none. A scheduled run over a sliding
+    window then costs one read on days when nothing was missed, and needs no
+    checkpoint from an earlier run. Returns a summary of the run.
+    """
+    end = end or datetime.now(guyanaTZ).date()
+    runStart = time.perf_counter()
+    if onlyMissing:
+        gaps = missingSessions(start, end)
+        if not gaps:
+            print(f"No sessions missing from price_history between {start} and {end}")
+            return {"symbols": 0, "skipped": 0, "rows": 0, "failed": [], "seconds": time.perf_counter() - runStart}
+        start, end = gaps[0], gaps[-1]
+        print(f"{len(gaps)} sessions missing from price_history: {', '.join(d.isoformat() for d in gaps)}")
+    rangeKey = f"{start.isoformat()}..{end.isoformat()}"
+    state = loadBackfillState(statePath)
+    done = {} if refresh else state.get(rangeKey, {})
+    names = {sec['symbol']: sec.get('name', 'Unknown') for sec in financegy.get_securities()}
+    todo = [s for s in (symbols or names) if s not in done]
+    known = set(loadSyncedPrices(todo)) if todo else set()
+    print(f"Backfilling {len(todo)} symbols from {start} to {end} ({len(done)} already done for this range)")
+
+    buffer, pending, failed = [], [], {}
+    written = 0
+
+    def flush():
+        nonlocal written
+        newStocks = [{"ticker": symbol, "name": names.get(symbol, "Unknown"), "current_price": lastPrice,
+                      "last_updated": "now()"}
+                     for symbol, _, lastPrice in pending if symbol not in known and lastPrice is not None]
+        if newStocks:
+            upsertInChunks("stocks", newStocks, chunkSize, ignore_duplicates=True)
+            known.update(row["ticker"] for row in newStocks)
+        appendPriceHistory(buffer, chunkSize)
+        written += len(buffer)
+        # Checkpoint only what has been written, so a crash never skips unwritten rows on resume
+        done.update({symbol: count for symbol, count, _ in pending})
+        state[rangeKey] = done
+        saveSyncState(state, statePath)
+        buffer.clear()
+        pending.clear()
+
+    workers = max(1, min(maxWorkers, len(todo) or 1))
+    attempts = attemptPool(workers, retries)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetchHistoricalTrades, symbol, start, end, timeout, retries, RETRY_BACKOFF, attempts)
+                       for symbol in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["error"] is not None:
+                    failed[result["symbol"]] = result["error"]
+                    continue
+                rows = parseHistoricalTrades(result["symbol"], result["trades"])
+                buffer.extend(rows)
+                pending.append((result["symbol"], len(rows), rows[-1]["price"] if rows else None))
+                if len(buffer) >= chunkSize:
+                    flush()
+    finally:
+        attempts.shutdown(wait=False)
+    if pending:
+        flush()
+
+    seconds = time.perf_counter() - runStart
+    print(f"Backfilled {written} sessions for {len(todo) - len(failed)} symbols in {seconds:.2f}s")
+    if failed:
+        print(f"Failed to fetch {len(failed)} symbols (rerun to resume): "
+              + ", ".join(f"{s} ({e})" for s, e in failed.items()))
+    return {"symbols": len(todo), "skipped": len(done) - (len(todo) - len(failed)), "rows": written,
+            "failed": sorted(failed), "seconds": seconds}
+
+# --- Replay ---
+
+def loadPriceHistory(end):
+    #Every stored session up to `end` (ISO date), so prices can be carried forward from before a replay window
+    return readAllRows("price_history", "ticker, trade_date, price", ("ticker", "trade_date"), lte={"trade_date": end})
+
+def replayLeague(start, end=None, leagueID=GLOBAL_LEAGUE, write=False, chunkSize=SNAPSHOT_CHUNK_SIZE, history=None):
+    """
+    Replays one league over the trading days between the dates `start` and
+    `end` (inclusive, default today), as if the snapshot had run after every
+    close.
+
+    Each day's holdings and cash are rebuilt from the league's current ones
+    by undoing the trades made since. Prices come from 'price_history',
+    carried forward from each ticker's last session. Every day is valued and
+    ranked with the same pipeline as snapshotLeague (valuation.valueLeague,
+    rankLeague). With `write`, the days are upserted into 'league_snapshots',
+    which fills the rank-history gaps left by missed syncs. Without it
+    nothing is written, and the same data always replays to the same
+    rankings, so a run doubles as a deterministic load test. `history`
+    (loadPriceHistory rows) saves re-reading prices across leagues.
+
+    Returns the day and player counts, per-stage timings and a digest of
+    every day's ranking.
+    """
+    import numpy as np
+    import pandas as pd
+    from analytics import tradeDays
+    from valuation import valueLeague, rankLeague
+    end = end or datetime.now(guyanaTZ).date()
+    timings = {}
+    stageStart = time.perf_counter()
+
+    # 1. Bulk reads: the league's current state, its trades since `start` and the price history
+    members = readAllRows("league_members", "user_id, username, cash_balance", ("user_id",), eq={"league_id": leagueID})
+    portfolios = readAllRows("portfolios", "user_id, ticker, shares_count", ("user_id", "ticker"),
+                             eq={"league_id": leagueID})
+    since = datetime.combine(start, datetime.min.time(), tzinfo=guyanaTZ).astimezone(timezone.utc).isoformat()
+    trades = readAllRows("transactions", REPLAY_TRADE_COLUMNS, ("created_at", "id"),
+                         eq={"league_id": leagueID}, gte={"created_at": since})
+    history = history if history is not None else loadPriceHistory(end.isoformat())
+    previous = loadPreviousRanks(start.isoformat(), leagueID)
+    timings["load"] = time.perf_counter() - stageStart
+
+    # 2. Dense users x tickers state, rewound to the start of the window
+    stageStart = time.perf_counter()
+    prices = pd.DataFrame(history, columns=["ticker", "trade_date", "price"])
+    prices["trade_date"] = pd.to_datetime(prices["trade_date"])
+    prices["price"] = pd.to_numeric(prices["price"], errors="coerce")
+    matrix = prices.pivot_table(index="trade_date", columns="ticker", values="price", aggfunc="last").sort_index().ffill()
+    days = matrix.index[(matrix.index >= pd.Timestamp(start)) & (matrix.index <= pd.Timestamp(end))]
+
+    userIDs = np.array([m["user_id"] for m in members], dtype=object)
+    users = pd.Index(userIDs)
+    tickers = pd.Index(sorted(set(matrix.columns) | {h["ticker"] for h in portfolios} | {t["ticker"] for t in trades}))
+    shares = np.zeros((len(users), len(tickers)))
+    cash = np.array([float(m["cash_balance"] or 0) for m in members])
+    holdingRows = users.get_indexer([h["user_id"] for h in portfolios])
+    holdingCols = tickers.get_indexer([h["ticker"] for h in portfolios])
+    known = holdingRows >= 0
+    np.add.at(shares, (holdingRows[known], holdingCols[known]), [h["shares_count"] for h, k in zip(portfolios, known) if k])
+
+    tradeRows = users.get_indexer([t["user_id"] for t in trades])
+    tradeCols = tickers.get_indexer([t["ticker"] for t in trades])
+    buys = np.array([t["type"].upper() == "BUY" for t in trades], dtype=bool)
+    tradeShares = np.where(buys, 1, -1) * np.array([t["quantity"] for t in trades], dtype=np.float64)
+    tradeCash = np.where(buys, -1, 1) * np.array([float(t["total_value"]) for t in trades], dtype=np.float64)
+    # A trade counts from the close of its Guyana trade date; trades on closed days count from the next session
+    tradeDay = days.searchsorted(tradeDays(pd.Series([t["created_at"] for t in trades], dtype=object)).to_numpy()) \
+        if trades else np.array([], dtype=np.int64)
+    mine = tradeRows >= 0
+    np.subtract.at(shares, (tradeRows[mine], tradeCols[mine]), tradeShares[mine])
+    np.subtract.at(cash, tradeRows[mine], tradeCash[mine])
 
-    # 4. Batch update the database
-    if stock_data:
-        # 'upsert' updates the price if the ticker exists, or inserts it if new
-        supabase.table("stocks").upsert(stock_data).execute()
-        print(f"Synced {len(stock_data)} securities to the DB")
+    dayPrices = matrix.reindex(index=days, columns=tickers).to_numpy()
+    usernames = {m["user_id"]: m.get("username") for m in members}
+    digest = hashlib.sha256()
+    rows, written = [], 0
+    timings["rewind"] = time.perf_counter() - stageStart
+
+    # 3. Day by day: apply the day's trades, value, rank against the previous day
+    timings["replay"] = timings["write"] = 0.0
+    for i, day in enumerate(days):
+        stageStart = time.perf_counter()
+        applied = mine & (tradeDay == i)
+        np.add.at(shares, (tradeRows[applied], tradeCols[applied]), tradeShares[applied])
+        np.add.at(cash, tradeRows[applied], tradeCash[applied])
+        held = np.nonzero(shares)
+        valued = valueLeague(userIDs, cash, userIDs[held[0]], tickers.to_numpy()[held[1]], shares[held],
+                             pd.Series(dayPrices[i], index=tickers))
+        ranked = rankLeague(valued, previous)
+        previous = dict(zip(ranked["user_id"], ranked["rank"].tolist()))
+        digest.update("|".join(f"{u}:{r}:{w:.2f}" for u, r, w in zip(
+            ranked["user_id"], ranked["rank"], ranked["net_worth"])).encode())
+        timings["replay"] += time.perf_counter() - stageStart
+
+        if write:
+            stageStart = time.perf_counter()
+            snapshotDate = day.date().isoformat()
+            rows.extend({
+                "league_id": leagueID,
+                "snapshot_date": snapshotDate,
+                "user_id": userID,
+                "username": usernames.get(userID),
+                "cash_balance": cashBalance,
+                "stock_value": stockValue,
+                "net_worth": netWorth,
+                "rank": rank,
+                "rank_change": None if change != change else int(change)
+            } for userID, cashBalance, stockValue, netWorth, rank, change in zip(
+                ranked["user_id"], ranked["cash_balance"].tolist(), ranked["stock_value"].tolist(),
+                ranked["net_worth"].tolist(), ranked["rank"].tolist(), ranked["rank_change"].tolist()))
+            if len(rows) >= chunkSize or i == len(days) - 1:
+                upsertInChunks("league_snapshots", rows, chunkSize, on_conflict="league_id,snapshot_date,user_id")
+                written += len(rows)
+                rows = []
+            timings["write"] += time.perf_counter() - stageStart
+
+    playerDays = len(days) * len(members)
+    print(f"Replayed {leagueID} over {len(days)} trading days ({len(members)} players, {len(trades)} trades), "
+          f"{written} snapshot rows written in {sum(timings.values()):.2f}s - "
+          + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    return {"days": len(days), "players": len(members), "trades": len(trades), "rowsWritten": written,
+            "playerDaysPerSecond": playerDays / timings["replay"] if timings["replay"] else None,
+            "timings": timings, "digest": digest.hexdigest()}
+
+def replayAllLeagues(start, end=None, write=False, chunkSize=SNAPSHOT_CHUNK_SIZE):
+    #Replays every league running on `end`, reading the price history once; returns {leagueID: replayLeague() summary}
+    end = end or datetime.now(guyanaTZ).date()
+    history = loadPriceHistory(end.isoformat())
+    return {leagueID: replayLeague(start, end, leagueID, write, chunkSize, history)
+            for leagueID in loadActiveLeagues(end.isoformat())}
+
+# --- Intraday daemon ---
+
+class MarketCalendar:
+    """
+    GSE trading days and session hours in Guyana time. `tradingDays` are
+    weekday abbreviations, `opens`/`closes` are "HH:MM" and `holidays` are
+    ISO dates (or date objects) the exchange is closed.
+    """
+    WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+    def __init__(self, tradingDays=TRADING_DAYS, opens=SESSION_OPEN, closes=SESSION_CLOSE, holidays=HOLIDAYS):
+        if isinstance(tradingDays, str):
+            tradingDays = tradingDays.split(",")
+        self.tradingDays = {self.WEEKDAYS.index(d.strip()[:3].title()) for d in tradingDays if d.strip()}
+        self.opens = datetime.strptime(opens, "%H:%M").time()
+        self.closes = datetime.strptime(closes, "%H:%M").time()
+        if isinstance(holidays, str):
+            holidays = [d for d in holidays.split(",") if d.strip()]
+        self.holidays = {d if isinstance(d, date) else date.fromisoformat(d.strip()) for d in holidays}
+
+    def isTradingDay(self, day):
+        return day.weekday() in self.tradingDays and day not in self.holidays
+
+    def sessionBounds(self, day):
+        return (datetime.combine(day, self.opens, guyanaTZ), datetime.combine(day, self.closes, guyanaTZ))
+
+    def inSession(self, now):
+        if not self.isTradingDay(now.date()):
+            return False
+        opens, closes = self.sessionBounds(now.date())
+        return opens <= now < closes
+
+    def nextOpen(self, now):
+        #The first session open strictly after `now`
+        day = now.date()
+        for _ in range(366):
+            if self.isTradingDay(day):
+                opens, _ = self.sessionBounds(day)
+                if opens > now:
+                    return opens
+            day += timedelta(days=1)
+        raise ValueError("No trading day within a year; check GSE_TRADING_DAYS and GSE_HOLIDAYS")
+
+def loadSyncState(path=STATE_FILE):
+    #Reads the daemon's saved schedule, or an empty one on the first run
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"securities": {}, "securitiesDate": None, "closingSyncDate": None, "symbols": {}}
+
+def saveSyncState(state, path=STATE_FILE):
+    #Writes to a temp file first so a crash mid-write never leaves a truncated state file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmpPath = f"{path}.tmp"
+    with open(tmpPath, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmpPath, path)
+
+def scheduleSymbol(entry, result, now, calendar):
+    """
+    Updates one symbol's schedule after a fetch. A changed price resets the
+    interval to MIN_INTERVAL and an unchanged one doubles it up to
+    MAX_INTERVAL. Symbols whose last trade is older than INACTIVE_DAYS are
+    only checked again at the next session open; failed fetches retry after
+    MIN_INTERVAL without touching the interval.
+    """
+    interval = entry.get("interval", MIN_INTERVAL)
+    entry["lastChecked"] = now.isoformat()
+    if result["error"] is not None or not result["trade"]:
+        entry["nextDue"] = (now + timedelta(seconds=MIN_INTERVAL)).isoformat()
+        return entry
+
+    price = parsePrice(result["symbol"], result["trade"])
+    tradeDate = parseTradeDate(result["trade"])
+    if price != entry.get("lastPrice") or tradeDate != entry.get("lastTradeDate"):
+        interval = MIN_INTERVAL
     else:
-        print("No trade data found to sync")
+        interval = min(interval * 2, MAX_INTERVAL)
+    entry.update(interval=interval, lastPrice=price, lastTradeDate=tradeDate)
+
+    if date.fromisoformat(tradeDate) < now.date() - timedelta(days=INACTIVE_DAYS):
+        entry["nextDue"] = calendar.nextOpen(now).isoformat()
+    else:
+        entry["nextDue"] = (now + timedelta(seconds=interval)).isoformat()
+    return entry
+
+def refreshSecurities(state, now):
+    #Re-reads the securities list once per trading day; new symbols are due immediately
+    today = now.date().isoformat()
+    if state.get("securitiesDate") == today and state.get("securities"):
+        return
+    state["securities"] = {sec['symbol']: sec.get('name', 'Unknown') for sec in financegy.get_securities()}
+    state["securitiesDate"] = today
+    symbols = state.setdefault("symbols", {})
+    for symbol in list(symbols):
+        if symbol not in state["securities"]:
+            del symbols[symbol]
+    for symbol in state["securities"]:
+        symbols.setdefault(symbol, {"interval": MIN_INTERVAL, "nextDue": now.isoformat()})
+
+def dueSymbols(state, now):
+    return [s for s, entry in state["symbols"].items()
+            if datetime.fromisoformat(entry["nextDue"]) <= now]
+
+def runDaemonPass(state, symbols, now, calendar, cache=None, **syncOptions):
+    """
+    Syncs `symbols` and reschedules each of them from its fetch result. The
+    schedule already decides when a symbol is fetched, so trades always bypass
+    the cache's TTL; it only skips writing payloads that have not changed.
+    """
+    names = {s: state["securities"][s] for s in symbols}
+    changed, results = syncTrades(names, cache=cache, refresh=True, **syncOptions)
+    if cache is not None:
+        printCacheReport(cache)
+        cache.resetStats()
+    for r in results:
+        scheduleSymbol(state["symbols"][r["symbol"]], r, now, calendar)
+    return changed
+
+def runDaemon(statePath=STATE_FILE, calendar=None, clock=None, sleep=time.sleep, until=None, cache=None, snapshot=True,
+              useCache=True, **syncOptions):
+    """
+    Keeps prices fresh during GSE sessions. Inside a session only the symbols
+    that are due are fetched (see scheduleSymbol). After the close there is
+    one closing pass over every symbol and the day's league snapshots (unless
+    `snapshot` is False), then the daemon sleeps until the next
+    session opens. The schedule is saved to `statePath` after every pass, so a
+    restart carries on where it stopped instead of re-fetching everything.
+
+    A pass that raises (FinanceGY down, a PostgREST 5xx, a failing RPC) is
+    logged and retried after ERROR_BACKOFF seconds, doubling per consecutive
+    failure up to MAX_ERROR_BACKOFF; a failed closing pass is not marked done,
+    so it runs again. `useCache=False` turns the FinanceGY response cache off.
+
+    `clock`, `sleep` and `until` let the offline benchmarks drive a simulated
+    trading day; by default it runs forever on the wall clock.
+    """
+    calendar = calendar or MarketCalendar()
+    if cache is None and useCache:
+        cache = FetchCache()
+    clock = clock or (lambda: datetime.now(guyanaTZ))
+    state = loadSyncState(statePath)
+    failures = 0
+
+    while True:
+        now = clock()
+        today = now.date()
+        opens, closes = calendar.sessionBounds(today)
+
+        try:
+            if calendar.inSession(now):
+                refreshSecurities(state, now)
+                due = dueSymbols(state, now)
+                if due:
+                    print(f"[{now:%Y-%m-%d %H:%M}] Syncing {len(due)} of {len(state['symbols'])} securities")
+                    runDaemonPass(state, due, now, calendar, cache, **syncOptions)
+                    saveSyncState(state, statePath)
+                nextDue = min((datetime.fromisoformat(e["nextDue"]) for e in state["symbols"].values()), default=closes)
+                # Wake for the next due symbol, or at the close for the closing pass
+                wake = max(now + timedelta(seconds=1), min(nextDue, closes))
+            else:
+                if calendar.isTradingDay(today) and now >= closes and state.get("closingSyncDate") != today.isoformat():
+                    refreshSecurities(state, now)
+                    print(f"[{now:%Y-%m-%d %H:%M}] Closing sync of all {len(state['symbols'])} securities")
+                    runDaemonPass(state, list(state["symbols"]), now, calendar, cache, **syncOptions)
+                    if snapshot:
+                        snapshotAllLeagues(today.isoformat())
+                    state["closingSyncDate"] = today.isoformat()
+                    saveSyncState(state, statePath)
+                wake = calendar.nextOpen(now)
+                print(f"Market closed; sleeping until {wake:%a %Y-%m-%d %H:%M} (Guyana time)")
+            failures = 0
+        except Exception as e:
+            failures += 1
+            delay = min(MAX_ERROR_BACKOFF, ERROR_BACKOFF * 2 ** (failures - 1))
+            print(f"[{now:%Y-%m-%d %H:%M}] Sync pass failed ({failures} in a row): {e!r}; retrying in {delay:.0f}s")
+            wake = now + timedelta(seconds=delay)
+
+        if until is not None and wake >= until:
+            return state
+        sleep(max(1.0, (wake - clock()).total_seconds()))
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Sync GSE market prices into Supabase")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Max concurrent FinanceGY requests")
+    parser.add_argument("--serial", action="store_true", help="Fetch one symbol at a time (same as --workers 1)")
+    parser.add_argument("--timeout", type=float, default=FETCH_TIMEOUT, help="Per-attempt timeout in seconds")
+    parser.add_argument("--retries", type=int, default=FETCH_RETRIES, help="Attempts per symbol before giving up")
+    parser.add_argument("--chunk-size", type=int, default=UPSERT_CHUNK_SIZE, help="Max rows per upsert request")
+    parser.add_argument("--full", action="store_true", help="Upsert every ticker, even unchanged ones")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached FinanceGY responses and fetch everything")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the FinanceGY response cache")
+    parser.add_argument("--no-snapshot", action="store_true", help="Skip the league snapshots after the sync")
+    parser.add_argument("--no-orders", action="store_true", help="Do not match standing orders and alerts")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and sync during GSE sessions")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Where the daemon keeps its schedule")
+    parser.add_argument("--backfill", nargs="+", type=date.fromisoformat, metavar="DATE",
+                        help="Load every session from START [to END, default today] into price_history and exit")
+    parser.add_argument("--replay", nargs="+", type=date.fromisoformat, metavar="DATE",
+                        help="Replay league valuations and rankings from START [to END] and exit")
+    parser.add_argument("--league", help="With --replay, only replay this league id")
+    parser.add_argument("--write", action="store_true", help="With --replay, upsert the replayed days into league_snapshots")
+    parser.add_argument("--backfill-state", default=BACKFILL_STATE_FILE, help="Where --backfill checkpoints its progress")
+    parser.add_argument("--missing", action="store_true",
+                        help="With --backfill, only fetch the span of trading days that have no price_history rows")
+    args = parser.parse_args()
+    for option in ("backfill", "replay"):
+        if getattr(args, option) and len(getattr(args, option)) > 2:
+            parser.error(f"--{option} takes a start date and an optional end date")
+    return args
 
 if __name__ == "__main__":
-    syncMarketData()
\ No newline at end of file
+    args = parseArgs()
+    syncOptions = dict(
+        maxWorkers=1 if args.serial else args.workers,
+        timeout=args.timeout,
+        retries=args.retries,
+        chunkSize=args.chunk_size,
+        fullSync=args.full,
+        matchOrders=not args.no_orders
+    )
+    if args.backfill:
+        backfillHistory(*args.backfill, maxWorkers=syncOptions["maxWorkers"], timeout=args.timeout,
+                        retries=args.retries, statePath=args.backfill_state, refresh=args.refresh,
+                        onlyMissing=args.missing)
+    elif args.replay:
+        start, end = args.replay[0], (args.replay[1:] or [None])[0]
+        if args.league:
+            replayLeague(start, end, args.league, write=args.write)
+        else:
+            replayAllLeagues(start, end, write=args.write)
+    elif args.daemon:
+        runDaemon(args.state_file, snapshot=not args.no_snapshot, useCache=not args.no_cache, **syncOptions)
+    else:
+        syncMarketData(refresh=args.refresh, useCache=not args.no_cache, **syncOptions)
+        if not args.no_snapshot:
+            snapshotAllLeagues()
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# syncStocks builds a client at import time; tests never reach it and use the in-memory fake instead
+os.environ.setdefault("SUPABASE_URL", "https://offline-test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "offline-test-key")
+os.environ.setdefault("PRICE_HISTORY_CACHE_DIR", tempfile.mkdtemp(prefix="gse-test-"))
+
+@pytest.fixture
+def fakeDb(monkeypatch):
+    #Routes database.py and syncStocks.py through a fresh FakeSupabase (benchmarks/fakeSupabase.py) with empty caches and cache stats
+    import database
+    import syncStocks
+    from benchmarks.fakeSupabase import FakeSupabase
+    db = FakeSupabase()
+    monkeypatch.setattr(database, "supabase", db)
+    monkeypatch.setattr(syncStocks, "supabase", db)
+    database.clearCaches()
+    database.resetCacheStats()
+    yield db
+    database.clearCaches()
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from analytics import netWorthMatrix, tradingCalendar
+
+def trades(rows):
+    return pd.DataFrame(rows, columns=["user_id", "created_at", "type", "ticker", "quantity", "total_value"])
+
+def test_net_worth_follows_cash_and_holdings():
+    calendar = tradingCalendar(pd.Timestamp("2026-01-05"), pd.Timestamp("2026-01-07"))
+    prices = np.array([[10.0, 20.0], [12.0, 20.0], [12.0, 25.0]])
+    tx = trades([("a", "2026-01-05T15:00:00Z", "BUY", "AAA", 10, 100.0),
+                 ("a", "2026-01-06T15:00:00Z", "SELL", "AAA", 5, 60.0)])
+    users, netWorth = netWorthMatrix(tx, prices, calendar, ["AAA", "BBB"], startingCash=1000.0)
+    assert users.tolist() == ["a"]
+    assert netWorth[:, 0].tolist() == [1000.0, 1020.0, 1020.0]
+
+def test_trades_in_unknown_tickers_are_skipped():
+    calendar = tradingCalendar(pd.Timestamp("2026-01-05"), pd.Timestamp("2026-01-06"))
+    prices = np.full((len(calendar), 2), 10.0)
+    tx = trades([("a", "2026-01-05T15:00:00Z", "BUY", "ZZZ", 10, 100.0),
+                 ("b", "2026-01-05T15:00:00Z", "BUY", "ZZZ", 10, 100.0),
+                 ("b", "2026-01-05T15:00:00Z", "BUY", "AAA", 1, 10.0)])
+    users, netWorth = netWorthMatrix(tx, prices, calendar, ["AAA", "BBB"], startingCash=1000.0)
+    # An unknown ticker's code would otherwise index the previous user's last ticker
+    assert users.tolist() == ["b"]
+    assert netWorth[:, 0].tolist() == [1000.0, 1000.0]
@@ -0,0 +1,50 @@
+import contextlib
+import io
+from datetime import date, timedelta
+
+import syncStocks
+from syncStocks import MarketCalendar
+from benchmarks.fakeFinancegy import FakeFinanceGY
+
+calendar = MarketCalendar("Mon,Tue,Wed,Thu,Fri", "09:30", "14:30", "2026-10-07")
+START, END = date(2026, 10, 5), date(2026, 10, 16) #Monday to Friday, two weeks
+
+def history(db, days, tickers=("AAA",)):
+    db.tables["price_history"].extend({"ticker": t, "trade_date": d.isoformat(), "session": "1", "price": 1.0}
+                                      for d in days for t in tickers)
+
+def test_missing_sessions_are_trading_days_with_no_rows(fakeDb):
+    history(fakeDb, [date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 12), date(2026, 10, 16)])
+    # Weekends and the 7th (a holiday) are never missing
+    assert syncStocks.missingSessions(START, END, calendar) == [
+        date(2026, 10, 8), date(2026, 10, 9), date(2026, 10, 13), date(2026, 10, 14), date(2026, 10, 15)]
+
+def test_a_session_with_any_row_counts_as_recorded(fakeDb):
+    # BBB never traded in the window, but a session only goes missing when no ticker has a row for it
+    history(fakeDb, [START + timedelta(days=i) for i in range(12)], tickers=("AAA",))
+    history(fakeDb, [START], tickers=("BBB",))
+    assert syncStocks.missingSessions(START, END, calendar) == []
+
+def test_missing_sessions_only_reads_the_window(fakeDb):
+    history(fakeDb, [date(2026, 9, 30), date(2026, 10, 19)])
+    assert syncStocks.missingSessions(date(2026, 10, 5), date(2026, 10, 6), calendar) == [
+        date(2026, 10, 5), date(2026, 10, 6)]
+
+def test_backfill_of_missing_sessions_refetches_only_the_gap(fakeDb, monkeypatch, tmp_path):
+    fake = FakeFinanceGY(symbols=3, latency=0, jitter=0)
+    monkeypatch.setattr(syncStocks, "financegy", fake)
+    options = dict(maxWorkers=2, retries=1, statePath=str(tmp_path / "backfill.json"), onlyMissing=True)
+    weekdays = [START + timedelta(days=i) for i in range(12) if (START + timedelta(days=i)).weekday() < 5]
+    history(fakeDb, [d for d in weekdays if d not in (date(2026, 10, 8), date(2026, 10, 9))],
+            tickers=[s["symbol"] for s in fake.securities])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = syncStocks.backfillHistory(START, END, **options)
+    assert summary["failed"] == [] and summary["rows"] == 2 * 3
+    assert syncStocks.missingSessions(START, END) == []
+
+    # Nothing missing: one read and no FinanceGY requests
+    requests = fake.requests
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = syncStocks.backfillHistory(START, END, **options)
+    assert summary["rows"] == 0 and fake.requests == requests
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import syncStocks
+from syncStocks import MarketCalendar, MIN_INTERVAL, MAX_INTERVAL, guyanaTZ
+from benchmarks.fakeFinancegy import FakeFinanceGY
+
+calendar = MarketCalendar("Mon,Tue,Wed,Thu,Fri", "09:30", "14:30", "2026-10-19")
+
+def at(day, hour, minute=0):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=guyanaTZ)
+
+FRIDAY, MONDAY, TUESDAY = date(2026, 10, 16), date(2026, 10, 19), date(2026, 10, 20)
+
+def test_trading_days_skip_weekends_and_holidays():
+    assert calendar.isTradingDay(FRIDAY)
+    assert not calendar.isTradingDay(FRIDAY + timedelta(days=1))
+    assert not calendar.isTradingDay(MONDAY) #Listed as a holiday
+    assert calendar.isTradingDay(TUESDAY)
+
+def test_session_includes_the_open_and_excludes_the_close():
+    assert not calendar.inSession(at(FRIDAY, 9, 29))
+    assert calendar.inSession(at(FRIDAY, 9, 30))
+    assert calendar.inSession(at(FRIDAY, 14, 29))
+    assert not calendar.inSession(at(FRIDAY, 14, 30))
+    assert not calendar.inSession(at(MONDAY, 10))
+
+def test_next_open_is_strictly_later_and_skips_closed_days():
+    assert calendar.nextOpen(at(FRIDAY, 8)) == at(FRIDAY, 9, 30)
+    assert calendar.nextOpen(at(FRIDAY, 9, 30)) == at(TUESDAY, 9, 30)
+    assert calendar.nextOpen(at(FRIDAY, 15)) == at(TUESDAY, 9, 30)
+
+def test_a_calendar_with_no_trading_days_is_rejected():
+    with pytest.raises(ValueError):
+        MarketCalendar("", "09:30", "14:30", "").nextOpen(at(FRIDAY, 8))
+
+def fetched(price, day=FRIDAY, error=None):
+    trade = None if error else {"session": "1", "date": day.strftime("%d/%m/%Y"), "ltp": str(price)}
+    return {"symbol": "AAA", "trade": trade, "error": error}
+
+def test_unchanged_prices_back_off_and_a_move_resets_the_interval():
+    entry, now = {}, at(FRIDAY, 10)
+    syncStocks.scheduleSymbol(entry, fetched(10.0), now, calendar)
+    assert entry["interval"] == MIN_INTERVAL
+    intervals = [syncStocks.scheduleSymbol(entry, fetched(10.0), now, calendar)["interval"] for _ in range(8)]
+    assert intervals == sorted(intervals) and intervals[0] == 2 * MIN_INTERVAL and intervals[-1] == MAX_INTERVAL
+    assert datetime.fromisoformat(entry["nextDue"]) == now + timedelta(seconds=MAX_INTERVAL)
+    assert syncStocks.scheduleSymbol(entry, fetched(11.0), now, calendar)["interval"] == MIN_INTERVAL
+
+def test_failed_fetches_retry_soon_without_touching_the_interval():
+    entry, now = {"interval": MAX_INTERVAL, "lastPrice": 10.0}, at(FRIDAY, 10)
+    syncStocks.scheduleSymbol(entry, fetched(None, error="timed out"), now, calendar)
+    assert entry["interval"] == MAX_INTERVAL and entry["lastPrice"] == 10.0
+    assert datetime.fromisoformat(entry["nextDue"]) == now + timedelta(seconds=MIN_INTERVAL)
+
+def test_inactive_symbols_wait_for_the_next_open():
+    entry, now = {}, at(FRIDAY, 10)
+    syncStocks.scheduleSymbol(entry, fetched(10.0, FRIDAY - timedelta(days=60)), now, calendar)
+    assert entry["nextDue"] == at(TUESDAY, 9, 30).isoformat()
+
+def test_due_symbols():
+    now = at(FRIDAY, 10)
+    state = {"symbols": {"AAA": {"nextDue": now.isoformat()},
+                         "BBB": {"nextDue": (now + timedelta(seconds=1)).isoformat()},
+                         "CCC": {"nextDue": (now - timedelta(hours=1)).isoformat()}}}
+    assert syncStocks.dueSymbols(state, now) == ["AAA", "CCC"]
+
+def test_daemon_day_on_a_fake_clock(fakeDb, monkeypatch, tmp_path):
+    # FakeFinanceGY dates trades today, so the simulated day is the next weekday from now on
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    weekdays = MarketCalendar("Mon,Tue,Wed,Thu,Fri", "09:30", "14:30", "")
+    opens, closes = weekdays.sessionBounds(day)
+    fake = FakeFinanceGY(symbols=4, latency=0, jitter=0, inactive=0.5)
+    monkeypatch.setattr(syncStocks, "financegy", fake)
+
+    clock = {"now": at(day, 8)}
+    fetches = defaultdict(list)
+    fetchTrade = fake.get_recent_trade
+    def recordFetch(symbol, use_cache=True):
+        fetches[symbol].append((clock["now"] - opens).total_seconds())
+        return fetchTrade(symbol, use_cache)
+    monkeypatch.setattr(fake, "get_recent_trade", recordFetch)
+
+    def sleep(seconds):
+        clock["now"] += timedelta(seconds=seconds)
+
+    statePath = str(tmp_path / "sync_state.json")
+    options = dict(calendar=weekdays, clock=lambda: clock["now"], sleep=sleep, useCache=False, snapshot=False,
+                   maxWorkers=2, retries=1)
+    state = syncStocks.runDaemon(statePath, until=at(day, 20), **options)
+
+    # Prices never move, so active symbols back off 300s, 600s, ... up to an hour, then get the closing pass
+    session = (closes - opens).total_seconds()
+    assert fetches["SYM002"] == fetches["SYM003"] == [0, 300, 900, 2100, 4500, 8100, 11700, 15300, session]
+    # Symbols that have not traded in weeks are only checked at the open and the close
+    assert fetches["SYM000"] == fetches["SYM001"] == [0, session]
+    assert state["closingSyncDate"] == day.isoformat()
+    assert clock["now"] == closes #Then it would sleep until the next open, past `until`
+
+    # A restart after the close does not repeat the closing pass
+    requests, clock["now"] = fake.requests, at(day, 19)
+    syncStocks.runDaemon(statePath, until=at(day, 20), **options)
+    assert fake.requests == requests
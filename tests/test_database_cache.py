@@ -0,0 +1,57 @@
+import database
+from benchmarks.fakeSupabase import GLOBAL_LEAGUE
+
+def snapshot(day, userID, rankChange):
+    return {"league_id": GLOBAL_LEAGUE, "snapshot_date": day, "user_id": userID, "username": userID,
+            "net_worth": 1000.0, "rank": 1, "rank_change": rankChange}
+
+def test_top_movers_follow_a_new_snapshot_without_a_sync(fakeDb):
+    fakeDb.tables["league_snapshots"].append(snapshot("2026-10-15", "a", 3))
+    assert [r["user_id"] for r in database.getTopMovers(5, GLOBAL_LEAGUE)[0]] == ["a"]
+
+    # The snapshot job writes through its own client, so nothing here is told about the new day
+    fakeDb.tables["league_snapshots"].append(snapshot("2026-10-16", "b", 2))
+    assert [r["user_id"] for r in database.getTopMovers(5, GLOBAL_LEAGUE)[0]] == ["a"]
+    database._snapshotDateCache.clear() #What SNAPSHOT_DATE_TTL expiring does
+    assert [r["user_id"] for r in database.getTopMovers(5, GLOBAL_LEAGUE)[0]] == ["b"]
+
+def test_top_movers_are_empty_before_the_first_snapshot(fakeDb):
+    assert database.getTopMovers(5, GLOBAL_LEAGUE) == ([], [])
+
+def stock(ticker, price, stamp):
+    return {"ticker": ticker, "name": ticker, "current_price": price, "last_updated": stamp, "shares_outstanding": None}
+
+def prices():
+    return {s["ticker"]: s["current_price"] for s in database.getAllStocks()}
+
+def test_market_reads_are_keyed_to_the_sync_stamp(fakeDb):
+    fakeDb.tables["stocks"].append(stock("AAA", 10.0, "2026-10-16T20:00:00+00:00"))
+    assert prices() == {"AAA": 10.0}
+
+    # A write that does not move last_updated is not a sync: the cached copy keeps being served
+    fakeDb.tables["stocks"][0]["current_price"] = 11.0
+    database._syncStampCache.clear() #What SYNC_STAMP_TTL expiring does
+    assert prices() == {"AAA": 10.0}
+
+    fakeDb.tables["stocks"][0]["last_updated"] = "2026-10-17T20:00:00+00:00"
+    assert prices() == {"AAA": 10.0} #The stamp itself is still cached
+    database._syncStampCache.clear()
+    assert prices() == {"AAA": 11.0}
+    assert database.getCacheStats()["getAllStocks"] == {"hits": 2, "misses": 2}
+
+def test_invalidate_market_drops_one_function_and_rechecks_the_stamp(fakeDb):
+    fakeDb.tables["stocks"].append(stock("AAA", 10.0, "2026-10-16T20:00:00+00:00"))
+    database.getAllStocks()
+    database.getTopMovers(5, GLOBAL_LEAGUE)
+    fakeDb.tables["stocks"][0]["current_price"] = 12.0
+    database.invalidateMarket("getAllStocks")
+    assert "stamp" not in database._syncStampCache
+    assert prices() == {"AAA": 12.0}
+    assert [k[0] for k in database._marketCache.keys()].count("getTopMovers") == 1
+
+def test_clear_caches_drops_every_cached_read(fakeDb):
+    fakeDb.tables["stocks"].append(stock("AAA", 10.0, "2026-10-16T20:00:00+00:00"))
+    database.getAllStocks()
+    database.getLeaderboard(10, 0, GLOBAL_LEAGUE)
+    database.clearCaches()
+    assert not database._marketCache and not database._syncStampCache and not database._leaderboardVersionCache
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+import pytest
+
+from orders import OrderBook, triggerDirection
+
+def matched(book, prices):
+    positions, fillPrices = book.match(prices)
+    return positions.tolist(), fillPrices.tolist()
+
+def test_trigger_equal_to_the_price_fires_in_both_directions():
+    book = OrderBook(["AAA", "AAA"], ["above", "below"], [10.0, 10.0])
+    assert matched(book, {"AAA": 10.0}) == ([0, 1], [10.0, 10.0])
+
+def test_above_fires_at_or_over_its_trigger_only():
+    book = OrderBook(["AAA"] * 3, ["above"] * 3, [9.99, 10.0, 10.01])
+    assert matched(book, {"AAA": 10.0}) == ([0, 1], [10.0, 10.0])
+    assert matched(book, {"AAA": 9.0}) == ([], [])
+
+def test_below_fires_at_or_under_its_trigger_only():
+    book = OrderBook(["AAA"] * 3, ["below"] * 3, [9.99, 10.0, 10.01])
+    assert matched(book, {"AAA": 10.0}) == ([1, 2], [10.0, 10.0])
+    assert matched(book, {"AAA": 11.0}) == ([], [])
+
+def test_matches_are_per_ticker_and_in_position_order():
+    book = OrderBook(["BBB", "AAA", "BBB", "AAA"], ["below", "above", "above", "below"], [5.0, 20.0, 4.0, 30.0])
+    assert matched(book, {"AAA": 25.0, "BBB": 4.5}) == ([0, 1, 2, 3], [4.5, 25.0, 4.5, 25.0])
+    assert matched(book, {"BBB": 6.0}) == ([2], [6.0])
+
+def test_empty_book_matches_nothing():
+    book = OrderBook([], [], [])
+    assert len(book) == 0
+    positions, fillPrices = book.match({"AAA": 10.0})
+    assert positions.dtype == np.int64 and positions.size == 0 and fillPrices.size == 0
+
+@pytest.mark.parametrize("prices", [{}, {"ZZZ": 10.0}, {"AAA": None}, {"AAA": 0.0}, {"AAA": -1.0}, {"AAA": math.nan}])
+def test_missing_or_non_positive_prices_trigger_nothing(prices):
+    book = OrderBook(["AAA", "AAA"], ["above", "below"], [0.0, 100.0])
+    assert matched(book, prices) == ([], [])
+
+def test_matches_agree_with_a_linear_scan():
+    rng = np.random.default_rng(0)
+    tickers = rng.choice(["AAA", "BBB", "CCC"], 500)
+    directions = rng.choice(["above", "below"], 500)
+    triggers = rng.integers(1, 20, 500).astype(float)
+    prices = {"AAA": 7.0, "BBB": 13.0}
+    book = OrderBook(tickers, directions, triggers)
+    expected = [i for i in range(500) if tickers[i] in prices and
+                (prices[tickers[i]] >= triggers[i] if directions[i] == "above" else prices[tickers[i]] <= triggers[i])]
+    assert matched(book, prices)[0] == expected
+
+@pytest.mark.parametrize("kind, side, direction", [
+    ("limit", "buy", "below"), ("limit", "sell", "above"), ("stop", "buy", "above"), ("stop", "sell", "below")])
+def test_order_directions(kind, side, direction):
+    assert triggerDirection(kind, side) == direction
+
+def test_alerts_need_a_direction():
+    assert triggerDirection("alert", direction="above") == "above"
+    with pytest.raises(ValueError):
+        triggerDirection("alert")
+    with pytest.raises(ValueError):
+        triggerDirection("limit", "hold")
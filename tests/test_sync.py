@@ -0,0 +1,39 @@
+import contextlib
+import io
+
+import pytest
+
+import syncStocks
+from benchmarks.fakeFinancegy import FakeFinanceGY
+
+def row(ticker, price, name=None):
+    return {"ticker": ticker, "name": name or f"{ticker} Ltd", "current_price": price, "last_updated": "now()"}
+
+def tickers(rows):
+    return [r["ticker"] for r in rows]
+
+def test_diff_splits_new_changed_and_unchanged_tickers():
+    synced = {"AAA": row("AAA", 10.0), "BBB": row("BBB", 20.0), "CCC": row("CCC", 30.0, "Old Name")}
+    fetched = [row("AAA", 10.0), row("BBB", 21.5), row("CCC", 30.0, "New Name"), row("DDD", 5.0)]
+    inserts, updates, skipped = syncStocks.diffStocks(fetched, synced)
+    assert (tickers(inserts), tickers(updates), tickers(skipped)) == (["DDD"], ["BBB", "CCC"], ["AAA"])
+
+@pytest.mark.parametrize("stored", ["10.0", 10.0000000001, 10])
+def test_diff_ignores_representation_noise_in_stored_prices(stored):
+    # PostgREST returns numeric columns as strings or floats depending on the column type
+    assert tickers(syncStocks.diffStocks([row("AAA", 10.0)], {"AAA": row("AAA", stored)})[2]) == ["AAA"]
+
+def test_diff_rewrites_a_ticker_with_no_stored_price():
+    assert tickers(syncStocks.diffStocks([row("AAA", 10.0)], {"AAA": row("AAA", None)})[1]) == ["AAA"]
+
+def test_sync_only_upserts_the_tickers_that_moved(fakeDb, monkeypatch):
+    fake = FakeFinanceGY(symbols=5, latency=0, jitter=0)
+    monkeypatch.setattr(syncStocks, "financegy", fake)
+    names = {s["symbol"]: s["name"] for s in fake.get_securities()}
+    with contextlib.redirect_stdout(io.StringIO()):
+        first, _ = syncStocks.syncTrades(names, maxWorkers=2, retries=1, matchOrders=False)
+        fake.prices["SYM002"] += 1
+        second, _ = syncStocks.syncTrades(names, maxWorkers=2, retries=1, matchOrders=False)
+    assert len(first) == 5
+    assert tickers(second) == ["SYM002"]
+    assert {r["ticker"]: r["current_price"] for r in fakeDb.tables["stocks"]}["SYM002"] == fake.prices["SYM002"]
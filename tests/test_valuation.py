@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from valuation import rebalanceLegs
+
+def currentWeights(shares, prices, cash):
+    #Current weights the way app.py seeds the rebalance editor: percent of net worth, divided back by 100
+    netWorth = cash + sum(q * prices[t] for t, q in shares.items())
+    return {t: (shares.get(t, 0) * p / netWorth * 100) / 100 for t, p in prices.items()}
+
+def test_unchanged_weights_produce_no_legs():
+    rng = random.Random(0)
+    for _ in range(2000):
+        tickers = [f"T{i}" for i in range(rng.randint(1, 12))]
+        prices = {t: round(rng.uniform(0.5, 5000), 2) for t in tickers}
+        shares = {t: rng.randint(0, 100_000) for t in rng.sample(tickers, rng.randint(1, len(tickers)))}
+        cash = round(rng.uniform(0, 1_000_000), 2)
+        assert rebalanceLegs(shares, prices, currentWeights(shares, prices, cash), cash) == []
+
+def test_targets_round_down_and_sells_come_first():
+    legs = rebalanceLegs({"AAA": 10}, {"AAA": 100.0, "BBB": 30.0}, {"AAA": 0.5, "BBB": 0.5}, 0.0)
+    assert legs == [
+        {"side": "sell", "ticker": "AAA", "quantity": 5, "price": 100.0},
+        {"side": "buy", "ticker": "BBB", "quantity": 16, "price": 30.0},
+    ]
+
+def test_basket_never_needs_more_cash_than_the_portfolio_has():
+    rng = random.Random(1)
+    for _ in range(500):
+        prices = {f"T{i}": round(rng.uniform(0.5, 5000), 2) for i in range(5)}
+        raw = [rng.random() for _ in prices]
+        weights = {t: w / sum(raw) for t, w in zip(prices, raw)}
+        cash = round(rng.uniform(1_000, 1_000_000), 2)
+        legs = rebalanceLegs({}, prices, weights, cash)
+        assert sum(leg["quantity"] * leg["price"] for leg in legs) <= cash + 1e-6
+
+def test_rejects_bad_weights_and_missing_prices():
+    with pytest.raises(ValueError):
+        rebalanceLegs({}, {"AAA": 1.0}, {"AAA": 1.5}, 100.0)
+    with pytest.raises(ValueError):
+        rebalanceLegs({"AAA": 1}, {}, {"AAA": 0.5}, 100.0)
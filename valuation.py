@@ -0,0 +1,152 @@
+"""
+Vectorized portfolio valuation.
+
+Everything here works on whole columns at once and keeps values numeric, so it
+can be used (and tested) without Streamlit. Formatting for display is left to
+the caller, e.g. through st.column_config.
+"""
+import numpy as np
+import pandas as pd
+
+VALUATION_COLUMNS = [
+    "ticker", "name", "shares", "avg_price", "current_price",
+    "market_value", "cost_basis", "pl", "pl_pct"
+]
+
+def holdingsFrame(holdings):
+    #Flattens getUserPortfolio() rows, including the nested 'stocks' join, into columns
+    stocks = [h.get('stocks') or {} for h in holdings]
+    return pd.DataFrame({
+        "ticker": [h['ticker'] for h in holdings],
+        "name": [s.get('name') for s in stocks],
+        "shares": np.fromiter((h['shares_count'] for h in holdings), dtype=np.int64, count=len(holdings)),
+        "avg_price": np.fromiter((h['avg_price'] for h in holdings), dtype=np.float64, count=len(holdings)),
+        "current_price": np.fromiter(
+            (np.nan if s.get('current_price') is None else s['current_price'] for s in stocks),
+            dtype=np.float64, count=len(holdings)
+        ),
+    })
+
+def valueHoldings(tickers, shares, avgPrices, prices, names=None):
+    """
+    Values a set of holdings in one pass.
+
+    `tickers`, `shares` and `avgPrices` are aligned arrays. `prices` is either an
+    array aligned with them or a ticker-indexed mapping/Series, which is looked
+    up per holding. Returns a DataFrame with VALUATION_COLUMNS; P/L % is 0 when
+    the cost basis is 0.
+    """
+    tickers = np.asarray(tickers, dtype=object)
+    shares = np.asarray(shares, dtype=np.float64)
+    avgPrices = np.asarray(avgPrices, dtype=np.float64)
+
+    if isinstance(prices, (dict, pd.Series)):
+        prices = pd.Series(prices, dtype=np.float64).reindex(tickers).to_numpy()
+    currentPrices = np.asarray(prices, dtype=np.float64)
+
+    marketValue = shares * currentPrices
+    costBasis = shares * avgPrices
+    pl = marketValue - costBasis
+    plPct = np.divide(pl, costBasis, out=np.zeros_like(pl), where=costBasis != 0) * 100
+
+    return pd.DataFrame({
+        "ticker": tickers,
+        "name": names if names is not None else tickers,
+        "shares": shares,
+        "avg_price": avgPrices,
+        "current_price": currentPrices,
+        "market_value": marketValue,
+        "cost_basis": costBasis,
+        "pl": pl,
+        "pl_pct": plPct,
+    }, columns=VALUATION_COLUMNS)
+
+def valuePortfolio(holdings):
+    #Convenience wrapper: values getUserPortfolio() rows at the prices joined from 'stocks'
+    frame = holdingsFrame(holdings)
+    return valueHoldings(frame['ticker'].to_numpy(), frame['shares'].to_numpy(), frame['avg_price'].to_numpy(),
+                         frame['current_price'].to_numpy(), names=frame['name'].to_numpy())
+
+def portfolioTotals(valued):
+    #Sums a valueHoldings() frame into overall market value, cost basis and P/L
+    marketValue = float(np.nansum(valued['market_value']))
+    costBasis = float(np.nansum(valued['cost_basis']))
+    pl = marketValue - costBasis
+    return {
+        "market_value": marketValue,
+        "cost_basis": costBasis,
+        "pl": pl,
+        "pl_pct": (pl / costBasis) * 100 if costBasis != 0 else 0.0,
+    }
+
+def rebalanceLegs(shares, prices, targetWeights, cash):
+    """
+    Computes the basket of whole-share legs that moves a portfolio toward
+    `targetWeights` (ticker -> fraction of total net worth, summing to at most
+    1; the rest stays in cash). `shares` and `prices` are ticker-indexed
+    mappings/Series. Target share counts are rounded down, so the basket never
+    needs more cash than the portfolio has; float noise just under a whole
+    share (9.9999999 -> 10) is not, so the current weights produce no legs.
+    Sells are listed before buys.
+    """
+    weights = pd.Series(targetWeights, dtype=np.float64)
+    if (weights < 0).any() or weights.sum() > 1 + 1e-9:
+        raise ValueError("Target weights must be non-negative and sum to at most 100%")
+
+    held = pd.Series(shares, dtype=np.float64)
+    universe = held.index.union(weights.index)
+    held = held.reindex(universe, fill_value=0)
+    weights = weights.reindex(universe, fill_value=0)
+    prices = pd.Series(prices, dtype=np.float64).reindex(universe)
+    if prices.isna().any():
+        raise ValueError(f"Missing prices for: {', '.join(prices[prices.isna()].index)}")
+
+    totalValue = cash + float((held * prices).sum())
+    rawShares = weights * totalValue / prices
+    targetShares = np.floor(rawShares * (1 + 1e-12) + 1e-9)
+    delta = (targetShares - held).astype(np.int64)
+
+    legs = [{"side": "sell", "ticker": t, "quantity": int(-q), "price": float(prices[t])}
+            for t, q in delta[delta < 0].items()]
+    legs += [{"side": "buy", "ticker": t, "quantity": int(q), "price": float(prices[t])}
+             for t, q in delta[delta > 0].items()]
+    return legs
+
+def valueLeague(userIDs, cash, holdingUsers, holdingTickers, shares, prices):
+    """
+    Values every player in one pass, like refresh_leaderboard() does in SQL.
+
+    `userIDs` and `cash` are aligned per player; `holdingUsers`,
+    `holdingTickers` and `shares` are aligned per portfolio row. `prices` is a
+    ticker-indexed mapping/Series; holdings of unknown tickers are worth 0.
+    Returns a DataFrame of user_id, cash_balance, stock_value and net_worth in
+    `userIDs` order.
+    """
+    userIDs = np.asarray(userIDs, dtype=object)
+    cash = np.asarray(cash, dtype=np.float64)
+    owner = pd.Index(userIDs).get_indexer(np.asarray(holdingUsers, dtype=object))
+    holdingPrices = pd.Series(prices, dtype=np.float64).reindex(np.asarray(holdingTickers, dtype=object)).to_numpy()
+    values = np.nan_to_num(np.asarray(shares, dtype=np.float64) * holdingPrices)
+
+    # Holdings of players without a profile are dropped, as the SQL join does
+    known = owner >= 0
+    stockValue = np.bincount(owner[known], weights=values[known], minlength=len(userIDs))
+    return pd.DataFrame({
+        "user_id": userIDs,
+        "cash_balance": cash,
+        "stock_value": stockValue,
+        "net_worth": cash + stockValue,
+    })
+
+def rankLeague(valued, previousRanks=None):
+    """
+    Adds 1-based 'rank' (net worth descending, ties by user_id, matching the
+    leaderboard) and 'rank_change' to a valueLeague() frame. `previousRanks`
+    maps user_id to an earlier rank; rank_change is positive for players who
+    moved up and NaN for players without an earlier rank.
+    """
+    order = np.lexsort((valued["user_id"].to_numpy(dtype=str), -valued["net_worth"].to_numpy()))
+    ranks = np.empty(len(valued), dtype=np.int64)
+    ranks[order] = np.arange(1, len(valued) + 1)
+    previous = pd.Series(previousRanks or {}, dtype=np.float64).reindex(valued["user_id"]).to_numpy()
+    return valued.assign(rank=ranks, rank_change=previous - ranks)